@@ -1,8 +1,10 @@
-from django.db.models.signals import post_migrate
-from django.contrib.auth.models import Group, Permission
+from django.db.models.signals import post_migrate, post_save, post_delete
+from django.contrib.auth.models import Group, Permission, User
 from django.contrib.contenttypes.models import ContentType
 from django.dispatch import receiver
 
+from website.caching import bump_generation
+
 # App label ya models zako ni 'website'
 APP = 'website'
 
@@ -62,3 +64,10 @@ def create_default_groups(sender, **kwargs):
         perms = Permission.objects.filter(codename__in=codenames, content_type__app_label=APP)
         group.permissions.set(perms)  # override to keep clean
         group.save()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def users_changed(sender, **kwargs):
+    # dashboard "Admin Users" list (also bumped by last_login on sign-in)
+    bump_generation("user")
@@ -0,0 +1,28 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from website import critical_css
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def stylesheet(context, path):
+    """
+    Usage: {% load critical_css %}{% stylesheet "css/tw.css" %}
+    On pages with built critical CSS (see build_critical_css), inlines it and
+    loads `path` without blocking rendering; otherwise a plain <link>.
+    """
+    href = static(path)
+    match = getattr(context.get("request"), "resolver_match", None)
+    critical = critical_css.load(match.url_name) if match and match.namespace == "website" else ""
+    if not critical:
+        return format_html('<link rel="stylesheet" href="{}">', href)
+    return format_html(
+        '<style id="critical-css">{}</style>\n'
+        '  <link rel="stylesheet" href="{}" media="print" onload="this.media=\'all\'">\n'
+        '  <noscript><link rel="stylesheet" href="{}"></noscript>',
+        mark_safe(critical), href, href,
+    )
@@ -0,0 +1,68 @@
+from time import perf_counter
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+from website.caching import FRAGMENT_CACHE_TIMEOUT, record_fragment, settings_revision
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, name, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        request = context.get("request")
+        vary = [var.resolve(context) for var in self.vary_on]
+        key = make_template_fragment_key(self.name, vary + [self._revision(request)])
+        page = self._page(request)
+
+        entry = cache.get(key)
+        if entry is not None:
+            html, seconds = entry
+            record_fragment(page, True, seconds)
+            return html
+
+        start = perf_counter()
+        html = self.nodelist.render(context)
+        seconds = perf_counter() - start
+        cache.set(key, (html, seconds), getattr(settings, "FRAGMENT_CACHE_TIMEOUT", FRAGMENT_CACHE_TIMEOUT))
+        record_fragment(page, False, seconds)
+        return html
+
+    @staticmethod
+    def _revision(request):
+        # Looked up once per request, however many fragments the page has
+        if request is None:
+            return settings_revision()
+        if not hasattr(request, "_settings_revision"):
+            request._settings_revision = settings_revision()
+        return request._settings_revision
+
+    @staticmethod
+    def _page(request):
+        match = getattr(request, "resolver_match", None)
+        if match:
+            return match.view_name
+        return request.path if request is not None else "-"
+
+
+@register.tag
+def cachefragment(parser, token):
+    """
+    Usage: {% cachefragment "footer" var1 var2 %} ... {% endcachefragment %}
+    Cached until SiteSettings changes (the settings revision is part of the
+    key); the optional vars are the per-request values the markup depends on.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires a fragment name.")
+    name = bits[1].strip("\"'")
+    nodelist = parser.parse(("endcachefragment",))
+    parser.delete_first_token()
+    return FragmentNode(nodelist, name, [parser.compile_filter(b) for b in bits[2:]])
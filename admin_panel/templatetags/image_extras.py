@@ -0,0 +1,94 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from website import images, static_images
+
+register = template.Library()
+
+
+@register.filter
+def srcset(image, ext="webp"):
+    """
+    Usage: <img srcset="{{ item.image|srcset }}" ...>
+           {{ item.image|srcset:"jpg" }}
+    Empty string when the image has no derivatives yet.
+    """
+    if not image:
+        return ""
+    return images.srcset(image, ext)
+
+
+@register.simple_tag
+def responsive_image(image, alt="", css_class="", sizes="100vw", style="", loading="lazy"):
+    """
+    Usage: {% responsive_image item.image alt=item.title css_class="w-full" sizes="(min-width:1024px) 33vw, 100vw" %}
+    Renders <picture> with WebP + JPEG srcsets, falling back to the original.
+    Lazy-loaded by default (pass loading="eager" above the fold), with the
+    intrinsic width/height and blurred placeholder stored on the model.
+    """
+    if not image:
+        return ""
+    attrs = _img_attrs(image, style, loading)
+    webp, jpg = srcset(image, "webp"), srcset(image, "jpg")
+    if not webp:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}"{}>',
+            image.url, alt, css_class, attrs,
+        )
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<source type="image/jpeg" srcset="{}" sizes="{}">'
+        '<img src="{}" alt="{}" class="{}"{} data-full="{}">'
+        '</picture>',
+        webp, sizes, jpg, sizes, image.url, alt, css_class, attrs, image.url,
+    )
+
+
+def _img_attrs(image, style, loading):
+    """width/height, loading/decoding and the placeholder background for an upload."""
+    instance = getattr(image, "instance", None)
+    width, height = getattr(instance, "image_width", None), getattr(instance, "image_height", None)
+    placeholder = getattr(instance, "image_placeholder", "")
+    size = format_html(' width="{}" height="{}"', width, height) if width and height else ""
+    if not placeholder:
+        return format_html('{} loading="{}" decoding="async" style="{}"', size, loading, style)
+    return format_html(
+        '{} loading="{}" decoding="async" style="background:url({}) center/cover no-repeat;{}"'
+        ' onload="this.style.background=\'none\'"',
+        size, loading, placeholder, style,
+    )
+
+
+@register.simple_tag
+def static_image(path, alt="", css_class="", sizes="100vw", width=640, style="", loading="lazy"):
+    """
+    Usage: {% static_image "images/orphans.png" alt="Orphans" css_class="w-full h-48 object-cover" sizes="50vw" width=480 %}
+    <picture> of the variants collectstatic built for a static image; the
+    fallback <img> is the smallest variant at least `width` px wide. Before
+    collectstatic (or for small files) it is a plain <img>. Lazy-loaded
+    unless loading="eager".
+    """
+    entry = static_images.manifest().get(path)
+    if entry is None:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" style="{}" loading="{}" decoding="async">',
+            static(path), alt, css_class, style, loading,
+        )
+
+    webp, fallback = entry["variants"]["webp"], entry["variants"][entry["fallback"]]
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" style="{}"'
+        ' loading="{}" decoding="async">'
+        '</picture>',
+        _static_srcset(webp), sizes,
+        static(static_images.pick(fallback, int(width))[1]), _static_srcset(fallback), sizes,
+        entry["width"], entry["height"], alt, css_class, style, loading,
+    )
+
+
+def _static_srcset(variants):
+    return ", ".join(f"{static(name)} {w}w" for w, name, _ in variants)
@@ -0,0 +1,21 @@
+from django import template
+from django.utils.html import format_html
+
+from website import inbox
+
+register = template.Library()
+
+
+@register.simple_tag
+def unread_badge(css_class=""):
+    """
+    Usage: {% unread_badge %}  ->  <span class="...">3</span>, or "" when the inbox is read.
+    Served from the materialized counter (website/inbox.py), so no query.
+    """
+    count = inbox.unread_count()
+    if not count:
+        return ""
+    return format_html(
+        '<span class="ml-auto inline-flex min-w-[1.25rem] justify-center rounded-full bg-gold px-1.5 text-xs font-semibold text-slate-900 {}">{}</span>',
+        css_class, "99+" if count > 99 else count,
+    )
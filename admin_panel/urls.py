@@ -52,6 +52,12 @@ urlpatterns = [
     path('messages/<int:pk>/read/', views.messages_mark_read, name='messages_mark_read'),
     path('messages/<int:pk>/unread/', views.messages_mark_unread, name='messages_mark_unread'),
     path('messages/read-all/', views.messages_mark_all_read, name='messages_mark_all_read'),  # NEW
+    path('messages/bulk/', views.messages_bulk, name='messages_bulk'),
+
+    path('export/<str:name>.<str:fmt>', views.export, name='export'),
+
+    # Performance
+    path('performance/', views.performance, name='performance'),
 
     # Users & roles
     path('', include('admin_panel.users_urls')),
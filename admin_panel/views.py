@@ -4,17 +4,31 @@ from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth.models import User
 from django.contrib import messages as dj_messages
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Q, OuterRef, Subquery
 from django.core.cache import cache
-from django.http import HttpResponseForbidden
-from django.urls import reverse_lazy
+from django.db import connection
+from django.http import Http404, HttpResponseForbidden, StreamingHttpResponse
+from django.core.exceptions import PermissionDenied
+from django.utils.http import urlencode
+from django.views.decorators.http import require_POST
+from django.urls import reverse, reverse_lazy
 from django.contrib.auth.views import PasswordResetView
 from .forms import AdminPasswordResetForm
 from django.views.decorators.csrf import csrf_protect
 from website.models import (
     SiteSettings, Program, News, Event, DonationMethod,
-    Gallery, ContactMessage
+    Gallery, ContactMessage, ImageJob
 )
+from website.caching import (
+    bump_generation, cached_by_generations, conditional_report, fragment_cache_report, settings_revision,
+)
+from website.pagination import paginate
+from website import exports, inbox
+from website.bulk import delete_rows
+from website.context_processors import lazy_context_recording, lazy_context_report
+from website.instrumentation import instrumentation_report
+from website.nplusone import recent_detections
+from django.conf import settings
 import time
 # ---------------------------
 # Auth
@@ -95,23 +109,94 @@ def admin_logout(request):
 logout_view = admin_logout  # legacy
 
 
+# ---------------------------
+# List pagination
+# ---------------------------
+PAGE_SIZES = (10, 25, 50, 100)
+# Same order as the public Donate page, with id to make it unique
+DONATIONS_ORDERING = ('order', 'name', 'id')
+
+def _per_page(request):
+    try:
+        size = int(request.GET.get('per_page', PAGE_SIZES[0]))
+    except (TypeError, ValueError):
+        return PAGE_SIZES[0]
+    return size if size in PAGE_SIZES else PAGE_SIZES[0]
+
+def _list_context(request, name, queryset, ordering, **extra):
+    """Cursor-paginated list context shared by the admin list views."""
+    per_page = _per_page(request)
+    context = {
+        name: paginate(request, queryset, ordering, per_page),
+        'per_page': per_page,
+        'page_sizes': PAGE_SIZES,
+    }
+    context.update(extra)
+    return context
+
+
 # ---------------------------
 # Dashboard
 # ---------------------------
+DASHBOARD_CACHE_TIMEOUT = 60
+
+def _dashboard_counts():
+    """Every dashboard counter in one SELECT of scalar COUNT(*) subqueries."""
+    counted = {
+        'programs_count': Program.objects.all(),
+        'news_count': News.objects.all(),
+        'events_count': Event.objects.all(),
+        'gallery_count': Gallery.objects.all(),
+        'messages_unread_count': inbox.unread_messages(),
+        'messages_total_count': ContactMessage.objects.all(),
+    }
+    parts, params = [], []
+    for name, qs in counted.items():
+        sql, qs_params = qs.order_by().values('pk').query.sql_with_params()
+        parts.append(f"(SELECT COUNT(*) FROM ({sql}) {name}_rows)")
+        params.extend(qs_params)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {', '.join(parts)}", params)
+        return dict(zip(counted, cursor.fetchone()))
+
+def _dashboard_data():
+    # Each piece is cached until a row it shows changes (signals bump the
+    # generations), with a short TTL as a backstop.
+    counts = cached_by_generations(
+        'dashboard:counts', ('program', 'news', 'event', 'gallery', 'contactmessage'),
+        _dashboard_counts, DASHBOARD_CACHE_TIMEOUT,
+    )
+    recent_news = cached_by_generations(
+        'dashboard:recent_news', ('news',),
+        lambda: list(News.objects.filter(is_published=True).order_by('-updated_at', '-id')[:5]),
+        DASHBOARD_CACHE_TIMEOUT,
+    )
+    recent_events = cached_by_generations(
+        'dashboard:recent_events', ('event',),
+        lambda: list(Event.objects.filter(is_published=True).order_by('-event_date', '-id')[:5]),
+        DASHBOARD_CACHE_TIMEOUT,
+    )
+    recent_messages = cached_by_generations(
+        'dashboard:recent_messages', ('contactmessage',),
+        lambda: list(ContactMessage.objects.order_by('-created_at', '-id')[:5]),
+        DASHBOARD_CACHE_TIMEOUT,
+    )
+    staff_users = cached_by_generations(
+        'dashboard:staff_users', ('user',),
+        lambda: list(User.objects.filter(is_staff=True).order_by('-is_superuser', 'username')),
+        DASHBOARD_CACHE_TIMEOUT,
+    )
+    return counts, recent_news, recent_events, recent_messages, staff_users
+
 @login_required
 def dashboard(request):
-    programs_count = Program.objects.count()
-    news_count = News.objects.count()
-    events_count = Event.objects.count()
-    gallery_count = Gallery.objects.count()
-    messages_unread_count = ContactMessage.objects.filter(is_read=False).count()
-    messages_total_count = ContactMessage.objects.count()
-
-    recent_news = News.objects.filter(is_published=True).order_by('-updated_at', '-id')[:5]
-    recent_events = Event.objects.filter(is_published=True).order_by('-event_date', '-id')[:5]
-    recent_messages = ContactMessage.objects.order_by('-created_at')[:5]
-
-    staff_users = User.objects.filter(is_staff=True).order_by('-is_superuser', 'username')
+    counts, recent_news, recent_events, recent_messages, staff_users = _dashboard_data()
+    programs_count = counts['programs_count']
+    news_count = counts['news_count']
+    events_count = counts['events_count']
+    gallery_count = counts['gallery_count']
+    messages_unread_count = counts['messages_unread_count']
+    messages_total_count = counts['messages_total_count']
 
     context = {
         'stats': {
@@ -191,10 +276,8 @@ def site_settings(request):
 @permission_required('website.view_program', raise_exception=True)
 def programs_list(request):
     q = request.GET.get('q','').strip()
-    qs = Program.objects.all().order_by('-id')
-    if q:
-        qs = qs.filter(Q(title__icontains=q) | Q(description__icontains=q))
-    return render(request, 'admin_panel/programs_list.html', {'programs': qs, 'q': q})
+    context = _list_context(request, 'programs', exports.programs_queryset(q), exports.PROGRAMS_ORDERING, q=q)
+    return render(request, 'admin_panel/programs_list.html', context)
 
 @login_required
 @permission_required('website.add_program', raise_exception=True)
@@ -240,10 +323,8 @@ def program_delete(request, pk):
 @permission_required('website.view_news', raise_exception=True)
 def news_list(request):
     q = request.GET.get('q','').strip()
-    qs = News.objects.all().order_by('-updated_at','-id')
-    if q:
-        qs = qs.filter(Q(title__icontains=q) | Q(content__icontains=q))
-    return render(request, 'admin_panel/news_list.html', {'news': qs, 'q': q})
+    context = _list_context(request, 'news', exports.news_queryset(q), exports.NEWS_ORDERING, q=q)
+    return render(request, 'admin_panel/news_list.html', context)
 
 @login_required
 @permission_required('website.add_news', raise_exception=True)
@@ -289,10 +370,8 @@ def news_delete(request, pk):
 @permission_required('website.view_event', raise_exception=True)
 def events_list(request):
     q = request.GET.get('q','').strip()
-    qs = Event.objects.all().order_by('-event_date','-id')
-    if q:
-        qs = qs.filter(Q(title__icontains=q) | Q(description__icontains=q) | Q(location__icontains=q))
-    return render(request, 'admin_panel/events_list.html', {'events': qs, 'q': q})
+    context = _list_context(request, 'events', exports.events_queryset(q), exports.EVENTS_ORDERING, q=q)
+    return render(request, 'admin_panel/events_list.html', context)
 
 @login_required
 @permission_required('website.add_event', raise_exception=True)
@@ -343,11 +422,12 @@ def events_delete(request, pk):
 @permission_required('website.view_donationmethod', raise_exception=True)
 def donations_list(request):
     q = request.GET.get('q','').strip()
-    qs = DonationMethod.objects.all().order_by('order','name')
+    qs = DonationMethod.objects.all()
     if q:
         qs = qs.filter(Q(name__icontains=q) | Q(bank_name__icontains=q) |
                        Q(account_number__icontains=q) | Q(description__icontains=q))
-    return render(request, 'admin_panel/donations_list.html', {'donations': qs, 'q': q})
+    context = _list_context(request, 'donations', qs, DONATIONS_ORDERING, q=q)
+    return render(request, 'admin_panel/donations_list.html', context)
 
 @login_required
 @permission_required('website.add_donationmethod', raise_exception=True)
@@ -397,10 +477,17 @@ def donations_delete(request, pk):
 @permission_required('website.view_gallery', raise_exception=True)
 def gallery_list(request):
     q = request.GET.get('q','').strip()
-    qs = Gallery.objects.all().order_by('-created_at','-id')  # your model lacks updated_at
-    if q:
-        qs = qs.filter(Q(title__icontains=q) | Q(description__icontains=q))
-    return render(request, 'admin_panel/gallery_list.html', {'gallery': qs, 'q': q})
+    qs = exports.gallery_queryset(q)
+    # Latest image-processing job per item (status chip in the list)
+    latest_job = ImageJob.objects.filter(
+        model_label=Gallery._meta.label_lower, object_id=OuterRef('pk')
+    ).order_by('-id')
+    qs = qs.annotate(
+        image_job_status=Subquery(latest_job.values('status')[:1]),
+        image_job_error=Subquery(latest_job.values('last_error')[:1]),
+    )
+    context = _list_context(request, 'gallery', qs, exports.GALLERY_ORDERING, q=q)
+    return render(request, 'admin_panel/gallery_list.html', context)
 
 @login_required
 @permission_required('website.add_gallery', raise_exception=True)
@@ -442,36 +529,20 @@ def gallery_delete(request, pk):
 # ---------------------------
 # Contact messages
 # ---------------------------
+MESSAGE_STATUSES = (('', 'All'), ('unread', 'Unread'), ('read', 'Read'), ('archived', 'Archived'))
+
 @login_required
 @permission_required('website.view_contactmessage', raise_exception=True)
 def messages_list(request):
     q = request.GET.get('q', '').strip()
-    status = request.GET.get('status', '')  # "", "read", "unread"
-
-    qs = ContactMessage.objects.all().order_by('-created_at')
+    status = request.GET.get('status', '')  # "", "read", "unread", "archived"
 
-    if q:
-        qs = qs.filter(
-            Q(subject__icontains=q) |
-            Q(message__icontains=q) |
-            Q(name__icontains=q) |
-            Q(email__icontains=q)
-        )
-
-    if status == 'read':
-        qs = qs.filter(is_read=True)
-    elif status == 'unread':
-        qs = qs.filter(is_read=False)
-
-    unread_count = ContactMessage.objects.filter(is_read=False).count()
-    notifications = ContactMessage.objects.filter(is_read=False).order_by('-created_at')[:4]
-
-    return render(request, "admin_panel/messages_list.html", {
-        "inbox": qs,
-        "unread_count": ContactMessage.objects.filter(is_read=False).count(),
-        "notifications": ContactMessage.objects.filter(is_read=False).order_by("-created_at")[:4],
-        "q": q, "status": status,
-    })
+    context = _list_context(
+        request, 'inbox', exports.messages_queryset(q, status), exports.MESSAGES_ORDERING,
+        unread_count=inbox.unread_count(), notifications=inbox.notification_feed(),
+        q=q, status=status, statuses=MESSAGE_STATUSES, bulk_actions=MESSAGE_BULK_ACTIONS,
+    )
+    return render(request, "admin_panel/messages_list.html", context)
 
 @login_required
 @permission_required('website.view_contactmessage', raise_exception=True)
@@ -505,6 +576,9 @@ def messages_mark_unread(request, pk):
 @permission_required('website.change_contactmessage', raise_exception=True)
 def messages_mark_all_read(request):
     ContactMessage.objects.filter(is_read=False).update(is_read=True, read_at=timezone.now())
+    # update() sends no post_save
+    bump_generation('contactmessage')
+    inbox.invalidate()
     dj_messages.success(request, 'All messages marked as read.')
     return redirect('admin_panel:messages_list')
 
@@ -516,6 +590,120 @@ def message_delete(request, pk):
     dj_messages.success(request, 'Message deleted successfully!')
     return redirect('admin_panel:messages_list')
 
+# action -> (label, past tense for the summary, permission)
+MESSAGE_BULK_ACTIONS = {
+    'read': ('Mark read', 'marked as read', 'website.change_contactmessage'),
+    'unread': ('Mark unread', 'marked as unread', 'website.change_contactmessage'),
+    'archive': ('Archive', 'archived', 'website.change_contactmessage'),
+    'delete': ('Delete', 'deleted', 'website.delete_contactmessage'),
+}
+BULK_MAX_IDS = 500
+
+def _bulk_apply(qs, action):
+    """Run `action` on every row of `qs` as a single statement; returns rows changed."""
+    now = timezone.now()
+    if action == 'read':
+        return qs.filter(is_read=False).update(is_read=True, read_at=now)
+    if action == 'unread':
+        return qs.filter(is_read=True).update(is_read=False, read_at=None)
+    if action == 'archive':
+        # Read state is kept; the unread count leaves archived mail out
+        return qs.filter(is_archived=False).update(is_archived=True)
+    # qs.delete() would load every row to send post_delete per message
+    return delete_rows(qs)
+
+@login_required
+@require_POST
+def messages_bulk(request):
+    """
+    POST: action=read|unread|archive|delete
+      - scope=selected + ids=<pk>... : the ticked rows
+      - scope=filter + q, status     : everything the list filter matches
+    """
+    action = request.POST.get('action', '')
+    q = request.POST.get('q', '').strip()
+    status = request.POST.get('status', '')
+    back = reverse('admin_panel:messages_list')
+    params = {k: v for k, v in (('q', q), ('status', status)) if v}
+    if params:
+        back += '?' + urlencode(params)
+
+    if action not in MESSAGE_BULK_ACTIONS:
+        dj_messages.error(request, 'Choose an action.')
+        return redirect(back)
+    _, done, perm = MESSAGE_BULK_ACTIONS[action]
+    if not request.user.has_perm(perm):
+        raise PermissionDenied
+
+    if request.POST.get('scope') == 'filter':
+        qs = exports.messages_queryset(q, status)
+        summary = '{n} message(s) matching the filter {done}' if params else '{n} message(s) {done}'
+    else:
+        ids = [int(pk) for pk in request.POST.getlist('ids') if pk.isdigit()]
+        if not ids:
+            dj_messages.error(request, 'No messages selected.')
+            return redirect(back)
+        if len(ids) > BULK_MAX_IDS:
+            dj_messages.error(
+                request,
+                f'{len(ids)} messages selected; at most {BULK_MAX_IDS} can be changed at once. '
+                'Use "Apply to all" instead.')
+            return redirect(back)
+        qs = ContactMessage.objects.filter(pk__in=ids)
+        summary = f'{{n}} of {len(ids)} selected message(s) {{done}}'
+
+    started = time.perf_counter()
+    changed = _bulk_apply(qs, action)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    # update() and delete_rows() send no signals
+    bump_generation('contactmessage')
+    inbox.invalidate()
+
+    dj_messages.success(request, summary.format(n=changed, done=done) + f' in {elapsed_ms:.0f} ms.')
+    return redirect(back)
+
+# ---------------------------
+# Exports
+# ---------------------------
+
+@login_required
+def export(request, name, fmt):
+    if name not in exports.EXPORTS or fmt not in exports.FORMATS:
+        raise Http404
+    model, columns = exports.EXPORTS[name]
+    if not request.user.has_perm(f'website.view_{model._meta.model_name}'):
+        raise PermissionDenied
+
+    q = request.GET.get('q', '').strip()
+    qs = exports.export_queryset(name, q, request.GET.get('status', ''))
+    content_type, ext = exports.FORMATS[fmt]
+    response = StreamingHttpResponse(exports.lines(fmt, qs, columns), content_type=content_type)
+    stamp = timezone.localtime().strftime('%Y%m%d-%H%M')
+    response['Content-Disposition'] = f'attachment; filename="{name}-{stamp}.{ext}"'
+    return response
+
+# ---------------------------
+# Performance
+# ---------------------------
+@login_required
+@permission_required('website.view_sitesettings', raise_exception=True)
+def performance(request):
+    # Timings are merged from every worker's snapshot in the cache
+    slowest_views, query_heavy_views = instrumentation_report()
+    context = {
+        'fragments': fragment_cache_report(),
+        'conditional': conditional_report(),
+        'lazy_values': lazy_context_report(),
+        'lazy_values_recorded': lazy_context_recording(),
+        'settings_revision': settings_revision(),
+        'instrumented': 'website.instrumentation.InstrumentationMiddleware' in settings.MIDDLEWARE,
+        'slowest_views': slowest_views,
+        'query_heavy_views': query_heavy_views,
+        'nplusone_detections': list(reversed(recent_detections)),
+        'nplusone_enabled': bool(getattr(settings, 'NPLUSONE_DETECTION', False)),
+    }
+    return render(request, 'admin_panel/performance.html', context)
+
 class AdminPasswordResetView(PasswordResetView):
     template_name = "admin_panel/auth/password_reset_form.html"
     email_template_name = "admin_panel/auth/password_reset_email.txt"
@@ -1,9 +1,11 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.contrib.auth import views as auth_views
 from django.conf import settings
 from django.conf.urls.static import static
 
+from website import media
+
 urlpatterns = [
     # Keep Django admin available for debugging/backup
     path('django-admin/', admin.site.urls),
@@ -47,20 +49,13 @@ urlpatterns = [
          name='password_reset_complete'),
 ]
 
-# Optional: sitemap wiring if present in project
-try:
-    from django.contrib.sitemaps.views import sitemap
-    from website.sitemaps import StaticViewSitemap, NewsSitemap, ProgramSitemap
-    sitemaps = {
-        'static': StaticViewSitemap,
-        'news': NewsSitemap,
-        'programs': ProgramSitemap,
-    }
-    urlpatterns.append(path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='sitemap'))
-except Exception:
-    pass
+# Uploads, with Cache-Control/ETag and Range support (front them with a CDN or
+# web server if you prefer; set SERVE_MEDIA = False then)
+if getattr(settings, 'SERVE_MEDIA', settings.DEBUG):
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), media.serve, name='media'),
+    ]
 
-# Static & media in DEBUG
+# Static in DEBUG (production: WhiteNoise)
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
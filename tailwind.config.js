@@ -1,4 +1,6 @@
 /** @type {import('tailwindcss').Config} */
+const colors = require('tailwindcss/colors');
+
 module.exports = {
   darkMode: 'class',
   content: [
@@ -10,6 +12,11 @@ module.exports = {
   theme: {
     extend: {
       colors: {
+        // Tailwind 2 palette names, so green/yellow/purple look as they did
+        // when the 2.2.19 CDN stylesheet was loaded on top of this build
+        green: colors.emerald,
+        yellow: colors.amber,
+        purple: colors.violet,
         primary: {
           DEFAULT: "#155e2b",
           600: "#166534",
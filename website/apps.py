@@ -2,4 +2,8 @@ from django.apps import AppConfig
 
 class WebsiteConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'website'
\ No newline at end of file
+    name = 'website'
+
+    def ready(self):
+        # cache invalidation receivers
+        from . import signals  # noqa: F401
@@ -0,0 +1,197 @@
+"""
+Latency / query-count / memory benchmarks for the public and admin views.
+
+Used by `manage.py benchmark`: each dataset size is generated with
+seed_scale in a throwaway test database, every SCENARIOS entry is requested
+through the Django test client, and the numbers are compared with a stored
+JSON baseline. Queries are also run through the N+1 detector, and a view
+whose query count grows with the dataset size fails the run.
+"""
+import statistics
+import time
+import tracemalloc
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import nplusone
+from .models import Event, News
+
+# Row counts handed to seed_scale for each named size, smallest first.
+# "tiny" fits on one list page, so per-row queries show up as growth.
+# `users` (staff accounts, each in a group) are created by the benchmark.
+SIZES = {
+    "tiny": {"programs": 3, "news": 4, "events": 4, "gallery": 5, "messages": 5, "users": 2},
+    "small": {"programs": 20, "news": 200, "events": 200, "gallery": 1000, "messages": 5000, "users": 20},
+    "medium": {"programs": 50, "news": 2000, "events": 2000, "gallery": 10000, "messages": 50000, "users": 50},
+    "large": {"programs": 200, "news": 20000, "events": 20000, "gallery": 100000, "messages": 500000, "users": 100},
+}
+
+# name, url (str or callable returning one), needs a logged-in staff user
+Scenario = namedtuple("Scenario", "name url admin")
+
+
+def _latest(model, **filters):
+    return model.objects.filter(**filters).order_by("-pk").values_list("pk", flat=True).first()
+
+
+SCENARIOS = [
+    Scenario("home", lambda: reverse("website:home"), False),
+    Scenario("gallery", lambda: reverse("website:gallery"), False),
+    Scenario("gallery_category", lambda: reverse("website:gallery") + "?category=orphans", False),
+    Scenario("gallery_search", lambda: reverse("website:gallery") + "?q=water", False),
+    Scenario("news_events", lambda: reverse("website:news_events"), False),
+    Scenario("news_detail", lambda: reverse("website:news_detail", args=[_latest(News, is_published=True)]), False),
+    Scenario("event_detail", lambda: reverse("website:event_detail", args=[_latest(Event, is_published=True)]), False),
+    Scenario("dashboard", lambda: reverse("admin_panel:dashboard"), True),
+    Scenario("messages_list", lambda: reverse("admin_panel:messages_list"), True),
+    Scenario("programs_list", lambda: reverse("admin_panel:programs_list"), True),
+    Scenario("news_list", lambda: reverse("admin_panel:news_list"), True),
+    Scenario("gallery_list", lambda: reverse("admin_panel:gallery_list"), True),
+    Scenario("users_list", lambda: reverse("admin_panel:admin_users_list"), True),
+]
+
+# A result regresses when it is worse than the baseline by more than this
+# ratio *and* by more than the absolute slack (timer noise on fast views).
+TOLERANCE = {"p95_ms": (0.25, 2.0), "queries": (0.0, 0), "peak_kib": (0.5, 256)}
+
+
+# Logged by Django around transactions without going through a cursor
+TRANSACTION_SQL = {"BEGIN", "COMMIT", "ROLLBACK"}
+
+
+def _statements(sqls):
+    return sum(1 for sql in sqls if sql not in TRANSACTION_SQL)
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def isolated_caches():
+    """
+    CACHES with every alias swapped for a private LocMemCache, for
+    override_settings(): cold runs clear the cache before each request and
+    must never wipe the configured one (or the sessions stored in it).
+    """
+    return {
+        alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": f"benchmark-{alias}"}
+        for alias in settings.CACHES
+    }
+
+
+class Runner:
+    """
+    Requests each scenario `repeat` times. With `cold=True` the cache is
+    cleared before every request, so the numbers are for the uncached path
+    (what a visitor pays after a content change); otherwise cached hits.
+    Run it under override_settings(CACHES=isolated_caches()).
+    """
+
+    def __init__(self, user, repeat=20, cold=True):
+        if repeat < 1:
+            raise ValueError("repeat must be at least 1")
+        self.user = user
+        self.repeat = repeat
+        self.cold = cold
+
+    def _client(self, scenario):
+        client = Client()
+        if scenario.admin:
+            client.force_login(self.user)
+        return client
+
+    def _prepare(self, client, scenario):
+        """Cold runs start every request from an empty cache."""
+        if self.cold:
+            cache.clear()
+            if scenario.admin:
+                client.force_login(self.user)  # sessions may live in the cache
+
+    def _count_queries(self, client, scenario, url):
+        """(statements, recorder) for one request, checked against the N+1 recorder."""
+        # request_started clears the query log, so read it before any later
+        # request runs; BEGIN/COMMIT are logged but never reach execute wrappers
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries, nplusone.record_queries() as recorder:
+            client.get(url)
+            logged = [q["sql"] for q in queries.captured_queries]
+        count = _statements(logged)
+        recorded = _statements(shape for shape, origins in recorder.origins.items() for _ in origins)
+        if count != recorded:
+            raise RuntimeError(f"{scenario.name}: query log has {count} statements, N+1 recorder {recorded}")
+        return count, recorder
+
+    def measure(self, scenario):
+        url = scenario.url() if callable(scenario.url) else scenario.url
+        client = self._client(scenario)
+        self._prepare(client, scenario)
+        response = client.get(url)  # warm-up (imports, template loading)
+
+        self._prepare(client, scenario)
+        count, recorder = self._count_queries(client, scenario, url)
+
+        self._prepare(client, scenario)
+        tracemalloc.start()
+        client.get(url)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        timings = []
+        for _ in range(self.repeat):
+            self._prepare(client, scenario)
+            start = time.perf_counter()
+            client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        return {
+            "url": url,
+            "status": response.status_code,
+            "p50_ms": round(statistics.median(timings), 2),
+            "p95_ms": round(_percentile(timings, 95), 2),
+            "queries": count,
+            "peak_kib": round(peak / 1024, 1),
+            "nplusone": [nplusone.describe(d) for d in recorder.detections(scenario.name)],
+        }
+
+    def run(self, scenarios=SCENARIOS):
+        return {scenario.name: self.measure(scenario) for scenario in scenarios}
+
+
+def compare(results, baseline):
+    """[(size, view, metric, baseline value, new value)] for every regression."""
+    regressions = []
+    for size, views in results.items():
+        for view, metrics in views.items():
+            old = baseline.get(size, {}).get(view)
+            if not old:
+                continue
+            for metric, (ratio, slack) in TOLERANCE.items():
+                if metric not in old:
+                    continue
+                limit = max(old[metric] * (1 + ratio), old[metric] + slack)
+                if metrics[metric] > limit:
+                    regressions.append((size, view, metric, old[metric], metrics[metric]))
+    return regressions
+
+
+def query_growth(results):
+    """
+    [(view, {size: queries})] for views whose query count at a larger size
+    exceeds the count at the smallest measured size.
+    """
+    sizes = [size for size in SIZES if size in results]
+    growing = []
+    if len(sizes) < 2:
+        return growing
+    for view in results[sizes[0]]:
+        counts = {size: results[size][view]["queries"] for size in sizes if view in results[size]}
+        if max(counts.values()) > counts[sizes[0]]:
+            growing.append((view, counts))
+    return growing
@@ -0,0 +1,25 @@
+"""
+Set-based deletes that skip Django's delete collector.
+
+QuerySet.delete() on a model with pre/post_delete receivers loads every row
+and sends one signal per row, in batches. Callers here delete whole
+filtered sets (the inbox bulk actions, seed_scale --purge) and bump the
+model's cache generation themselves afterwards, so one plain DELETE is
+all they need. Only use this for models that nothing references by
+foreign key: no cascades run.
+"""
+from django.db import connections
+
+
+def delete_rows(qs):
+    """DELETE every row `qs` matches in a single statement; returns the row count."""
+    model = qs.model
+    connection = connections[qs.db]
+    quote = connection.ops.quote_name
+    table, pk = quote(model._meta.db_table), quote(model._meta.pk.column)
+    subquery, params = qs.order_by().values("pk").query.get_compiler(qs.db).as_sql()
+    # The derived table lets MySQL delete from a table its own subquery reads
+    sql = f"DELETE FROM {table} WHERE {pk} IN (SELECT {pk} FROM ({subquery}) AS matched)"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
@@ -0,0 +1,300 @@
+"""
+Shared-cache helpers for data every page needs.
+
+Each model we care about has a *generation* number in the shared cache.
+Signals bump the generation whenever a row is saved or deleted, and
+anything derived from those rows (the site snapshot, cached pages, ...)
+is keyed by the generations it depends on, so stale entries are simply
+never read again.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, has_vary_header, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+GENERATION_KEY = "gen:{}"
+SNAPSHOT_KEY = "site:snapshot"
+
+# Generations the site snapshot depends on
+SNAPSHOT_DEPENDS_ON = ("sitesettings", "gallery")
+
+_local = threading.local()
+
+
+def _initial_generation():
+    # Millisecond clock so a generation recreated after cache eviction
+    # never collides with an older value still held by another process.
+    return int(time.time() * 1000)
+
+
+def generations(*names):
+    """Return {name: generation} for the given names (one cache round trip)."""
+    keys = {GENERATION_KEY.format(n): n for n in names}
+    found = cache.get_many(list(keys))
+    result = {}
+    for key, name in keys.items():
+        gen = found.get(key)
+        if gen is None:
+            cache.add(key, _initial_generation(), None)
+            gen = cache.get(key)
+        result[name] = gen
+    return result
+
+
+def generation(name):
+    return generations(name)[name]
+
+
+def bump_generation(*names):
+    for name in names:
+        key = GENERATION_KEY.format(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_generation(), None)
+
+
+def _build_snapshot():
+    # Imported here so this module can be used from models/signals.
+    from .models import SiteSettings, Gallery
+
+    settings, _ = SiteSettings.objects.get_or_create(pk=1)
+    return {
+        "settings": settings,
+        "photos_count": Gallery.objects.filter(is_published=True).count(),
+    }
+
+
+def site_snapshot():
+    """
+    Settings row + published photo count.
+
+    Served from a per-thread copy while the generations are unchanged,
+    then from the shared cache, and only rebuilt from the database after
+    a SiteSettings or Gallery row has changed.
+    """
+    version = tuple(generations(*SNAPSHOT_DEPENDS_ON).values())
+
+    local = getattr(_local, "snapshot", None)
+    if local and local[0] == version:
+        return local[1]
+
+    cached = cache.get(SNAPSHOT_KEY)
+    if cached and cached[0] == version:
+        snapshot = cached[1]
+    else:
+        snapshot = _build_snapshot()
+        cache.set(SNAPSHOT_KEY, (version, snapshot), None)
+
+    _local.snapshot = (version, snapshot)
+    return snapshot
+
+
+def settings_revision():
+    """Revision counter that changes whenever SiteSettings is edited."""
+    return generation("sitesettings")
+
+
+def cached_by_generations(key, depends_on, build, timeout=300):
+    """
+    build() cached under `key` until any of the `depends_on` generations
+    is bumped. `key` may contain arbitrary text (it is hashed).
+    """
+    versions = sorted(generations(*depends_on).items())
+    full_key = "data:" + hashlib.md5(f"{key}|{versions}".encode()).hexdigest()
+    value = cache.get(full_key)
+    if value is None:
+        value = build()
+        cache.set(full_key, value, timeout)
+    return value
+
+
+# ---------------------------
+# Full-page cache (anonymous visitors)
+# ---------------------------
+PAGE_KEY = "page:{}"
+PAGE_CACHE_TIMEOUT = 60 * 60
+# Every public page renders the header/footer from SiteSettings
+PAGE_BASE_TAGS = ("sitesettings",)
+
+
+def _page_key(request, versions):
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    theme = request.session.get("theme", "light")
+    raw = f"{request.method}|{request.path}|{query}|{theme}|{sorted(versions.items())}"
+    return PAGE_KEY.format(hashlib.md5(raw.encode()).hexdigest())
+
+
+def cache_public_page(*tags, timeout=None):
+    """
+    Cache the rendered page for anonymous GET/HEAD requests.
+
+    `tags` name the generations the page depends on and may use the view's
+    URL kwargs, e.g. @cache_public_page("news:{pk}"). Saving or deleting a
+    row bumps both "<model>" and "<model>:<pk>", so only pages that render
+    that row are rebuilt. Logged-in users always get the live page, and so
+    does a visitor with a pending flash message.
+
+    The page is stored before the session and message middleware finish the
+    response, so anything they would make per-visitor (a queued message,
+    a modified session, Set-Cookie, a view's own Vary: Cookie) keeps the
+    page out of the cache.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (
+                request.method not in ("GET", "HEAD")
+                or request.user.is_authenticated
+                or len(messages.get_messages(request))
+            ):
+                return view(request, *args, **kwargs)
+
+            names = PAGE_BASE_TAGS + tuple(t.format(**kwargs) for t in tags)
+            key = _page_key(request, generations(*names))
+            response = cache.get(key)
+            if response is not None:
+                response["X-Page-Cache"] = "hit"
+                return response
+
+            response = view(request, *args, **kwargs)
+            session = getattr(request, "session", None)
+            cacheable = (
+                response.status_code == 200
+                and not response.streaming
+                and not response.cookies
+                and not has_vary_header(response, "Cookie")
+                and not (session is not None and session.modified)
+                # messages added while rendering, e.g. by a form view
+                and not len(messages.get_messages(request))
+                # pages embedding a CSRF token must not be shared
+                and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+            )
+            patch_vary_headers(response, ("Cookie",))
+            if cacheable:
+                cache.set(key, response, timeout or getattr(settings, "PAGE_CACHE_TIMEOUT", PAGE_CACHE_TIMEOUT))
+            response["X-Page-Cache"] = "miss"
+            return response
+        return wrapper
+    return decorator
+
+
+# ---------------------------
+# Conditional GET (detail pages)
+# ---------------------------
+# view name -> Counter(requests, not_modified)
+conditional_stats = defaultdict(Counter)
+
+
+def _settings_changed_at():
+    """When the current settings revision was first seen (>= the real edit time)."""
+    return cached_by_generations("settings-changed-at", ("sitesettings",), time.time, None)
+
+
+def conditional_detail(model, **filters):
+    """
+    Answer If-None-Match / If-Modified-Since with 304 for a detail view
+    taking `pk`, before the view (or the page cache) runs.
+
+    Validators come from the row's updated_at and the settings revision
+    (the header/footer render SiteSettings); the ETag also covers theme and
+    user, which change the HTML. updated_at is cached per row generation,
+    so a 304 usually costs no query at all.
+    """
+    name = model._meta.model_name
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, pk, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, pk=pk, **kwargs)
+
+            updated_at = cached_by_generations(
+                f"updated-at:{name}:{pk}", (f"{name}:{pk}",),
+                lambda: model.objects.filter(pk=pk, **filters).values_list("updated_at", flat=True).first(),
+                getattr(settings, "PAGE_CACHE_TIMEOUT", PAGE_CACHE_TIMEOUT),
+            )
+            # Flash messages must reach the page, so never 304 over them
+            if updated_at is None or len(messages.get_messages(request)):
+                return view(request, *args, pk=pk, **kwargs)
+
+            stats = conditional_stats[view.__name__]
+            stats["requests"] += 1
+            revision = settings_revision()
+            last_modified = int(max(updated_at.timestamp(), _settings_changed_at()))
+            theme = request.session.get("theme", "light")
+            raw = f"{name}:{pk}|{updated_at.isoformat()}|{revision}|{theme}|{request.user.pk}"
+            etag = '"%s"' % hashlib.md5(raw.encode()).hexdigest()
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is not None:
+                stats["not_modified"] += 1
+                return response
+
+            response = view(request, *args, pk=pk, **kwargs)
+            if response.status_code == 200:
+                response["ETag"] = etag
+                response["Last-Modified"] = http_date(last_modified)
+                patch_cache_control(response, no_cache=True)  # always revalidate
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_report():
+    """Per-view conditional GET requests, 304s and hit ratio (this process)."""
+    return {
+        view: {
+            "requests": c["requests"],
+            "not_modified": c["not_modified"],
+            "hit_ratio": round(100 * c["not_modified"] / c["requests"], 1) if c["requests"] else 0,
+        }
+        for view, c in sorted(conditional_stats.items())
+    }
+
+
+def bump_instance(instance):
+    """Invalidate everything rendered from `instance` (and its model's lists)."""
+    name = instance._meta.model_name
+    bump_generation(name, f"{name}:{instance.pk}")
+
+
+# ---------------------------
+# Template fragments (header/footer in base.html)
+# ---------------------------
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# page (view name) -> Counter(hits, misses, render_seconds, saved_seconds)
+fragment_stats = defaultdict(Counter)
+
+
+def record_fragment(page, hit, seconds):
+    """A hit saves the time the fragment took to render when it was cached."""
+    stats = fragment_stats[page]
+    if hit:
+        stats["hits"] += 1
+        stats["saved_seconds"] += seconds
+    else:
+        stats["misses"] += 1
+        stats["render_seconds"] += seconds
+
+
+def fragment_cache_report():
+    """Per-page fragment cache hits/misses and render time saved (this process)."""
+    report = {}
+    for page, stats in sorted(fragment_stats.items(), key=lambda i: -i[1]["saved_seconds"]):
+        report[page] = {
+            "hits": stats["hits"],
+            "misses": stats["misses"],
+            "render_ms": round(stats["render_seconds"] * 1000, 2),
+            "saved_ms": round(stats["saved_seconds"] * 1000, 2),
+        }
+    return report
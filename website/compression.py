@@ -0,0 +1,97 @@
+"""
+Brotli/gzip compression for dynamic responses.
+
+    MIDDLEWARE = [
+        "django.middleware.security.SecurityMiddleware",
+        "whitenoise.middleware.WhiteNoiseMiddleware",
+        "website.compression.CompressionMiddleware",
+        ...
+    ]
+
+Static files are compressed at build time (website.storage) and served by
+WhiteNoise. This handles what views render: HTML pages, sitemaps and the
+streamed CSV/JSONL exports. Brotli is used when the client accepts it and
+the `brotli` package is installed; otherwise gzip (Django's GZipMiddleware,
+including its BREACH padding). Brotli has no equivalent of gzip's random
+filename padding, so responses that carry a CSRF token (the request used
+get_token()) always go through the padded gzip path. Streaming responses
+are compressed as they are produced and never buffered whole.
+"""
+import re
+
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Fast enough for per-request use; static files get the maximum at build time
+BROTLI_QUALITY = 5
+MIN_SIZE = 200
+# Streams are flushed once this much input is pending: rows still reach the
+# client promptly, without the size cost of a flush per chunk
+STREAM_FLUSH_BYTES = 16 * 1024
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/x-ndjson", "application/xml", "application/javascript",
+)
+
+
+def accepts(request, coding):
+    """True if Accept-Encoding lists `coding` without q=0."""
+    header = request.META.get("HTTP_ACCEPT_ENCODING", "")
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() != coding:
+            continue
+        q = re.search(r"q=([0-9.]+)", params)
+        return not q or float(q.group(1)) > 0
+    return False
+
+
+def _brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    pending = 0
+    for chunk in sequence:
+        data = compressor.process(chunk)
+        pending += len(chunk)
+        if not data and pending >= STREAM_FLUSH_BYTES:
+            data = compressor.flush()
+        if data:
+            pending = 0
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    def process_response(self, request, response):
+        content_type = response.get("Content-Type", "").lower()
+        if not content_type.startswith(COMPRESSIBLE_TYPES) or response.has_header("Content-Encoding"):
+            return response
+        if (
+            brotli is None
+            or not accepts(request, "br")
+            or getattr(response, "is_async", False)
+            or request.META.get("CSRF_COOKIE_NEEDS_UPDATE")  # BREACH: keep the padded gzip path
+        ):
+            return super().process_response(request, response)
+        if not response.streaming and len(response.content) < MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if response.streaming:
+            response.streaming_content = _brotli_sequence(response.streaming_content)
+            del response.headers["Content-Length"]
+        else:
+            compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+        return response
@@ -1,25 +1,81 @@
-from django.core.exceptions import FieldDoesNotExist
-from .models import SiteSettings, Gallery
+import logging
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+from .caching import site_snapshot
+
+logger = logging.getLogger(__name__)
+
+# view name -> Counter({context value: times resolved}); debug aid showing
+# which lazy values each view's templates actually read. Only filled while
+# LAZY_CONTEXT_STATS is on (defaults to DEBUG).
+resolved_values = defaultdict(Counter)
+# Key for requests that matched no URL pattern (404s), so crawlers hitting
+# random paths can't grow the table
+UNRESOLVED = "<unresolved>"
+
+
+def lazy_context_recording():
+    return getattr(settings, "LAZY_CONTEXT_STATS", settings.DEBUG)
+
+
+def _snapshot(request):
+    # One snapshot lookup per request, shared by every value that needs it.
+    if not hasattr(request, "_site_snapshot"):
+        request._site_snapshot = site_snapshot()
+    return request._site_snapshot
+
+
+# Site-wide values exposed to every template. Nothing here is computed until
+# a template reads it, so new stats can be added without slowing pages that
+# don't render them.
+LAZY_VALUES = {
+    "site_settings": lambda request: _snapshot(request)["settings"],
+    "photos_count": lambda request: _snapshot(request)["photos_count"],
+    # Theme kutoka kwenye session (reading it loads the session)
+    "current_theme": lambda request: request.session.get("theme", "light"),
+}
+
+
+def _view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else UNRESOLVED
+
+
+class LazyValue:
+    """
+    Template variables call callables on lookup, so the loader only runs the
+    first time a template reads the value; the result is memoized for the
+    rest of the request.
+    """
+
+    def __init__(self, request, name, loader):
+        self._request = request
+        self._name = name
+        self._loader = loader
+        self._resolved = False
+        self._value = None
+
+    def __call__(self):
+        if not self._resolved:
+            self._value = self._loader(self._request)
+            self._resolved = True
+            if lazy_context_recording():
+                view = _view_name(self._request)
+                resolved_values[view][self._name] += 1
+                logger.debug("Lazy context value %r resolved by %s", self._name, view)
+        return self._value
+
+    def __repr__(self):
+        state = repr(self._value) if self._resolved else "unresolved"
+        return f"<LazyValue {self._name}: {state}>"
+
+
+def lazy_context_report():
+    """{view name: {value name: count}} for the values resolved so far."""
+    return {view: dict(counts) for view, counts in resolved_values.items()}
+
 
 def site_settings(request):
-    # Hakikisha tuna rekodi 1 ya settings kila wakati
-    settings, _ = SiteSettings.objects.get_or_create(pk=1)
-
-    # Hesabu picha kwa uangalifu (ikiwa model haina is_published, tumia zote)
-    try:
-        has_is_published = any(f.name == "is_published" for f in Gallery._meta.get_fields())
-        photos_qs = Gallery.objects.all()
-        if has_is_published:
-            photos_qs = photos_qs.filter(is_published=True)
-        photos_count = photos_qs.count()
-    except Exception:
-        photos_count = 0  # fallback salama
-
-    # Theme kutoka kwenye session
-    theme = request.session.get("theme", "light")
-
-    return {
-        "site_settings": settings,
-        "current_theme": theme,
-        "photos_count": photos_count,
-    }
+    return {name: LazyValue(request, name, loader) for name, loader in LAZY_VALUES.items()}
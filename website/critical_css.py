@@ -0,0 +1,204 @@
+"""
+Per-page critical CSS for the public templates.
+
+`manage.py build_critical_css` renders each page in PAGES, collects the
+tags, attributes, classes and ids used above the fold (the header plus the
+first <section> of <main>) and keeps only the rules of css/tw.css that can
+match them, leaving out states that never apply at first paint (:hover,
+:focus, ...) and pseudo-elements of elements not on the page. The result
+goes to static/css/critical/<url name>.css.
+
+`{% stylesheet "css/tw.css" %}` (templatetags/critical_css.py) inlines that
+file for the current url name and loads the full stylesheet without
+blocking rendering.
+"""
+import re
+from html.parser import HTMLParser
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import ImproperlyConfigured
+
+PAGES = ("home", "about", "gallery", "contact", "donate")
+CRITICAL_DIR = "css/critical"
+STYLESHEET = "css/tw.css"
+# Classes set by JavaScript before first paint (theme.js)
+ALWAYS_USED = {"dark"}
+# At-rules whose blocks hold style rules; anything else (@font-face,
+# @keyframes, ...) is left to the full stylesheet
+NESTED_AT_RULES = ("@media", "@supports")
+
+# Pages whose critical CSS grows past this (gzip of it is ~1/4) are
+# reported by the build: the first round trip only carries ~14 KB
+MAX_BYTES = 14 * 1024
+# Interaction states and pseudo-elements that play no part in first paint
+SKIPPED_STATES = re.compile(
+    r":(?:hover|focus|focus-visible|focus-within|active)\b"
+    r"|::(?:backdrop|placeholder|selection|file-selector-button|-webkit-|-moz-)"
+)
+
+CLASS_RE = re.compile(r"\.((?:\\.|[\w-])+)")
+ID_RE = re.compile(r"#((?:\\.|[\w-])+)")
+ESCAPE_RE = re.compile(r"\\(.)")
+# Type selectors: a name at the start of a compound selector
+TAG_RE = re.compile(r"(?:^|[\s>+~])([a-z][a-z0-9]*)")
+ATTR_RE = re.compile(r"\[([\w-]+)(?:(\W?=)\s*['\"]?([^'\"\]]*)['\"]?)?\s*\]")
+
+_loaded = {}
+
+
+def critical_path(name):
+    return f"{CRITICAL_DIR}/{name}.css"
+
+
+# ---------------------------
+# Above-the-fold markup
+# ---------------------------
+class FoldParser(HTMLParser):
+    """Collects tags, attributes, classes and ids until the first <section> in <main> closes."""
+
+    def __init__(self):
+        super().__init__()
+        self.classes, self.ids = set(ALWAYS_USED), set()
+        self.tags, self.attrs = set(), set()
+        self.in_main = False
+        self.section_depth = 0
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        attrs = dict(attrs)
+        self.tags.add(tag)
+        self.attrs.update(attrs)
+        self.attrs.update((name, value) for name, value in attrs.items() if value is not None)
+        self.classes.update((attrs.get("class") or "").split())
+        if attrs.get("id"):
+            self.ids.add(attrs["id"])
+        if tag == "main":
+            self.in_main = True
+        elif tag == "section" and self.in_main:
+            self.section_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag == "section" and self.section_depth:
+            self.section_depth -= 1
+            self.done = self.section_depth == 0
+
+
+def used_names(html):
+    """What the fold uses: {"classes", "ids", "tags", "attrs"} as sets."""
+    parser = FoldParser()
+    parser.feed(html)
+    return {"classes": parser.classes, "ids": parser.ids, "tags": parser.tags, "attrs": parser.attrs}
+
+
+# ---------------------------
+# Stylesheet filtering
+# ---------------------------
+def _blocks(css):
+    """Top-level (prelude, body) pairs of a stylesheet or at-rule body."""
+    depth, start, prelude = 0, 0, None
+    i, n = 0, len(css)
+    while i < n:
+        ch = css[i]
+        if ch in "\"'":
+            i = css.find(ch, i + 1)
+            if i == -1:
+                break
+        elif ch == "{":
+            if depth == 0:
+                prelude, start = css[start:i].strip(), i + 1
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                yield prelude, css[start:i]
+                start = i + 1
+        elif ch == ";" and depth == 0:
+            start = i + 1  # statement at-rules (@charset, @import)
+        i += 1
+
+
+def _split_selectors(prelude):
+    parts, depth, current = [], 0, ""
+    for ch in prelude:
+        if ch in "([":
+            depth += 1
+        elif ch in ")]":
+            depth -= 1
+        if ch == "," and depth == 0:
+            parts.append(current)
+            current = ""
+        else:
+            current += ch
+    parts.append(current)
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _attr_present(name, op, value, attrs):
+    if op == "=":
+        return (name, value) in attrs
+    return name in attrs
+
+
+def _selector_matches(selector, used):
+    if SKIPPED_STATES.search(selector):
+        return False
+    # Ignore what is inside :not(...) etc.; only required names count
+    required = re.sub(r":(?:not|where|is|has)\((?:[^()]|\([^()]*\))*\)", "", selector)
+    return (
+        all(ESCAPE_RE.sub(r"\1", c) in used["classes"] for c in CLASS_RE.findall(required))
+        and all(ESCAPE_RE.sub(r"\1", i) in used["ids"] for i in ID_RE.findall(required))
+        and all(tag in used["tags"] for tag in TAG_RE.findall(re.sub(r"\[[^\]]*\]", "", required)))
+        and all(_attr_present(*attr, used["attrs"]) for attr in ATTR_RE.findall(required))
+    )
+
+
+def extract(css, used):
+    """Rules of `css` that can match what used_names() found."""
+    out = []
+    for prelude, body in _blocks(css):
+        if prelude.startswith("@"):
+            if prelude.startswith(NESTED_AT_RULES):
+                inner = extract(body, used)
+                if inner:
+                    out.append(f"{prelude}{{{inner}}}")
+            continue
+        selectors = [s for s in _split_selectors(prelude) if _selector_matches(s, used)]
+        if selectors:
+            out.append(f"{','.join(selectors)}{{{body}}}")
+    return "".join(out)
+
+
+def build(html, css):
+    critical = extract(css, used_names(html))
+    return critical.replace("</", "<\\/")  # never close the inline <style>
+
+
+# ---------------------------
+# Runtime
+# ---------------------------
+def read_static(path):
+    """Contents of a static file: the collected copy, or the source file in DEBUG."""
+    found = settings.DEBUG and finders.find(path)
+    if not found:
+        try:
+            with staticfiles_storage.open(path) as fh:
+                return fh.read().decode()
+        except (FileNotFoundError, ImproperlyConfigured):
+            found = finders.find(path)
+    if found:
+        with open(found, encoding="utf-8") as fh:
+            return fh.read()
+    return ""
+
+
+def load(name):
+    """Critical CSS for a url name ("" if none was built); cached unless DEBUG."""
+    if name not in PAGES:
+        return ""
+    if settings.DEBUG or name not in _loaded:
+        _loaded[name] = read_static(critical_path(name))
+    return _loaded[name]
@@ -0,0 +1,154 @@
+"""
+Streaming CSV / JSON Lines export of content tables.
+
+Rows are read with values_list().iterator(chunk_size=...) and encoded one
+at a time, so memory stays flat however large the table is. Used by the
+admin export view (StreamingHttpResponse) and `manage.py export_content`.
+
+The querysets behind the admin lists live here too, so an export holds
+exactly the rows (and order) the list shows for the same filters.
+"""
+import csv
+import datetime
+import json
+
+from django.db.models import Q
+
+from . import search
+from .models import ContactMessage, Event, Gallery, News, Program
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# export name -> (model, columns)
+EXPORTS = {
+    "messages": (ContactMessage, ("id", "created_at", "name", "email", "subject", "message",
+                                  "is_read", "read_at", "is_archived", "ip_address", "user_agent")),
+    "programs": (Program, ("id", "title", "description", "image", "is_active", "created_at", "updated_at")),
+    "news": (News, ("id", "title", "content", "image", "is_published", "created_at", "updated_at")),
+    "events": (Event, ("id", "title", "event_date", "location", "description", "image",
+                       "is_published", "created_at", "updated_at")),
+    "gallery": (Gallery, ("id", "title", "category", "description", "image", "is_published", "created_at")),
+}
+
+# format -> (content type, file extension)
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "jsonl": ("application/x-ndjson; charset=utf-8", "jsonl"),
+}
+
+# Spreadsheet apps run cells starting with these as formulas; contact form
+# fields are visitor input, so such cells get a leading quote.
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+# ---------------------------
+# Admin list filters
+# ---------------------------
+PROGRAMS_ORDERING = ("-id",)
+NEWS_ORDERING = ("-updated_at", "-id")
+EVENTS_ORDERING = ("-event_date", "-id")
+GALLERY_ORDERING = ("-created_at", "-id")  # your model lacks updated_at
+MESSAGES_ORDERING = ("-created_at", "-id")
+
+
+def _searched(model, q):
+    qs = model.objects.all()
+    if q:
+        qs = search.filter_queryset(qs, q)
+    return qs
+
+
+def programs_queryset(q=""):
+    return _searched(Program, q)
+
+
+def news_queryset(q=""):
+    return _searched(News, q)
+
+
+def events_queryset(q=""):
+    return _searched(Event, q)
+
+
+def gallery_queryset(q=""):
+    return _searched(Gallery, q)
+
+
+def messages_queryset(q="", status=""):
+    qs = ContactMessage.objects.all()
+
+    if q:
+        qs = qs.filter(
+            Q(subject__icontains=q) |
+            Q(message__icontains=q) |
+            Q(name__icontains=q) |
+            Q(email__icontains=q)
+        )
+
+    if status == "archived":
+        return qs.filter(is_archived=True)
+    qs = qs.filter(is_archived=False)
+    if status == "read":
+        qs = qs.filter(is_read=True)
+    elif status == "unread":
+        qs = qs.filter(is_read=False)
+    return qs
+
+
+def export_queryset(name, q="", status=""):
+    """The rows list view `name` shows for these filters, in its order."""
+    if name == "messages":
+        return messages_queryset(q, status).order_by(*MESSAGES_ORDERING)
+    builder, ordering = {
+        "programs": (programs_queryset, PROGRAMS_ORDERING),
+        "news": (news_queryset, NEWS_ORDERING),
+        "events": (events_queryset, EVENTS_ORDERING),
+        "gallery": (gallery_queryset, GALLERY_ORDERING),
+    }[name]
+    return builder(q).order_by(*ordering)
+
+
+# ---------------------------
+# Encoding
+# ---------------------------
+class _Echo:
+    """File-like object whose write() returns the line instead of storing it."""
+    def write(self, value):
+        return value
+
+
+def _plain(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def _csv_cell(value):
+    value = _plain(value)
+    if value is None:
+        return ""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _rows(queryset, columns, chunk_size):
+    return queryset.values_list(*columns).iterator(chunk_size=chunk_size)
+
+
+def csv_lines(queryset, columns, chunk_size=DEFAULT_CHUNK_SIZE):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in _rows(queryset, columns, chunk_size):
+        yield writer.writerow([_csv_cell(v) for v in row])
+
+
+def jsonl_lines(queryset, columns, chunk_size=DEFAULT_CHUNK_SIZE):
+    for row in _rows(queryset, columns, chunk_size):
+        yield json.dumps({c: _plain(v) for c, v in zip(columns, row)}, ensure_ascii=False) + "\n"
+
+
+def lines(fmt, queryset, columns, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Encoded lines (str) of `queryset` in `fmt` ("csv" or "jsonl")."""
+    encode = csv_lines if fmt == "csv" else jsonl_lines
+    return encode(queryset, columns, chunk_size)
@@ -0,0 +1,153 @@
+"""
+Resized WebP/JPEG derivatives for uploaded images.
+
+An upload such as ``gallery/photo.png`` gets siblings like
+``gallery/derivatives/photo-640w.webp`` and ``photo-640w.jpg`` for every
+width in DERIVATIVE_WIDTHS that is not larger than the original. Names are
+derived from the original and the widths from its stored `image_width`, so
+a srcset costs no storage listing: one cached exists() check tells whether
+the job queue has built the files yet.
+"""
+import base64
+import posixpath
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+DERIVATIVE_DIR = "derivatives"
+DERIVATIVE_WIDTHS = (320, 640, 960, 1280, 1920)
+# extension -> (Pillow format, save options)
+DERIVATIVE_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 6}),
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+READY_CACHE_KEY = "imgderiv:ready:{}"
+# Derivatives still missing are re-checked after this long: the job queue
+# may build them in another process, whose cache entry this one can't see
+MISSING_TIMEOUT = 60
+# Blurred preview shown while the real image loads (a few hundred bytes)
+PLACEHOLDER_WIDTH = 16
+PLACEHOLDER_OPTIONS = {"quality": 50}
+EXIF_ORIENTATION = 0x0112
+
+
+def derivative_name(name, width, ext):
+    folder, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(folder, DERIVATIVE_DIR, f"{stem}-{width}w.{ext}")
+
+
+def target_widths(original_width):
+    # Always keep one rendition at (or capped to) the original size
+    largest = min(original_width, DERIVATIVE_WIDTHS[-1])
+    return [w for w in DERIVATIVE_WIDTHS if w < largest] + [largest]
+
+
+def _encode(img, width, ext):
+    fmt, options = DERIVATIVE_FORMATS[ext]
+    resized = img.copy()
+    if resized.width > width:
+        height = max(1, round(resized.height * width / resized.width))
+        resized = resized.resize((width, height), Image.LANCZOS)
+    if fmt == "JPEG" and resized.mode != "RGB":
+        resized = resized.convert("RGB")
+    buf = BytesIO()
+    resized.save(buf, fmt, **options)
+    return buf.getvalue()
+
+
+def generate_derivatives(fieldfile):
+    """Write all derivatives for ``fieldfile``; returns the widths produced."""
+    if not fieldfile:
+        return []
+    storage = fieldfile.storage
+    with storage.open(fieldfile.name, "rb") as fh:
+        img = Image.open(fh)
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        img.load()
+
+    widths = target_widths(img.width)
+    for width in widths:
+        for ext in DERIVATIVE_FORMATS:
+            name = derivative_name(fieldfile.name, width, ext)
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save(name, ContentFile(_encode(img, width, ext)))
+
+    cache.set(READY_CACHE_KEY.format(fieldfile.name), True, None)
+    return widths
+
+
+def delete_derivatives(storage, name, original_width=None):
+    """Remove the derivatives of upload `name` (every standard width if its size is unknown)."""
+    widths = target_widths(original_width) if original_width else DERIVATIVE_WIDTHS
+    for width in widths:
+        for ext in DERIVATIVE_FORMATS:
+            storage.delete(derivative_name(name, width, ext))
+    cache.delete(READY_CACHE_KEY.format(name))
+
+
+def available_widths(fieldfile):
+    """
+    Widths with derivatives on storage: target_widths() of the image_width
+    stored on the instance, once the derivatives have been built.
+    """
+    original_width = getattr(getattr(fieldfile, "instance", None), "image_width", None)
+    if not fieldfile or not original_width:
+        return []
+    widths = target_widths(original_width)
+    key = READY_CACHE_KEY.format(fieldfile.name)
+    ready = cache.get(key)
+    if ready is None:
+        # The largest JPEG is the last file generate_derivatives() writes
+        ready = fieldfile.storage.exists(derivative_name(fieldfile.name, widths[-1], "jpg"))
+        cache.set(key, ready, None if ready else MISSING_TIMEOUT)
+    return widths if ready else []
+
+
+def has_derivatives(fieldfile):
+    return bool(available_widths(fieldfile))
+
+
+def srcset(fieldfile, ext="webp"):
+    """``url 320w, url 640w, ...`` for the derivatives of ``fieldfile``."""
+    storage = getattr(fieldfile, "storage", None)
+    return ", ".join(
+        f"{storage.url(derivative_name(fieldfile.name, w, ext))} {w}w"
+        for w in available_widths(fieldfile)
+    )
+
+
+def intrinsic(fieldfile):
+    """
+    (width, height, placeholder data URI) of ``fieldfile`` as displayed,
+    i.e. with EXIF rotation applied. Works on a fresh upload before it is
+    saved to storage, so the values can be captured in pre_save.
+    """
+    if fieldfile._committed:
+        with fieldfile.storage.open(fieldfile.name, "rb") as fh:
+            return _intrinsic(fh)
+    fh = fieldfile.file
+    fh.seek(0)
+    try:
+        return _intrinsic(fh)
+    finally:
+        fh.seek(0)  # the upload is still to be written by FileField.pre_save
+
+
+def _intrinsic(fh):
+    img = Image.open(fh)
+    width, height = img.size
+    if img.getexif().get(EXIF_ORIENTATION) in (5, 6, 7, 8):
+        width, height = height, width
+    # JPEG: decode straight at a fraction of the size
+    img.draft("RGB", (PLACEHOLDER_WIDTH * 4, PLACEHOLDER_WIDTH * 4))
+    preview = ImageOps.exif_transpose(img).convert("RGB")
+    preview.thumbnail((PLACEHOLDER_WIDTH, PLACEHOLDER_WIDTH * 4))
+    buf = BytesIO()
+    preview.save(buf, "JPEG", **PLACEHOLDER_OPTIONS)
+    return width, height, "data:image/jpeg;base64," + base64.b64encode(buf.getvalue()).decode()
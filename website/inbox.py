@@ -0,0 +1,60 @@
+"""
+Unread contact-message counter and notification feed for the admin panel.
+
+The unread count (unread messages that are not archived) is materialized
+in the shared cache and adjusted by signals as messages arrive, are
+read/unread, archived or deleted, so showing the inbox badge costs no
+query. Bulk updates call invalidate(); the next read recounts once.
+"""
+from django.core.cache import cache
+
+from .models import ContactMessage
+
+UNREAD_KEY = "inbox:unread"
+FEED_KEY = "inbox:feed"
+FEED_SIZE = 4
+
+
+def unread_messages():
+    """What the badge counts: unread messages still in the inbox."""
+    return ContactMessage.objects.filter(is_read=False, is_archived=False)
+
+
+def counts_as_unread(is_read, is_archived):
+    return not is_read and not is_archived
+
+
+def unread_count():
+    count = cache.get(UNREAD_KEY)
+    if count is None:
+        count = unread_messages().count()
+        # add(): don't overwrite a value a concurrent signal just adjusted
+        cache.add(UNREAD_KEY, count, None)
+    return count
+
+
+def notification_feed():
+    """Newest unread messages as plain dicts (id, subject, name, email)."""
+    feed = cache.get(FEED_KEY)
+    if feed is None:
+        feed = list(
+            unread_messages()
+            .order_by("-created_at", "-id")
+            .values("id", "subject", "name", "email")[:FEED_SIZE]
+        )
+        cache.set(FEED_KEY, feed, None)
+    return feed
+
+
+def adjust_unread(delta):
+    cache.delete(FEED_KEY)
+    if not delta:
+        return
+    try:
+        cache.incr(UNREAD_KEY, delta)
+    except ValueError:
+        pass  # not materialized yet; unread_count() will count
+
+
+def invalidate():
+    cache.delete_many([UNREAD_KEY, FEED_KEY])
@@ -0,0 +1,270 @@
+"""
+Opt-in per-request instrumentation.
+
+Add "website.instrumentation.InstrumentationMiddleware" to MIDDLEWARE
+(after the session/auth middleware) to record, per view: total time, SQL
+query count, DB time and template render time. Each response carries a
+Server-Timing header (visible in the browser's network panel) and the
+numbers are aggregated into histograms shown on the admin Performance page.
+
+Each process keeps its histograms in memory and writes a snapshot of them
+to the cache every FLUSH_INTERVAL seconds (kept for RETENTION); the report
+merges the snapshots of every process, so with a shared cache (Redis,
+Memcached, database) it covers all workers and survives restarts.
+"""
+import os
+import socket
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.template import base as template_base
+
+# Upper bounds of the histogram buckets; the last bucket is open-ended
+TIME_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+FLUSH_INTERVAL = 5  # seconds
+RETENTION = 60 * 60 * 24 * 7
+SNAPSHOT_KEY = "instr:snapshot:{}"
+PROCESSES_KEY = "instr:processes"
+
+_local = threading.local()
+_lock = threading.Lock()
+_boot_id = uuid.uuid4().hex[:8]
+_last_flush = 0.0
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def as_dict(self):
+        return {"counts": self.counts, "total": self.total, "max": self.max}
+
+    def merge(self, data):
+        self.counts = [a + b for a, b in zip(self.counts, data["counts"])]
+        self.total += data["total"]
+        self.max = max(self.max, data["max"])
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th value (max for the open bucket)."""
+        n = sum(self.counts)
+        if not n:
+            return 0
+        target, seen = pct / 100 * n, 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+
+class ViewStats:
+    def __init__(self):
+        self.requests = 0
+        self.total_ms = Histogram(TIME_BUCKETS_MS)
+        self.db_ms = Histogram(TIME_BUCKETS_MS)
+        self.template_ms = Histogram(TIME_BUCKETS_MS)
+        self.queries = Histogram(QUERY_BUCKETS)
+
+    HISTOGRAMS = ("total_ms", "db_ms", "template_ms", "queries")
+
+    def as_dict(self):
+        return {"requests": self.requests, **{name: getattr(self, name).as_dict() for name in self.HISTOGRAMS}}
+
+    def merge(self, data):
+        self.requests += data["requests"]
+        for name in self.HISTOGRAMS:
+            getattr(self, name).merge(data[name])
+
+
+# This process's numbers since it started
+view_stats = defaultdict(ViewStats)
+
+
+def _process_id():
+    # pid read each time: workers forked after import share _boot_id
+    return f"{socket.gethostname()}:{os.getpid()}:{_boot_id}"
+
+
+def record(view, total_ms, db_ms, template_ms, queries):
+    with _lock:
+        stats = view_stats[view]
+        stats.requests += 1
+        stats.total_ms.add(total_ms)
+        stats.db_ms.add(db_ms)
+        stats.template_ms.add(template_ms)
+        stats.queries.add(queries)
+    if time.monotonic() - _last_flush >= FLUSH_INTERVAL:
+        flush()
+
+
+def flush():
+    """Write this process's snapshot to the cache and make sure the report can find it."""
+    global _last_flush
+    with _lock:
+        _last_flush = time.monotonic()
+        snapshot = {view: stats.as_dict() for view, stats in view_stats.items()}
+    process = _process_id()
+    cache.set(SNAPSHOT_KEY.format(process), snapshot, RETENTION)
+    # Read-modify-write: a concurrent flush may drop an id, which its
+    # process puts back on its next flush
+    processes = cache.get(PROCESSES_KEY) or []
+    if process not in processes:
+        cache.set(PROCESSES_KEY, [*processes, process], RETENTION)
+
+
+def merged_stats():
+    """{view: ViewStats} summed over every process snapshot still in the cache."""
+    if view_stats:
+        flush()
+    processes = cache.get(PROCESSES_KEY) or []
+    snapshots = cache.get_many([SNAPSHOT_KEY.format(p) for p in processes])
+    live = [p for p in processes if SNAPSHOT_KEY.format(p) in snapshots]
+    if len(live) < len(processes):
+        cache.set(PROCESSES_KEY, live, RETENTION)  # snapshots expired
+    merged = defaultdict(ViewStats)
+    for snapshot in snapshots.values():
+        for view, data in snapshot.items():
+            merged[view].merge(data)
+    return merged
+
+
+def instrumentation_report(limit=15):
+    """(slowest views by p95, views with the most queries on average), as lists of dicts."""
+    rows = [
+        {
+            "view": view,
+            "requests": s.requests,
+            "p50_ms": s.total_ms.percentile(50),
+            "p95_ms": s.total_ms.percentile(95),
+            "max_ms": round(s.total_ms.max, 1),
+            "avg_ms": round(s.total_ms.total / s.requests, 1),
+            "avg_db_ms": round(s.db_ms.total / s.requests, 1),
+            "avg_template_ms": round(s.template_ms.total / s.requests, 1),
+            "avg_queries": round(s.queries.total / s.requests, 1),
+            "max_queries": s.queries.max,
+            "histogram": list(zip([*map(str, s.total_ms.bounds), "more"], s.total_ms.counts)),
+        }
+        for view, s in merged_stats().items()
+        if s.requests
+    ]
+    slowest = sorted(rows, key=lambda r: (r["p95_ms"], r["avg_ms"]), reverse=True)[:limit]
+    most_queries = sorted(rows, key=lambda r: r["avg_queries"], reverse=True)[:limit]
+    return slowest, most_queries
+
+
+# ---------------------------
+# Collectors
+# ---------------------------
+class _QueryTimer:
+    """connection.execute_wrapper() callable: counts queries and their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+
+# Template.render is wrapped only while instrumented requests are running
+# (template_rendered is only sent under the test runner) and restored after
+_original_render = None
+_active_requests = 0
+
+
+def _timed_render(self, context):
+    timer = getattr(_local, "template_timer", None)
+    if timer is None:
+        return _original_render(self, context)
+    # Only the outermost render is timed: {% include %}/{% extends %} nest
+    timer["depth"] += 1
+    start = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        timer["depth"] -= 1
+        if not timer["depth"]:
+            timer["seconds"] += time.perf_counter() - start
+
+
+def _start_template_timing():
+    global _original_render, _active_requests
+    with _lock:
+        if not _active_requests:
+            _original_render = template_base.Template.render
+            template_base.Template.render = _timed_render
+        _active_requests += 1
+
+
+def _stop_template_timing():
+    global _active_requests
+    with _lock:
+        _active_requests -= 1
+        if not _active_requests:
+            template_base.Template.render = _original_render
+
+
+def _server_timing_allowed(request):
+    # "staff" (default): only logged-in staff see timings; "all"; "off"
+    mode = getattr(settings, "SERVER_TIMING", "staff")
+    if mode == "all":
+        return True
+    user = getattr(request, "user", None)
+    return mode == "staff" and bool(user and user.is_staff)
+
+
+class InstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = _QueryTimer()
+        _local.template_timer = {"seconds": 0.0, "depth": 0}
+        _start_template_timing()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(timer))
+                response = self.get_response(request)
+        finally:
+            _stop_template_timing()
+            template_seconds = _local.template_timer["seconds"]
+            _local.template_timer = None
+        total_ms = (time.perf_counter() - start) * 1000
+        db_ms = timer.seconds * 1000
+        template_ms = template_seconds * 1000
+
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "<unresolved>"
+        record(view, total_ms, db_ms, template_ms, timer.count)
+
+        if _server_timing_allowed(request):
+            response["Server-Timing"] = ", ".join([
+                f'db;dur={db_ms:.1f};desc="{timer.count} queries"',
+                f"tpl;dur={template_ms:.1f}",
+                f"total;dur={total_ms:.1f}",
+            ])
+        return response
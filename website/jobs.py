@@ -0,0 +1,210 @@
+"""
+DB-backed queue for image processing.
+
+Uploads are saved by the admin views as before; a post_save signal only
+enqueues an ImageJob, and `manage.py process_image_jobs` runs PIPELINE on
+it outside the request. Failed jobs are retried with exponential backoff
+until `max_attempts` is reached.
+"""
+import logging
+from datetime import timedelta
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import ExifTags, Image, ImageOps
+
+from .caching import bump_instance
+from .images import generate_derivatives
+from .models import ImageJob
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_SECONDS = 30
+DEFAULT_CONCURRENCY = 2
+
+# Pillow format -> save options used when re-encoding without metadata
+STRIP_SAVE_OPTIONS = {
+    "JPEG": {"quality": 90, "optimize": True, "progressive": True},
+    "PNG": {"optimize": True},
+    "WEBP": {"quality": 90},
+}
+# Image.info keys Pillow uses for embedded XMP
+XMP_KEYS = {"xmp", "XML:com.adobe.xmp"}
+
+
+def concurrency():
+    return getattr(settings, "IMAGE_JOBS_CONCURRENCY", DEFAULT_CONCURRENCY)
+
+
+def enqueue(instance, field_name="image"):
+    image = getattr(instance, field_name)
+    return ImageJob.objects.create(
+        model_label=instance._meta.label_lower,
+        object_id=instance.pk,
+        image_name=image.name,
+    )
+
+
+def is_queued(instance, field_name="image"):
+    return ImageJob.objects.filter(
+        model_label=instance._meta.label_lower,
+        object_id=instance.pk,
+        image_name=getattr(instance, field_name).name,
+        status__in=[ImageJob.Status.PENDING, ImageJob.Status.RUNNING],
+    ).exists()
+
+
+# ---------------------------
+# Pipeline steps
+# ---------------------------
+def strip_metadata(instance, fieldfile):
+    """
+    Re-encode the original without EXIF/XMP (GPS, camera serials, ...),
+    applying the EXIF orientation first so the picture stays upright.
+    Files that carry no metadata (e.g. already stripped by an earlier
+    attempt) are left alone.
+    """
+    storage = fieldfile.storage
+    with storage.open(fieldfile.name, "rb") as fh:
+        img = Image.open(fh)
+        fmt = img.format
+        exif = img.getexif()
+        if fmt not in STRIP_SAVE_OPTIONS or not (exif or XMP_KEYS & img.info.keys()):
+            return
+        options = dict(STRIP_SAVE_OPTIONS[fmt])
+        if exif.get(ExifTags.Base.Orientation, 1) != 1:
+            img = ImageOps.exif_transpose(img)
+        elif fmt == "JPEG":
+            options["quality"] = "keep"  # no re-quantisation when not rotated
+        img.load()
+        buf = BytesIO()
+        img.save(buf, fmt, **options)
+
+    old_name = fieldfile.name
+    content = ContentFile(buf.getvalue())
+    if instance.pk is None:
+        # Not saved yet (import_gallery): no row or page refers to the file
+        # and the caller still has the source, so keep its name
+        storage.delete(old_name)
+        fieldfile.name = storage.save(old_name, content)
+        return
+
+    # The clean copy goes under a new name and the original is only deleted
+    # once the row points at it, so a failed save leaves the upload intact.
+    new_name = storage.save(old_name, content)
+    changes = {fieldfile.field.name: new_name}
+    if any(f.name == "updated_at" for f in instance._meta.concrete_fields):
+        # Detail-page ETag/Last-Modified come from updated_at; cached copies
+        # must not keep pointing at the deleted original
+        changes["updated_at"] = timezone.now()
+    # update() so the rename doesn't re-trigger post_save
+    type(instance).objects.filter(pk=instance.pk).update(**changes)
+    bump_instance(instance)
+    fieldfile.name = new_name
+    if new_name != old_name:  # storages that overwrite in place return the same name
+        storage.delete(old_name)
+
+
+def build_derivatives(instance, fieldfile):
+    generate_derivatives(fieldfile)
+
+
+PIPELINE = [strip_metadata, build_derivatives]
+
+
+# ---------------------------
+# Worker side
+# ---------------------------
+def claim_next():
+    """Move the oldest due job to RUNNING and return it (None when nothing is due)."""
+    if connection.features.has_select_for_update_skip_locked:
+        return _claim_skip_locked()
+    while True:
+        # No transaction around the pair: on SQLite two workers each holding a
+        # read lock and both upgrading to write fail with "database is locked".
+        # The conditional UPDATE is a single write; if another worker got the
+        # row first it changes nothing and we look again.
+        pk = _due().values_list("pk", flat=True).first()
+        if pk is None:
+            return None
+        if _mark_running(ImageJob.objects.filter(pk=pk, status=ImageJob.Status.PENDING)):
+            return ImageJob.objects.get(pk=pk)
+
+
+def _claim_skip_locked():
+    with transaction.atomic():
+        job = _due().select_for_update(skip_locked=True).first()
+        if job is None:
+            return None
+        _mark_running(ImageJob.objects.filter(pk=job.pk))
+    job.refresh_from_db()
+    return job
+
+
+def _due():
+    return ImageJob.objects.filter(
+        status=ImageJob.Status.PENDING, run_after__lte=timezone.now()
+    ).order_by("run_after", "id")
+
+
+def _mark_running(qs):
+    return qs.update(status=ImageJob.Status.RUNNING, attempts=F("attempts") + 1, started_at=timezone.now())
+
+
+def run_job(job):
+    try:
+        model = apps.get_model(job.model_label)
+        instance = model.objects.filter(pk=job.object_id).first()
+        if instance is None:
+            _finish(job, ImageJob.Status.DONE, "Object deleted before processing.")
+            return job
+        fieldfile = instance.image
+        if not fieldfile or fieldfile.name != job.image_name:
+            # Image cleared, or replaced by a newer upload (which has its own job)
+            _finish(job, ImageJob.Status.DONE, "Image replaced before processing.")
+            return job
+        for step in PIPELINE:
+            step(instance, fieldfile)
+            if fieldfile.name != job.image_name:
+                # strip_metadata renamed the original; a retry must still match it
+                job.image_name = fieldfile.name
+                job.save(update_fields=["image_name", "updated_at"])
+        # Pages rendered before the derivatives existed have no srcset
+        bump_instance(instance)
+    except Exception as exc:  # noqa: BLE001 - any failure is retried/recorded
+        logger.exception("Image job %s failed", job.pk)
+        _fail(job, exc)
+    else:
+        _finish(job, ImageJob.Status.DONE)
+    return job
+
+
+def _finish(job, status, note=""):
+    job.status = status
+    job.last_error = note
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "last_error", "finished_at", "updated_at"])
+
+
+def _fail(job, exc):
+    job.last_error = f"{type(exc).__name__}: {exc}"
+    if job.attempts >= job.max_attempts:
+        job.status = ImageJob.Status.FAILED
+        job.finished_at = timezone.now()
+    else:
+        job.status = ImageJob.Status.PENDING
+        job.run_after = timezone.now() + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (job.attempts - 1))
+    job.save(update_fields=["status", "last_error", "finished_at", "run_after", "updated_at"])
+
+
+def requeue_stale(older_than):
+    """Put RUNNING jobs abandoned by a crashed worker back on the queue."""
+    return ImageJob.objects.filter(
+        status=ImageJob.Status.RUNNING,
+        started_at__lt=timezone.now() - older_than,
+    ).update(status=ImageJob.Status.PENDING, run_after=timezone.now())
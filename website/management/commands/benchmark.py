@@ -0,0 +1,122 @@
+import json
+import platform
+from pathlib import Path
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from django.utils import timezone
+
+from website import benchmarks
+
+
+class Command(BaseCommand):
+    help = "Benchmark public and admin views on seeded datasets; compare with a JSON baseline."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="tiny,small",
+                            help=f"Comma-separated dataset sizes: {', '.join(benchmarks.SIZES)}.")
+        parser.add_argument("--repeat", type=int, default=20, help="Timed requests per view.")
+        parser.add_argument("--warm", action="store_true",
+                            help="Measure cached responses (default: clear the cache before each request). "
+                                 "Either way the run uses a private in-memory cache, never CACHES.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", "-o", default="benchmark-results.json")
+        parser.add_argument("--baseline", help="Baseline JSON to compare against; exits non-zero on regressions.")
+        parser.add_argument("--save-baseline", action="store_true",
+                            help="Also write the results to --baseline (creating it).")
+
+    def handle(self, *args, **options):
+        sizes = [s.strip() for s in options["sizes"].split(",") if s.strip()]
+        unknown = set(sizes) - set(benchmarks.SIZES)
+        if unknown:
+            raise CommandError(f"Unknown size(s): {', '.join(sorted(unknown))}")
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1")
+
+        results = {size: self._run_size(size, options) for size in sizes}
+        report = {
+            "meta": {
+                "created": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "repeat": options["repeat"],
+                "cache": "warm" if options["warm"] else "cold",
+                "seed": options["seed"],
+            },
+            "results": results,
+        }
+        Path(options["output"]).write_text(json.dumps(report, indent=2))
+        self._print(results)
+        self.stdout.write(self.style.SUCCESS(f"✓ Results written to {options['output']}"))
+
+        problems = self._query_problems(results)
+
+        baseline_path = options["baseline"] and Path(options["baseline"])
+        if baseline_path and (options["save_baseline"] or not baseline_path.exists()):
+            baseline_path.write_text(json.dumps(report, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"✓ Baseline saved to {baseline_path}"))
+        elif baseline_path:
+            baseline = json.loads(baseline_path.read_text())["results"]
+            regressions = benchmarks.compare(results, baseline)
+            for size, view, metric, old, new in regressions:
+                self.stdout.write(self.style.ERROR(f"REGRESSION {size}/{view} {metric}: {old} -> {new}"))
+            problems += len(regressions)
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS(f"✓ No regressions against {baseline_path}"))
+
+        if problems:
+            raise CommandError(f"{problems} problem(s) found")
+
+    def _query_problems(self, results):
+        """Print N+1 detections and views whose queries grow with the data; returns how many."""
+        problems = 0
+        for size, views in results.items():
+            for view, metrics in views.items():
+                for detection in metrics["nplusone"]:
+                    self.stdout.write(self.style.ERROR(f"{size}: {detection}"))
+                    problems += 1
+        for view, counts in benchmarks.query_growth(results):
+            growth = ", ".join(f"{size}={n}" for size, n in counts.items())
+            self.stdout.write(self.style.ERROR(f"QUERY GROWTH {view}: queries grow with rows ({growth})"))
+            problems += 1
+        return problems
+
+    def _run_size(self, size, options):
+        """Seed a fresh test database with `size` rows and measure every scenario."""
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Dataset '{size}': {benchmarks.SIZES[size]}"))
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            # Seeding bumps cache generations and cold runs clear the cache;
+            # neither may touch the configured CACHES
+            with override_settings(CACHES=benchmarks.isolated_caches()):
+                rows = dict(benchmarks.SIZES[size])
+                staff = rows.pop("users", 0)
+                call_command("seed_scale", seed=options["seed"], images=0, stdout=self.stdout, **rows)
+                User = get_user_model()
+                user = User.objects.create_superuser("benchmark", "benchmark@example.com", None)
+                group = Group.objects.create(name="Benchmark editors")
+                for n in range(staff):
+                    User.objects.create_user(f"staff{n}", is_staff=True).groups.add(group)
+                runner = benchmarks.Runner(user, repeat=options["repeat"], cold=not options["warm"])
+                return runner.run()
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+    def _print(self, results):
+        header = f"{'size':<8} {'view':<18} {'status':>6} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8} {'peak KiB':>9}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for size, views in results.items():
+            for view, m in views.items():
+                self.stdout.write(
+                    f"{size:<8} {view:<18} {m['status']:>6} {m['p50_ms']:>8} {m['p95_ms']:>8} "
+                    f"{m['queries']:>8} {m['peak_kib']:>9}"
+                )
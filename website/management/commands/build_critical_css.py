@@ -0,0 +1,57 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from website import critical_css
+
+
+# Pages render against a private cache: clearing it between pages must not
+# touch the site's real cache (sessions may live there)
+RENDER_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "critical-css"},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Extract above-the-fold CSS for the public pages into static/css/critical/ "
+        "(inlined by {% stylesheet %}). Run after rebuilding css/tw.css."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--static", default=str(Path(settings.BASE_DIR) / "static"),
+                            help="Static source folder to write css/critical/ into.")
+
+    def handle(self, *args, **options):
+        source = finders.find(critical_css.STYLESHEET)
+        if not source:
+            raise CommandError(f"{critical_css.STYLESHEET} not found; run `npm run build:css` first.")
+        css = Path(source).read_text(encoding="utf-8")
+        out_dir = Path(options["static"]) / critical_css.CRITICAL_DIR
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        setup_test_environment()
+        try:
+            with override_settings(CACHES=RENDER_CACHES):
+                client = Client()
+                for name in critical_css.PAGES:
+                    caches["default"].clear()  # render the current markup, not a cached page
+                    response = client.get(reverse(f"website:{name}"))
+                    if response.status_code != 200:
+                        raise CommandError(f"{name}: HTTP {response.status_code}")
+                    critical = critical_css.build(response.content.decode(), css)
+                    (out_dir / f"{name}.css").write_text(critical, encoding="utf-8")
+                    self.stdout.write(f"  {name:<8} {len(critical) / 1024:5.1f} KB (of {len(css) / 1024:.0f} KB)")
+                    if len(critical) > critical_css.MAX_BYTES:
+                        self.stdout.write(self.style.WARNING(
+                            f"  {name}: over {critical_css.MAX_BYTES // 1024} KB, trim what renders above the fold"))
+        finally:
+            teardown_test_environment()
+
+        self.stdout.write(self.style.SUCCESS(f"✓ Critical CSS written to {out_dir}"))
@@ -0,0 +1,103 @@
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+ICON_CLASS = re.compile(r"\bbi-([a-z0-9]+(?:-[a-z0-9]+)*)\b")
+GLYPH_RULE = re.compile(r'\.bi-([a-z0-9-]+)::before\s*\{\s*content:\s*"\\([0-9a-f]+)"')
+SCANNED = ("*.html", "*.js", "*.py")
+
+ICONS_CSS = """\
+/* Generated by `python manage.py build_icons` from bootstrap-icons {version}; do not edit. */
+@font-face {{
+  font-display: swap;
+  font-family: "bootstrap-icons";
+  src: url("../fonts/bootstrap-icons-subset.woff2") format("woff2");
+}}
+.bi::before,
+[class^="bi-"]::before,
+[class*=" bi-"]::before {{
+  display: inline-block;
+  font-family: bootstrap-icons !important;
+  font-style: normal;
+  font-weight: normal !important;
+  font-variant: normal;
+  text-transform: none;
+  line-height: 1;
+  vertical-align: -.125em;
+  -webkit-font-smoothing: antialiased;
+  -moz-osx-font-smoothing: grayscale;
+}}
+{rules}
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Subset the Bootstrap Icons font to the icons used in templates/static JS "
+        "and write static/src/icons.css (bundled into css/tw.css by `npm run build`)."
+    )
+
+    def add_arguments(self, parser):
+        base = Path(settings.BASE_DIR)
+        parser.add_argument("--package", default=str(base / "node_modules" / "bootstrap-icons"),
+                            help="Installed bootstrap-icons package (npm install).")
+        parser.add_argument("--static", default=str(base / "static"),
+                            help="Static source folder to write src/icons.css and fonts/ into.")
+
+    def handle(self, *args, **options):
+        try:
+            from fontTools import subset
+        except ImportError:
+            raise CommandError("build_icons needs fonttools and brotli: pip install fonttools brotli")
+
+        package = Path(options["package"])
+        font_dir = package / "font"
+        if not (font_dir / "bootstrap-icons.css").exists():
+            raise CommandError(f"{font_dir} not found; run `npm install` first.")
+
+        glyphs = dict(GLYPH_RULE.findall((font_dir / "bootstrap-icons.css").read_text()))
+        used = self.used_icons()
+        unknown = sorted(used - glyphs.keys())
+        for name in unknown:
+            self.stdout.write(self.style.WARNING(f"bi-{name}: not a Bootstrap icon, skipped"))
+        used = sorted(used & glyphs.keys())
+        if not used:
+            raise CommandError("No Bootstrap icons found in templates.")
+
+        static = Path(options["static"])
+        out_font = static / "fonts" / "bootstrap-icons-subset.woff2"
+        out_font.parent.mkdir(parents=True, exist_ok=True)
+
+        opts = subset.Options()
+        opts.flavor = "woff2"
+        opts.layout_features = []
+        opts.name_IDs = []
+        font = subset.load_font(str(font_dir / "fonts" / "bootstrap-icons.woff2"), opts)
+        subsetter = subset.Subsetter(opts)
+        subsetter.populate(unicodes=[int(glyphs[name], 16) for name in used])
+        subsetter.subset(font)
+        subset.save_font(font, str(out_font), opts)
+
+        version = re.search(r'"version":\s*"([^"]+)"', (package / "package.json").read_text())
+        rules = "\n".join(f'.bi-{name}::before {{ content: "\\{glyphs[name]}"; }}' for name in used)
+        (static / "src").mkdir(parents=True, exist_ok=True)
+        (static / "src" / "icons.css").write_text(
+            ICONS_CSS.format(version=version.group(1) if version else "", rules=rules)
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {len(used)} icons, {out_font.stat().st_size // 1024} KB font -> {out_font}"
+        ))
+
+    def used_icons(self):
+        """bi-* names in the project templates, static JS and Python sources."""
+        base = Path(settings.BASE_DIR)
+        roots = [base / "templates", base / "static" / "js", base / "website", base / "admin_panel"]
+        used = set()
+        for root in roots:
+            for pattern in SCANNED:
+                for path in root.rglob(pattern):
+                    used.update(ICON_CLASS.findall(path.read_text(errors="ignore")))
+        return used
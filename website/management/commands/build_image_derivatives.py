@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from website.images import generate_derivatives, has_derivatives, intrinsic
+from website.signals import IMAGE_MODELS
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate resized WebP/JPEG derivatives for existing uploads, and fill in "
+        "their width/height/placeholder where missing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true",
+                            help="Rebuild derivatives even if they already exist.")
+
+    def handle(self, *args, **options):
+        force = options["force"]
+        built = skipped = failed = sized = 0
+
+        for model in IMAGE_MODELS:
+            qs = model.objects.exclude(image="").exclude(image__isnull=True).only("pk", "image", "image_width")
+            for obj in qs.iterator(chunk_size=500):
+                if obj.image_width is None:
+                    try:
+                        width, height, placeholder = intrinsic(obj.image)
+                    except (OSError, ValueError) as exc:
+                        self.stdout.write(self.style.WARNING(f"{obj.image.name}: {exc}"))
+                    else:
+                        # update() so this doesn't re-run the save signals
+                        model.objects.filter(pk=obj.pk).update(
+                            image_width=width, image_height=height, image_placeholder=placeholder,
+                        )
+                        obj.image_width = width  # has_derivatives() derives the widths from it
+                        sized += 1
+                if not force and has_derivatives(obj.image):
+                    skipped += 1
+                    continue
+                try:
+                    generate_derivatives(obj.image)
+                    built += 1
+                except (OSError, ValueError) as exc:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f"{obj.image.name}: {exc}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Derivatives built: {built}, skipped: {skipped}, failed: {failed}; sizes filled: {sized}"
+        ))
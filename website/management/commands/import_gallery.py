@@ -0,0 +1,199 @@
+import csv
+import hashlib
+import os
+import posixpath
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import django
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from PIL import Image, UnidentifiedImageError
+
+from website import jobs, search
+from website.caching import bump_generation
+from website.images import intrinsic
+from website.models import Gallery
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+# Content-addressed names: re-importing the same photo maps to the same row,
+# which is what makes an interrupted run safe to start again.
+IMPORT_DIR = "gallery/imported"
+
+_existing = frozenset()
+
+
+def _init_worker(existing):
+    global _existing
+    django.setup()  # no-op when forked, needed with the "spawn" start method
+    _existing = existing
+
+
+def _storage_name(data, suffix):
+    return posixpath.join(IMPORT_DIR, hashlib.sha1(data).hexdigest()[:20] + suffix)
+
+
+def _prepare(entry):
+    """
+    Worker: store one image and run the upload pipeline on it (metadata
+    stripping + derivatives). Returns (status, entry, image name or error,
+    intrinsic size fields).
+    """
+    try:
+        data = Path(entry["path"]).read_bytes()
+        suffix = Path(entry["path"]).suffix.lower().replace(".jpeg", ".jpg")
+        name = _storage_name(data, suffix)
+        if name in _existing:
+            return "skipped", entry, name, {}
+        with Image.open(ContentFile(data)) as img:
+            img.verify()
+
+        gallery = Gallery(image=name)
+        storage = gallery.image.storage
+        if storage.exists(name):  # left over from an interrupted run
+            storage.delete(name)
+        storage.save(name, ContentFile(data))
+        for step in jobs.PIPELINE:
+            step(gallery, gallery.image)
+        width, height, placeholder = intrinsic(gallery.image)
+        size = {"image_width": width, "image_height": height, "image_placeholder": placeholder}
+        # The pipeline keeps the name of an unsaved upload, but the row must
+        # point at whatever file it left behind
+        return "ok", entry, gallery.image.name, size
+    except (OSError, ValueError, UnidentifiedImageError, Image.DecompressionBombError) as exc:
+        return "failed", entry, f"{type(exc).__name__}: {exc}", {}
+
+
+def _title_from_path(path):
+    return Path(path).stem.replace("_", " ").replace("-", " ").strip().title()[:200]
+
+
+class Command(BaseCommand):
+    help = "Bulk-import gallery photos from a directory or a CSV manifest (resumable)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="Directory of images, or a CSV with columns "
+                                           "file,title,description,category,is_published (file required).")
+        parser.add_argument("--category", default=Gallery.Category.OTHER, choices=Gallery.Category.values,
+                            help="Category when the manifest/sub-folder doesn't give one.")
+        parser.add_argument("--unpublished", action="store_true", help="Import as unpublished.")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Image processing processes (1 = no pool).")
+        parser.add_argument("--batch-size", type=int, default=200, help="Rows per bulk_create.")
+
+    # ---------------------------
+    # Input
+    # ---------------------------
+    def _from_directory(self, root, options):
+        # Sub-folders named after a category (gallery/orphans/...) set it
+        for path in sorted(p for p in root.rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS and p.is_file()):
+            folder = path.parent.name.lower()
+            yield {
+                "path": str(path),
+                "title": _title_from_path(path),
+                "description": "",
+                "category": folder if folder in Gallery.Category.values else options["category"],
+                "is_published": not options["unpublished"],
+            }
+
+    def _from_manifest(self, manifest, options):
+        with manifest.open(newline="", encoding="utf-8-sig") as fh:
+            reader = csv.DictReader(fh)
+            if "file" not in (reader.fieldnames or []):
+                raise CommandError(f"{manifest}: the manifest needs a 'file' column")
+            for line, row in enumerate(reader, start=2):
+                path = (manifest.parent / (row.get("file") or "").strip())
+                category = (row.get("category") or "").strip().lower() or options["category"]
+                if category not in Gallery.Category.values:
+                    self.stdout.write(self.style.WARNING(f"{manifest}:{line}: unknown category {category!r}, using {options['category']}"))
+                    category = options["category"]
+                published = (row.get("is_published") or "").strip().lower()
+                yield {
+                    "path": str(path),
+                    "title": ((row.get("title") or "").strip() or _title_from_path(path))[:200],
+                    "description": (row.get("description") or "").strip(),
+                    "category": category,
+                    "is_published": published in ("1", "true", "yes") if published else not options["unpublished"],
+                }
+
+    # ---------------------------
+    # Output
+    # ---------------------------
+    def _flush(self, batch):
+        with transaction.atomic():
+            created = Gallery.objects.bulk_create(batch)
+            # bulk_create sends no post_save: index here instead
+            if all(obj.pk for obj in created):
+                search.index_many(created)
+            else:
+                self.index_later = True
+        return len(created)
+
+    def handle(self, *args, **options):
+        source = Path(options["source"])
+        if source.is_dir():
+            entries = list(self._from_directory(source, options))
+        elif source.is_file():
+            entries = list(self._from_manifest(source, options))
+        else:
+            raise CommandError(f"{source} does not exist")
+        if not entries:
+            self.stdout.write(self.style.WARNING("Nothing to import."))
+            return
+
+        existing = frozenset(
+            Gallery.objects.filter(image__startswith=IMPORT_DIR + "/").values_list("image", flat=True)
+        )
+        total, batch_size = len(entries), options["batch_size"]
+        imported = skipped = failed = 0
+        seen, batch = set(existing), []
+        self.index_later = False
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Importing {total} images with {options['workers']} worker(s)..."
+        ))
+
+        start = time.perf_counter()
+        if options["workers"] > 1:
+            connections.close_all()  # don't share DB sockets with forked workers
+            pool = ProcessPoolExecutor(options["workers"], initializer=_init_worker, initargs=(existing,))
+            results = pool.map(_prepare, entries, chunksize=4)
+        else:
+            pool = None
+            _init_worker(existing)
+            results = map(_prepare, entries)
+
+        try:
+            for done, (status, entry, detail, size) in enumerate(results, start=1):
+                if status == "failed":
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f"{entry['path']}: {detail}"))
+                elif status == "skipped" or detail in seen:
+                    skipped += 1  # already imported (or a duplicate file in this run)
+                else:
+                    seen.add(detail)
+                    batch.append(Gallery(
+                        title=entry["title"], description=entry["description"], image=detail,
+                        category=entry["category"], is_published=entry["is_published"], **size,
+                    ))
+                if len(batch) >= batch_size or (done == total and batch):
+                    imported += self._flush(batch)
+                    batch = []
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(f"  {done}/{total} processed, {imported} imported ({done / elapsed:.1f} img/s)")
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+            if imported:
+                bump_generation("gallery")
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Imported {imported}, skipped {skipped}, failed {failed} in {elapsed:.1f}s "
+            f"({total / elapsed:.1f} images/s)"
+        ))
+        if self.index_later:
+            self.stdout.write(self.style.WARNING(
+                "This database doesn't return ids from bulk_create; run `manage.py rebuild_search_index --kind gallery`."
+            ))
@@ -0,0 +1,72 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+
+from website import jobs
+from website.models import ImageJob
+
+
+class Command(BaseCommand):
+    help = "Run queued image jobs (metadata stripping, resized derivatives) off the request path."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=None,
+                            help="Worker threads (default: IMAGE_JOBS_CONCURRENCY or 2).")
+        parser.add_argument("--once", action="store_true",
+                            help="Drain the queue once and exit instead of polling.")
+        parser.add_argument("--poll-interval", type=float, default=5.0,
+                            help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--stale-after", type=int, default=15,
+                            help="Minutes after which a RUNNING job is considered abandoned.")
+
+    def handle(self, *args, **options):
+        workers = max(1, options["concurrency"] or jobs.concurrency())
+        stale_after = timedelta(minutes=options["stale_after"])
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Image worker started ({workers} threads)"))
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                while True:
+                    requeued = jobs.requeue_stale(stale_after)
+                    if requeued:
+                        self.stdout.write(self.style.WARNING(f"Re-queued {requeued} stale job(s)"))
+
+                    results = list(pool.map(lambda _: self._drain(), range(workers)))
+                    done = sum(r[0] for r in results)
+                    failed = sum(r[1] for r in results)
+                    if done or failed:
+                        self.stdout.write(self.style.SUCCESS(f"✓ Processed {done} job(s), {failed} failed attempt(s)"))
+
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping worker.")
+
+    def _drain(self):
+        """Claim and run jobs until none are due; returns (done, failed)."""
+        done = failed = 0
+        try:
+            while True:
+                try:
+                    job = jobs.claim_next()
+                    if job is None:
+                        break
+                    jobs.run_job(job)
+                except DatabaseError as exc:
+                    # e.g. a locked SQLite database. The next round tries again;
+                    # a job left RUNNING is re-queued once it goes stale.
+                    self.stderr.write(f"Database error, pausing this thread: {exc}")
+                    break
+                if job.status == ImageJob.Status.DONE:
+                    done += 1
+                else:
+                    failed += 1
+                    self.stderr.write(f"Job {job.pk} ({job.image_name}): {job.last_error}")
+        finally:
+            # Each thread owns its own DB connection
+            connection.close()
+        return done, failed
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from website import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for programs, news, events and gallery."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", action="append", choices=sorted(search.SEARCHABLE),
+                            help="Only rebuild this kind (repeatable). Default: all.")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        counts = search.rebuild(options["kind"], batch_size=options["batch_size"])
+        elapsed = time.perf_counter() - start
+        summary = ", ".join(f"{kind}: {n}" for kind, n in counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Indexed {sum(counts.values())} rows ({summary}) in {elapsed:.1f}s using the {search.backend()} backend"
+        ))
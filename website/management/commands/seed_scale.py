@@ -0,0 +1,198 @@
+import contextlib
+import random
+import time
+from datetime import timedelta
+from io import BytesIO
+from itertools import islice
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from website import inbox, search
+from website.bulk import delete_rows
+from website.caching import bump_generation
+from website.images import generate_derivatives, intrinsic
+from website.models import ContactMessage, Event, Gallery, News, Program, SearchDocument
+
+# Every generated row carries one of these, so --purge finds them again
+TITLE_PREFIX = "[scale] "
+EMAIL_DOMAIN = "scale.invalid"
+IMAGE_DIR = "gallery/scale"
+
+WORDS = (
+    "orphans school kits mosque renovation water well borehole women halaqa training clinic premature "
+    "babies hospital ramadan iftar food parcels zakat sadaqah morogoro dar es salaam tanga village "
+    "community volunteers qur'an madrasa scholarship uniforms books solar lamps medical camp eid gifts "
+    "widows tailoring microfinance youth mentorship clean energy flood relief blankets shelter families"
+).split()
+FIRST_NAMES = "Amina Fatma Zuberi Hassan Mariam Omari Rehema Juma Halima Issa Neema Salim Zawadi Abdallah".split()
+LAST_NAMES = "Daffa Mohamed Said Bakari Mussa Rashid Athumani Shabani Ally Kombo Hamisi Mbwana".split()
+
+
+@contextlib.contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep our created_at/updated_at instead of stamping "now"."""
+    flipped = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False):
+                flipped.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in flipped:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = "Generate large, reproducible volumes of content for load and scale testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--programs", type=int, default=0)
+        parser.add_argument("--news", type=int, default=0)
+        parser.add_argument("--events", type=int, default=0)
+        parser.add_argument("--gallery", type=int, default=0)
+        parser.add_argument("--messages", type=int, default=0)
+        parser.add_argument("--seed", type=int, default=42, help="Same seed, same dataset.")
+        parser.add_argument("--days", type=int, default=3 * 365, help="Spread created_at over this many days.")
+        parser.add_argument("--images", type=int, default=20,
+                            help="Distinct placeholder images (with derivatives) that gallery/content rows cycle through; 0 = none.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--purge", action="store_true", help="Delete previously generated rows first.")
+
+    # ---------------------------
+    # Helpers
+    # ---------------------------
+    def _text(self, low, high):
+        return " ".join(self.rng.choice(WORDS) for _ in range(self.rng.randint(low, high)))
+
+    def _title(self, n):
+        return (TITLE_PREFIX + self._text(3, 7).capitalize() + f" #{n}")[:200]
+
+    def _moment(self):
+        return self.now - timedelta(seconds=self.rng.randrange(self.days * 86400))
+
+    def _image(self):
+        """Field values for one of the shared placeholder images (or none)."""
+        return self.rng.choice(self.images) if self.images else {"image": ""}
+
+    def _placeholder(self, n):
+        """A 1600x1067 JPEG with a few coloured blocks, so codecs have real work to do."""
+        img = Image.new("RGB", (1600, 1067), tuple(self.rng.randrange(40, 220) for _ in range(3)))
+        draw = ImageDraw.Draw(img)
+        for _ in range(12):
+            x, y = self.rng.randrange(1500), self.rng.randrange(960)
+            draw.rectangle((x, y, x + self.rng.randrange(80, 600), y + self.rng.randrange(60, 400)),
+                           fill=tuple(self.rng.randrange(256) for _ in range(3)))
+        buf = BytesIO()
+        img.save(buf, "JPEG", quality=85)
+        name = f"{IMAGE_DIR}/placeholder-{n:04d}.jpg"
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        default_storage.save(name, ContentFile(buf.getvalue()))
+        image = Gallery(image=name).image
+        generate_derivatives(image)
+        width, height, placeholder = intrinsic(image)
+        return {"image": name, "image_width": width, "image_height": height, "image_placeholder": placeholder}
+
+    def _create(self, model, count, build, index=False):
+        if not count:
+            return
+        start = time.perf_counter()
+        rows = (build(n) for n in range(1, count + 1))
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            with transaction.atomic():
+                created = model.objects.bulk_create(batch)
+                # bulk_create sends no post_save
+                if index and all(obj.pk for obj in created):
+                    search.index_many(created, batch_size=self.batch_size)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {model._meta.verbose_name_plural.capitalize()}: {count} in {elapsed:.1f}s ({count / elapsed:,.0f} rows/s)"
+        ))
+
+    def _purge(self):
+        for model in (Program, News, Event, Gallery):
+            # Plain DELETEs: qs.delete() would load every row to send signals
+            generated = model.objects.filter(title__startswith=TITLE_PREFIX)
+            delete_rows(SearchDocument.objects.filter(kind=model._meta.model_name, object_id__in=generated.values("pk")))
+            deleted = delete_rows(generated)
+            self.stdout.write(f"  purged {deleted} {model._meta.verbose_name_plural}")
+        deleted = delete_rows(ContactMessage.objects.filter(email__endswith="@" + EMAIL_DOMAIN))
+        self.stdout.write(f"  purged {deleted} contact messages")
+
+    # ---------------------------
+    # Rows
+    # ---------------------------
+    def _program(self, n):
+        at = self._moment()
+        return Program(title=self._title(n), description=self._text(30, 120), **self._image(),
+                       is_active=self.rng.random() < 0.9, created_at=at, updated_at=at)
+
+    def _news(self, n):
+        at = self._moment()
+        return News(title=self._title(n), content=self._text(80, 400), **self._image(),
+                    is_published=self.rng.random() < 0.9, created_at=at,
+                    updated_at=min(self.now, at + timedelta(hours=self.rng.randrange(72))))
+
+    def _event(self, n):
+        at = self._moment()
+        return Event(title=self._title(n), description=self._text(40, 200),
+                     event_date=at + timedelta(days=self.rng.randrange(-30, 120)),
+                     location=self.rng.choice(["Morogoro", "Dar es Salaam", "Tanga", "Dodoma", "Zanzibar"]),
+                     **self._image(), is_published=self.rng.random() < 0.9, created_at=at, updated_at=at)
+
+    def _gallery(self, n):
+        return Gallery(title=self._title(n), description=self._text(0, 30), **self._image(),
+                       category=self.rng.choice(Gallery.Category.values),
+                       is_published=self.rng.random() < 0.95, created_at=self._moment())
+
+    def _message(self, n):
+        first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+        at = self._moment()
+        is_read = self.rng.random() < 0.7
+        return ContactMessage(
+            name=f"{first} {last}", email=f"{first}.{last}.{n}@{EMAIL_DOMAIN}".lower(),
+            subject=self._text(3, 8).capitalize(), message=self._text(20, 150),
+            created_at=at, is_read=is_read, read_at=at + timedelta(hours=6) if is_read else None,
+            is_archived=is_read and self.rng.random() < 0.1,
+            ip_address=f"10.{self.rng.randrange(256)}.{self.rng.randrange(256)}.{self.rng.randrange(1, 255)}",
+            user_agent="Mozilla/5.0 (seed_scale)",
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.now = timezone.now().replace(microsecond=0)
+        self.days = max(1, options["days"])
+        self.batch_size = options["batch_size"]
+        started = time.perf_counter()
+
+        if options["purge"]:
+            self.stdout.write(self.style.MIGRATE_HEADING("Purging generated rows..."))
+            self._purge()
+
+        self.images = []
+        if options["images"] and (options["gallery"] or options["programs"] or options["news"] or options["events"]):
+            self.stdout.write(self.style.MIGRATE_HEADING(f"Generating {options['images']} placeholder images..."))
+            self.images = [self._placeholder(n) for n in range(1, options["images"] + 1)]
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Generating rows..."))
+        with explicit_timestamps(Program, News, Event, Gallery, ContactMessage):
+            self._create(Program, options["programs"], self._program, index=True)
+            self._create(News, options["news"], self._news, index=True)
+            self._create(Event, options["events"], self._event, index=True)
+            self._create(Gallery, options["gallery"], self._gallery, index=True)
+            self._create(ContactMessage, options["messages"], self._message)
+
+        for name in ("program", "news", "event", "gallery", "contactmessage"):
+            bump_generation(name)
+        inbox.invalidate()
+        self.stdout.write(self.style.SUCCESS(f"✓ Done in {time.perf_counter() - started:.1f}s (seed {options['seed']})"))
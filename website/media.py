@@ -0,0 +1,124 @@
+"""
+Serving MEDIA_ROOT uploads from Django with caching and range support.
+
+django.views.static.serve is meant for DEBUG only: it sends no
+Cache-Control, ignores Range and reads whole files. `serve` answers
+conditional requests with 304, sends single byte ranges as 206 Partial
+Content (video seeking, resumed downloads) and streams everything with
+FileResponse. Multi-range and malformed Range headers are ignored (a full
+200, as RFC 9110 allows); 416 is only for ranges outside the file. Enabled by `SERVE_MEDIA` (defaults to DEBUG).
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+# Upload names never change content, except derivatives rebuilt in place;
+# a day plus ETag revalidation covers both
+MEDIA_MAX_AGE = 60 * 60 * 24
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class _FileSlice:
+    """File-like view of `length` bytes from `offset`, for FileResponse."""
+
+    def __init__(self, fh, offset, length):
+        self.fh, self.remaining = fh, length
+        fh.seek(offset)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fh.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.fh.close()
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single byte range; None when the header is
+    to be ignored (malformed, or several ranges). Raises RangeNotSatisfiable
+    when the range lies outside the file.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":  # suffix range: the last N bytes
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None  # "bytes=5-1" is invalid, not unsatisfiable
+    if start > end or start >= size:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def _if_range_matches(request, etag, mtime):
+    value = request.META.get("HTTP_IF_RANGE")
+    if not value:
+        return True
+    if value.startswith(('"', "W/")):
+        return value == etag
+    return parse_http_date_safe(value) == mtime
+
+
+@require_safe
+def serve(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    stat = os.stat(full_path)
+    mtime = int(stat.st_mtime)
+    etag = f'"{mtime:x}-{stat.st_size:x}"'
+    not_modified = get_conditional_response(request, etag=etag, last_modified=mtime)
+    if not_modified is not None:
+        return not_modified
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or "application/octet-stream"
+    fh = open(full_path, "rb")
+    byte_range = None
+    if "HTTP_RANGE" in request.META and _if_range_matches(request, etag, mtime):
+        try:
+            byte_range = parse_range(request.META["HTTP_RANGE"], stat.st_size)
+        except RangeNotSatisfiable:
+            fh.close()
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{stat.st_size}"
+            return response
+
+    if byte_range:
+        start, end = byte_range
+        response = FileResponse(_FileSlice(fh, start, end - start + 1), status=206, content_type=content_type)
+        response["Content-Length"] = str(end - start + 1)
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    else:
+        response = FileResponse(fh, content_type=content_type)
+        response["Content-Length"] = str(stat.st_size)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(mtime)
+    patch_cache_control(response, public=True, max_age=getattr(settings, "MEDIA_MAX_AGE", MEDIA_MAX_AGE))
+    return response
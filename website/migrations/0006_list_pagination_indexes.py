@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-17 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0005_imagejob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['-created_at', '-id'], name='contactmessage_created_id'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['-event_date', '-id'], name='event_date_id'),
+        ),
+        migrations.AddIndex(
+            model_name='gallery',
+            index=models.Index(fields=['is_published', '-created_at', '-id'], name='gallery_published_created'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['-updated_at', '-id'], name='news_updated_id'),
+        ),
+    ]
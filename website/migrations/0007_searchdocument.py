@@ -0,0 +1,128 @@
+# Generated by Django 4.2.7 on 2026-10-17 15:27
+
+from django.db import OperationalError, migrations, models
+
+# Full-text index next to website_searchdocument; website/search.py queries it.
+SQLITE_FORWARD = [
+    """CREATE VIRTUAL TABLE website_searchdocument_fts USING fts5(
+        title, body,
+        content='website_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER website_searchdocument_ai AFTER INSERT ON website_searchdocument BEGIN
+        INSERT INTO website_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    """CREATE TRIGGER website_searchdocument_ad AFTER DELETE ON website_searchdocument BEGIN
+        INSERT INTO website_searchdocument_fts(website_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    """CREATE TRIGGER website_searchdocument_au AFTER UPDATE ON website_searchdocument BEGIN
+        INSERT INTO website_searchdocument_fts(website_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO website_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS website_searchdocument_au",
+    "DROP TRIGGER IF EXISTS website_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS website_searchdocument_ai",
+    "DROP TABLE IF EXISTS website_searchdocument_fts",
+]
+
+# 'simple' config: content mixes English and Swahili, so no stemming
+POSTGRES_FORWARD = [
+    """ALTER TABLE website_searchdocument ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(body, '')), 'B')
+        ) STORED""",
+    "CREATE INDEX website_searchdocument_vector ON website_searchdocument USING GIN (search_vector)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS website_searchdocument_vector",
+    "ALTER TABLE website_searchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(schema_editor, statements):
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            _run(schema_editor, SQLITE_FORWARD)
+        except OperationalError:
+            # SQLite built without FTS5: search falls back to LIKE queries
+            _run(schema_editor, SQLITE_BACKWARD)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_FORWARD)
+
+
+# Frozen copy of search.SEARCHABLE: model -> (kind, body fields, "is public" field)
+SEARCHABLE = {
+    'Program': ('program', ('description',), 'is_active'),
+    'News': ('news', ('content',), 'is_published'),
+    'Event': ('event', ('description', 'location'), 'is_published'),
+    'Gallery': ('gallery', ('description',), 'is_published'),
+}
+
+
+def index_existing_content(apps, schema_editor):
+    """Index the rows that existed before search; the triggers fill the FTS table."""
+    db_alias = schema_editor.connection.alias
+    SearchDocument = apps.get_model('website', 'SearchDocument')
+    for model_name, (kind, body_fields, public_field) in SEARCHABLE.items():
+        model = apps.get_model('website', model_name)
+        SearchDocument.objects.using(db_alias).bulk_create(
+            [
+                SearchDocument(
+                    kind=kind,
+                    object_id=obj.pk,
+                    title=obj.title,
+                    body='\n'.join(str(getattr(obj, f) or '') for f in body_fields),
+                    is_public=bool(getattr(obj, public_field)),
+                    created_at=obj.created_at,
+                )
+                for obj in model.objects.using(db_alias).all()
+            ],
+            batch_size=500,
+        )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_BACKWARD)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0006_list_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=200)),
+                ('body', models.TextField(blank=True)),
+                ('is_public', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='searchdocument_unique_object'),
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(index_existing_content, migrations.RunPython.noop),
+    ]
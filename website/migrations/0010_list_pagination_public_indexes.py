@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0009_image_intrinsic_size'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donationmethod',
+            index=models.Index(fields=['order', 'name', 'id'], name='donationmethod_order_name'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['is_published', '-event_date', '-id'], name='event_published_date'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['is_published', '-created_at', '-id'], name='news_published_created'),
+        ),
+        migrations.AddIndex(
+            model_name='program',
+            index=models.Index(fields=['is_active', '-created_at', '-id'], name='program_active_created'),
+        ),
+    ]
@@ -41,12 +41,21 @@ class Program(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
     image = models.ImageField(upload_to='programs/', blank=True, null=True)
+    # Captured on upload (signals.capture_image_size): intrinsic size for
+    # width/height attributes and a tiny blurred preview as a data URI
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, editable=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # keyset pagination on the public Programs page
+            models.Index(fields=['is_active', '-created_at', '-id'], name='program_active_created'),
+        ]
 
     def __str__(self):
         return self.title
@@ -56,6 +65,9 @@ class News(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
     image = models.ImageField(upload_to='news/', blank=True, null=True)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, editable=False)
     is_published = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -63,6 +75,11 @@ class News(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "News"
+        indexes = [
+            # keyset pagination in the admin list and on News & Events
+            models.Index(fields=['-updated_at', '-id'], name='news_updated_id'),
+            models.Index(fields=['is_published', '-created_at', '-id'], name='news_published_created'),
+        ]
 
     def __str__(self):
         return self.title
@@ -77,12 +94,19 @@ class Event(models.Model):
     event_date = models.DateTimeField()
     location = models.CharField(max_length=200, blank=True)
     image = models.ImageField(upload_to='events/', blank=True, null=True)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, editable=False)
     is_published = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['event_date']
+        indexes = [
+            models.Index(fields=['-event_date', '-id'], name='event_date_id'),
+            models.Index(fields=['is_published', '-event_date', '-id'], name='event_published_date'),
+        ]
 
     def __str__(self):
         return self.title
@@ -102,6 +126,9 @@ class DonationMethod(models.Model):
 
     class Meta:
         ordering = ['order', 'name']
+        indexes = [
+            models.Index(fields=['order', 'name', 'id'], name='donationmethod_order_name'),
+        ]
 
     def __str__(self):
         return self.name
@@ -118,6 +145,9 @@ class Gallery(models.Model):
 
     title = models.CharField(max_length=200)
     image = models.ImageField(upload_to='gallery/')
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, editable=False)
     description = models.TextField(blank=True)
     category = models.CharField(max_length=20, choices=Category.choices, default=Category.OTHER, db_index=True)  # NEW
     is_published = models.BooleanField(default=True, db_index=True)
@@ -126,6 +156,9 @@ class Gallery(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "Gallery"
+        indexes = [
+            models.Index(fields=['is_published', '-created_at', '-id'], name='gallery_published_created'),
+        ]
 
     def __str__(self):
         return self.title
@@ -140,6 +173,8 @@ class ContactMessage(models.Model):
 
     is_read = models.BooleanField(default=False, db_index=True)
     read_at = models.DateTimeField(null=True, blank=True)
+    # Archived messages leave the inbox but are kept (bulk "Archive")
+    is_archived = models.BooleanField(default=False)
 
     # NEW: kwa view yako ya contact
     ip_address = models.GenericIPAddressField(null=True, blank=True)
@@ -147,6 +182,68 @@ class ContactMessage(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='contactmessage_created_id'),
+            models.Index(fields=['is_archived', '-created_at', '-id'], name='contactmessage_archived'),
+        ]
 
     def __str__(self):
         return f"{self.subject} - {self.name}"
+
+
+class ImageJob(models.Model):
+    """
+    Background processing for an uploaded image (metadata stripping,
+    resized derivatives). Picked up by `manage.py process_image_jobs`.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    model_label = models.CharField(max_length=100)  # e.g. "website.gallery"
+    object_id = models.PositiveBigIntegerField()
+    image_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    last_error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='imagejob_status_run_after'),
+            models.Index(fields=['model_label', 'object_id'], name='imagejob_object'),
+        ]
+
+    def __str__(self):
+        return f"{self.model_label}#{self.object_id} ({self.status})"
+
+
+class SearchDocument(models.Model):
+    """
+    One row per searchable Program/News/Event/Gallery item, kept in sync by
+    signals (see website/search.py). The full-text index itself lives next
+    to this table: an FTS5 virtual table on SQLite, a tsvector column on
+    PostgreSQL.
+    """
+    kind = models.CharField(max_length=20)  # model_name, e.g. "news"
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=200)
+    body = models.TextField(blank=True)
+    is_public = models.BooleanField(default=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='searchdocument_unique_object'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}#{self.object_id}: {self.title}"
@@ -0,0 +1,131 @@
+"""
+N+1 query detection for development and staging.
+
+Within one request, queries are grouped by shape (the SQL with its
+parameters left out and IN (...) lists collapsed). When one shape runs
+NPLUSONE_THRESHOLD times or more, that is almost always a loop doing a
+query per row: the detection names the template line ({% for %} tag or
+{{ variable }}) and the project code line that ran it, plus the table.
+
+Enable with
+    NPLUSONE_DETECTION = "log"     # or "raise" to turn detections into errors
+    MIDDLEWARE += ["website.nplusone.NPlusOneMiddleware"]
+With the setting off the middleware removes itself, so it is safe to keep
+in MIDDLEWARE everywhere. The benchmark command always runs the detector.
+"""
+import logging
+import os
+import re
+import sys
+from collections import Counter, defaultdict, deque, namedtuple
+from contextlib import ExitStack, contextmanager
+
+import django
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Node
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 5
+
+Detection = namedtuple("Detection", "view table count template code sql")
+
+# Most recent detections in this process (admin Performance page)
+recent_detections = deque(maxlen=50)
+
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+_TABLE = re.compile(r'\bFROM\s+"?(\w+)"?', re.I)
+_DJANGO_DIR = os.path.dirname(os.path.abspath(django.__file__))
+_THIS_FILE = os.path.abspath(__file__)
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+def threshold():
+    return getattr(settings, "NPLUSONE_THRESHOLD", DEFAULT_THRESHOLD)
+
+
+def _shape(sql):
+    return _IN_LIST.sub("IN (...)", sql)
+
+
+def _origin():
+    """(template "name:line {% tag %}", code "path:line in func") that issued the current query."""
+    template = code = ""
+    base_dir = str(getattr(settings, "BASE_DIR", ""))
+    frame = sys._getframe(2)
+    while frame and not (template and code):
+        filename = frame.f_code.co_filename
+        if not template and frame.f_code.co_name == "render_annotated":
+            node = frame.f_locals.get("self")
+            if isinstance(node, Node) and getattr(node, "token", None):
+                origin = getattr(node, "origin", None)
+                name = getattr(origin, "template_name", None) or getattr(origin, "name", "?")
+                template = f"{name}:{node.token.lineno} {{% {node.token.contents} %}}"
+        elif (not code and os.path.abspath(filename) != _THIS_FILE
+              and not filename.startswith(_DJANGO_DIR) and "site-packages" not in filename
+              and (not base_dir or filename.startswith(base_dir))):
+            code = f"{os.path.relpath(filename, base_dir or None)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return template, code
+
+
+class QueryRecorder:
+    """connection.execute_wrapper() callable that groups queries by shape."""
+
+    def __init__(self):
+        self.origins = defaultdict(list)
+
+    def __call__(self, execute, sql, params, many, context):
+        self.origins[_shape(sql)].append(_origin())
+        return execute(sql, params, many, context)
+
+    def detections(self, view=""):
+        found = []
+        for shape, origins in self.origins.items():
+            if len(origins) < threshold():
+                continue
+            (template, code), _ = Counter(origins).most_common(1)[0]
+            table = _TABLE.search(shape)
+            found.append(Detection(view, table.group(1) if table else "?", len(origins), template, code, shape))
+        return found
+
+
+@contextmanager
+def record_queries():
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(recorder))
+        yield recorder
+
+
+def describe(detection):
+    where = detection.template or detection.code or "unknown location"
+    extra = f" (via {detection.code})" if detection.template and detection.code else ""
+    return (f"N+1 in {detection.view or 'request'}: {detection.count} queries on {detection.table} "
+            f"from {where}{extra}")
+
+
+class NPlusOneMiddleware:
+    def __init__(self, get_response):
+        self.mode = getattr(settings, "NPLUSONE_DETECTION", False)
+        if not self.mode:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        match = getattr(request, "resolver_match", None)
+        detections = recorder.detections(match.view_name if match else request.path)
+        for detection in detections:
+            recent_detections.append(detection)
+            logger.warning(describe(detection))
+        if detections and self.mode == "raise":
+            raise NPlusOneError("; ".join(describe(d) for d in detections))
+        return response
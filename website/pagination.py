@@ -0,0 +1,184 @@
+"""
+Keyset ("cursor") pagination.
+
+Instead of OFFSET + COUNT(*), each page remembers the sort-key values of its
+first and last rows and the next query asks for rows strictly after/before
+them. With an index on the sort key, page 500 costs the same as page 1.
+
+Tokens are opaque to clients (URL-safe base64 of the boundary values); a
+malformed or tampered token simply falls back to the first page.
+"""
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from django.utils.http import urlencode
+
+CURSOR_PARAM = "cursor"
+
+
+def encode_token(data):
+    raw = json.dumps(data, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_token(token):
+    """The dict inside a token, or None if it isn't one of ours."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+    except (binascii.Error, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+class CursorPage:
+    """One page of rows; iterates like a list (and like a Paginator page)."""
+
+    def __init__(self, object_list, paginator, start_index, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.start_index = start_index  # 0-based position of the first row (display only)
+        self.has_next_page = has_next
+        self.has_previous_page = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    @property
+    def first_number(self):
+        """1-based position of the first row, for "Showing 26–50" labels."""
+        return self.start_index + 1 if self.object_list else 0
+
+    @property
+    def last_number(self):
+        return self.start_index + len(self.object_list)
+
+    def has_next(self):
+        return self.has_next_page
+
+    def has_previous(self):
+        return self.has_previous_page
+
+    def has_other_pages(self):
+        return self.has_next_page or self.has_previous_page
+
+    @property
+    def next_token(self):
+        if not self.has_next_page:
+            return ""
+        return self.paginator.token(self.object_list[-1], "n", self.start_index + len(self))
+
+    @property
+    def previous_token(self):
+        if not self.has_previous_page:
+            return ""
+        start = max(0, self.start_index - self.paginator.per_page)
+        return self.paginator.token(self.object_list[0], "p", start)
+
+    def _url(self, token):
+        param = self.paginator.param
+        params = {k: v for k, v in self.paginator.params.items() if k != param and v != ""}
+        if token:
+            params[param] = token
+        return "?" + urlencode(params)
+
+    @property
+    def next_url(self):
+        return self._url(self.next_token) if self.has_next_page else ""
+
+    @property
+    def previous_url(self):
+        if not self.has_previous_page:
+            return ""
+        # Going back to the start needs no token at all
+        return self._url(self.previous_token if self.start_index > self.paginator.per_page else "")
+
+    @property
+    def first_url(self):
+        return self._url("")
+
+
+class CursorPaginator:
+    """
+    Usage:
+        page = CursorPaginator(qs, ("-created_at", "-id"), per_page=12).page(request.GET.get("cursor"))
+
+    `ordering` must end with a unique field (normally "id"/"-id") so every row
+    has a distinct position. `params` (e.g. request.GET) are kept on the
+    page's next/previous URLs. `param` names the query parameter holding the
+    token, so two lists on one page can page independently.
+    """
+
+    def __init__(self, queryset, ordering, per_page, params=None, param=CURSOR_PARAM):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.param = param
+        self.params = params.dict() if hasattr(params, "dict") else dict(params or {})
+        model = queryset.model
+        self._fields = [
+            (name.lstrip("-"), name.startswith("-"), model._meta.get_field(name.lstrip("-")))
+            for name in self.ordering
+        ]
+
+    def token(self, obj, direction, start_index):
+        values = [field.value_to_string(obj) for _, _, field in self._fields]
+        return encode_token({"v": values, "d": direction, "i": start_index})
+
+    def _boundary(self, values, forward):
+        """Q for rows strictly after (forward) or before the given key values."""
+        condition = Q()
+        equal = Q()
+        for (name, descending, _), value in zip(self._fields, values):
+            after = descending == forward  # "-created_at" forward means "<"
+            lookup = f"{name}__lt" if after else f"{name}__gt"
+            condition |= equal & Q(**{lookup: value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _parse(self, data):
+        if data.get("d") not in ("n", "p") or not isinstance(data.get("v"), list):
+            return None
+        if len(data["v"]) != len(self._fields):
+            return None
+        try:
+            return [field.to_python(v) for (_, _, field), v in zip(self._fields, data["v"])]
+        except Exception:  # noqa: BLE001 - any bad value means "start over"
+            return None
+
+    def page(self, token=None):
+        data = decode_token(token) if token else None
+        values = self._parse(data) if data else None
+        if values is None:
+            rows = list(self.queryset.order_by(*self.ordering)[:self.per_page + 1])
+            return CursorPage(rows[:self.per_page], self, 0, len(rows) > self.per_page, False)
+
+        start = data.get("i") if isinstance(data.get("i"), int) else 0
+        if data["d"] == "n":
+            qs = self.queryset.filter(self._boundary(values, True)).order_by(*self.ordering)
+            rows = list(qs[:self.per_page + 1])
+            return CursorPage(rows[:self.per_page], self, start, len(rows) > self.per_page, True)
+
+        reverse = [f[1:] if f.startswith("-") else f"-{f}" for f in self.ordering]
+        qs = self.queryset.filter(self._boundary(values, False)).order_by(*reverse)
+        rows = list(qs[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return CursorPage(rows, self, start if has_previous else 0, True, has_previous)
+
+
+def paginate(request, queryset, ordering, per_page, param=CURSOR_PARAM):
+    """CursorPaginator page for the request's ?cursor= token, keeping its other GET params."""
+    paginator = CursorPaginator(queryset, ordering, per_page, params=request.GET, param=param)
+    return paginator.page(request.GET.get(param))
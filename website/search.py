@@ -0,0 +1,320 @@
+"""
+Full-text search over Programs, News, Events and Gallery.
+
+Every searchable row is mirrored into SearchDocument by signals. The index
+next to that table depends on the database (see migration 0007):
+
+  * SQLite      -> FTS5 virtual table, ranked with bm25()
+  * PostgreSQL  -> generated tsvector column + GIN index, ranked with ts_rank()
+  * otherwise   -> plain LIKE queries on SearchDocument (slow, but works)
+
+Callers only use search(), facet_counts(), filter_queryset() and the
+indexing helpers; the backend is picked from what the migration managed
+to create.
+"""
+import re
+from collections import namedtuple
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from django.utils.text import Truncator
+
+from .models import Program, News, Event, Gallery, SearchDocument
+
+FTS_TABLE = "website_searchdocument_fts"
+DOC_TABLE = SearchDocument._meta.db_table
+
+# Markers put around matches by snippet()/ts_headline(); swapped for <mark>
+# after the text has been HTML-escaped.
+HL_START, HL_END = "\x02", "\x03"
+SNIPPET_WORDS = 24
+
+# model_name -> (model, fields indexed into `body`, "is public" field)
+SEARCHABLE = {
+    "program": (Program, ("description",), "is_active"),
+    "news": (News, ("content",), "is_published"),
+    "event": (Event, ("description", "location"), "is_published"),
+    "gallery": (Gallery, ("description",), "is_published"),
+}
+
+SearchResult = namedtuple("SearchResult", "kind object_id title snippet rank doc_id")
+
+_backends = {}
+
+
+def backend():
+    """'fts5', 'postgres' or 'basic' for the default database."""
+    alias = connection.alias
+    if alias not in _backends:
+        found = None
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [FTS_TABLE])
+                found = "fts5" if cursor.fetchone() else None
+            elif connection.vendor == "postgresql":
+                cursor.execute(
+                    "SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = 'search_vector'",
+                    [DOC_TABLE],
+                )
+                found = "postgres" if cursor.fetchone() else None
+        _backends[alias] = found or "basic"
+    return _backends[alias]
+
+
+# ---------------------------
+# Indexing
+# ---------------------------
+def _document_fields(instance):
+    _, body_fields, public_field = SEARCHABLE[instance._meta.model_name]
+    return {
+        "title": instance.title,
+        "body": "\n".join(str(getattr(instance, f) or "") for f in body_fields),
+        "is_public": bool(getattr(instance, public_field)),
+        "created_at": instance.created_at,
+    }
+
+
+def index_instance(instance):
+    SearchDocument.objects.update_or_create(
+        kind=instance._meta.model_name, object_id=instance.pk,
+        defaults=_document_fields(instance),
+    )
+
+
+def index_many(instances, batch_size=500):
+    """Documents for rows added with bulk_create(), which sends no post_save."""
+    SearchDocument.objects.bulk_create(
+        [SearchDocument(kind=obj._meta.model_name, object_id=obj.pk, **_document_fields(obj)) for obj in instances],
+        batch_size=batch_size,
+    )
+
+
+def remove_instance(instance):
+    SearchDocument.objects.filter(kind=instance._meta.model_name, object_id=instance.pk).delete()
+
+
+def rebuild(kinds=None, batch_size=500):
+    """
+    Re-create the documents for the given kinds (all by default); returns
+    {kind: rows}. Runs in one transaction, so concurrent searches keep
+    seeing the old documents until the new ones are committed.
+    """
+    counts = {}
+    with transaction.atomic():
+        for kind in kinds or SEARCHABLE:
+            model = SEARCHABLE[kind][0]
+            SearchDocument.objects.filter(kind=kind).delete()
+            batch, total = [], 0
+            for obj in model.objects.order_by().iterator(chunk_size=batch_size):
+                batch.append(SearchDocument(kind=kind, object_id=obj.pk, **_document_fields(obj)))
+                if len(batch) >= batch_size:
+                    SearchDocument.objects.bulk_create(batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                SearchDocument.objects.bulk_create(batch)
+                total += len(batch)
+            counts[kind] = total
+    return counts
+
+
+# ---------------------------
+# Querying
+# ---------------------------
+def _terms(query):
+    return re.findall(r"\w+", (query or "").lower())
+
+
+def normalize_query(query):
+    """Canonical form of a user query: "  Water,  WELL!" -> "water well"."""
+    return " ".join(_terms(query))
+
+
+def _match_expression(terms):
+    """User text -> backend query; the last term is a prefix (search-as-you-type)."""
+    if backend() == "fts5":
+        return " ".join(f'"{t}"' for t in terms) + "*"
+    return " & ".join(f"'{t}'" for t in terms) + ":*"
+
+
+def _highlight(text):
+    return mark_safe(escape(text).replace(HL_START, "<mark>").replace(HL_END, "</mark>"))
+
+
+def filter_queryset(queryset, query):
+    """
+    Restrict a Program/News/Event/Gallery queryset to rows matching `query`,
+    keeping its ordering (one SQL statement, the match is a subquery).
+    """
+    terms = _terms(query)
+    if not terms:
+        return queryset.none()
+    kind = queryset.model._meta.model_name
+    engine = backend()
+    if engine == "fts5":
+        ids = RawSQL(
+            f"SELECT d.object_id FROM {FTS_TABLE} CROSS JOIN {DOC_TABLE} d ON d.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s AND d.kind = %s",
+            [_match_expression(terms), kind],
+        )
+    elif engine == "postgres":
+        ids = RawSQL(
+            f"SELECT object_id FROM {DOC_TABLE} WHERE kind = %s AND search_vector @@ to_tsquery('simple', %s)",
+            [kind, _match_expression(terms)],
+        )
+    else:
+        ids = _basic_documents(terms).filter(kind=kind).values("object_id")
+    return queryset.filter(pk__in=ids)
+
+
+def search(query, kinds=None, public_only=True, limit=20, after=None):
+    """
+    Ranked matches across the searchable models, best first.
+
+    `after` is the (rank, doc_id) of the last result already shown; results
+    continue strictly after it, so paging never re-scans earlier hits.
+    Snippets are HTML-safe with matches wrapped in <mark>.
+    """
+    terms = _terms(query)
+    if not terms:
+        return []
+    kinds = [k for k in (kinds or SEARCHABLE) if k in SEARCHABLE]
+    if not kinds:
+        return []
+    engine = backend()
+    if engine == "fts5":
+        return _search_fts5(terms, kinds, public_only, limit, after)
+    if engine == "postgres":
+        return _search_postgres(terms, kinds, public_only, limit, after)
+    return _search_basic(terms, kinds, public_only, limit, after)
+
+
+def facet_counts(query, public_only=True):
+    """{kind: number of matches} for every searchable kind (zeros included)."""
+    counts = dict.fromkeys(SEARCHABLE, 0)
+    terms = _terms(query)
+    if not terms:
+        return counts
+    engine = backend()
+    where, params = _filters(list(SEARCHABLE), public_only, "d")
+    if engine == "fts5":
+        sql = (
+            f"SELECT d.kind, COUNT(*) FROM {FTS_TABLE} CROSS JOIN {DOC_TABLE} d ON d.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s AND {' AND '.join(where)} GROUP BY d.kind"
+        )
+    elif engine == "postgres":
+        sql = (
+            f"SELECT d.kind, COUNT(*) FROM {DOC_TABLE} d "
+            f"WHERE d.search_vector @@ to_tsquery('simple', %s) AND {' AND '.join(where)} GROUP BY d.kind"
+        )
+    else:
+        qs = _basic_documents(terms)
+        if public_only:
+            qs = qs.filter(is_public=True)
+        counts.update(qs.values_list("kind").annotate(n=Count("id")).order_by())
+        return counts
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [_match_expression(terms), *params])
+        counts.update(cursor.fetchall())
+    return counts
+
+
+def _filters(kinds, public_only, alias):
+    sql = [f"{alias}.kind IN ({', '.join(['%s'] * len(kinds))})"]
+    params = list(kinds)
+    if public_only:
+        sql.append(f"{alias}.is_public = %s")
+        params.append(True)
+    return sql, params
+
+
+def _keyset(after):
+    if not after:
+        return "", []
+    rank, doc_id = after
+    return "WHERE s.rank > %s OR (s.rank = %s AND s.id > %s)", [rank, rank, doc_id]
+
+
+def _search_fts5(terms, kinds, public_only, limit, after):
+    match = _match_expression(terms)
+    where, params = _filters(kinds, public_only, "d")
+    keyset, keyset_params = _keyset(after)
+    # bm25(): lower is better; title matches weigh 10x body matches
+    sql = (
+        f"SELECT s.id, s.kind, s.object_id, s.title, s.rank FROM ("
+        f"  SELECT d.id, d.kind, d.object_id, d.title, bm25({FTS_TABLE}, 10.0, 1.0) AS rank"
+        f"  FROM {FTS_TABLE} CROSS JOIN {DOC_TABLE} d ON d.id = {FTS_TABLE}.rowid"
+        f"  WHERE {FTS_TABLE} MATCH %s AND {' AND '.join(where)}"
+        f") s {keyset} ORDER BY s.rank, s.id LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, *params, *keyset_params, limit])
+        rows = cursor.fetchall()
+        if not rows:
+            return []
+        # Snippets only for the page being returned, not every match
+        ids = [r[0] for r in rows]
+        cursor.execute(
+            f"SELECT rowid, snippet({FTS_TABLE}, 1, %s, %s, '…', %s) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid IN ({', '.join(['%s'] * len(ids))})",
+            [HL_START, HL_END, SNIPPET_WORDS, match, *ids],
+        )
+        snippets = dict(cursor.fetchall())
+    return [
+        SearchResult(kind, object_id, title, _highlight(snippets.get(doc_id, "")), rank, doc_id)
+        for doc_id, kind, object_id, title, rank in rows
+    ]
+
+
+def _search_postgres(terms, kinds, public_only, limit, after):
+    tsquery = _match_expression(terms)
+    where, params = _filters(kinds, public_only, "d")
+    keyset, keyset_params = _keyset(after)
+    options = f"StartSel={HL_START}, StopSel={HL_END}, MaxWords={SNIPPET_WORDS}, MinWords=8, MaxFragments=2"
+    # Negated ts_rank so that, as with bm25, ascending order is best-first
+    sql = (
+        f"SELECT s.id, s.kind, s.object_id, s.title,"
+        f"  ts_headline('simple', s.body, to_tsquery('simple', %s), %s), s.rank FROM ("
+        f"  SELECT d.id, d.kind, d.object_id, d.title, d.body,"
+        f"    -ts_rank(d.search_vector, to_tsquery('simple', %s))::float8 AS rank"
+        f"  FROM {DOC_TABLE} d"
+        f"  WHERE d.search_vector @@ to_tsquery('simple', %s) AND {' AND '.join(where)}"
+        f") s {keyset} ORDER BY s.rank, s.id LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [tsquery, options, tsquery, tsquery, *params, *keyset_params, limit])
+        rows = cursor.fetchall()
+    return [
+        SearchResult(kind, object_id, title, _highlight(snippet), rank, doc_id)
+        for doc_id, kind, object_id, title, snippet, rank in rows
+    ]
+
+
+def _basic_documents(terms):
+    qs = SearchDocument.objects.all()
+    for term in terms:
+        qs = qs.filter(Q(title__icontains=term) | Q(body__icontains=term))
+    return qs
+
+
+def _search_basic(terms, kinds, public_only, limit, after):
+    qs = _basic_documents(terms).filter(kind__in=kinds)
+    if public_only:
+        qs = qs.filter(is_public=True)
+    qs = qs.annotate(rank=Case(
+        When(title__icontains=terms[0], then=Value(-2.0)),
+        default=Value(-1.0), output_field=FloatField(),
+    ))
+    if after:
+        rank, doc_id = after
+        qs = qs.filter(Q(rank__gt=rank) | Q(rank=rank, id__gt=doc_id))
+    results = []
+    for doc in qs.order_by("rank", "id")[:limit]:
+        snippet = Truncator(doc.body).words(SNIPPET_WORDS)
+        pattern = re.compile("|".join(re.escape(t) for t in terms), re.I)
+        snippet = pattern.sub(lambda m: f"{HL_START}{m.group(0)}{HL_END}", snippet)
+        results.append(SearchResult(doc.kind, doc.object_id, doc.title, _highlight(snippet), doc.rank, doc.id))
+    return results
@@ -0,0 +1,151 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete, pre_save
+from PIL import Image
+
+from . import inbox, jobs, search
+from .caching import bump_generation, bump_instance
+from .images import delete_derivatives, has_derivatives, intrinsic
+from .models import SiteSettings, Program, News, Event, DonationMethod, Gallery, ContactMessage
+
+# Models rendered on public pages; saving/deleting one invalidates the
+# snapshot, cached pages, ... that depend on it (see caching.py)
+CACHED_MODELS = (SiteSettings, Program, News, Event, DonationMethod, Gallery)
+
+# Counted/listed on the admin dashboard only. Nothing is cached per row, so
+# only the model-level generation is bumped (no gen:<model>:<pk> keys).
+ADMIN_CACHED_MODELS = (ContactMessage,)
+
+# Models mirrored into the full-text search index (see search.py)
+SEARCH_MODELS = tuple(spec[0] for spec in search.SEARCHABLE.values())
+
+# Models whose `image` uploads are processed by the image job queue
+IMAGE_MODELS = (Program, News, Event, Gallery)
+
+
+def content_changed(sender, instance, **kwargs):
+    bump_instance(instance)
+
+
+def admin_content_changed(sender, instance, **kwargs):
+    bump_generation(instance._meta.model_name)
+
+
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_instance(instance)
+
+
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_instance(instance)
+
+
+def remember_read_state(sender, instance, **kwargs):
+    # None when a flag was deferred: reading it here would cost a query
+    fields = instance.__dict__
+    if "is_read" in fields and "is_archived" in fields:
+        instance._loaded_unread = inbox.counts_as_unread(fields["is_read"], fields["is_archived"])
+    else:
+        instance._loaded_unread = None
+
+
+def message_saved(sender, instance, created, raw=False, **kwargs):
+    # Keep the materialized unread counter in step without recounting
+    was_unread = False if created else instance._loaded_unread
+    is_unread = inbox.counts_as_unread(instance.is_read, instance.is_archived)
+    if raw or was_unread is None:
+        inbox.invalidate()
+    elif was_unread != is_unread:
+        inbox.adjust_unread(1 if is_unread else -1)
+    else:
+        inbox.adjust_unread(0)  # subject/name may show in the feed
+    instance._loaded_unread = is_unread
+
+
+def message_deleted(sender, instance, **kwargs):
+    if instance._loaded_unread is None:
+        inbox.invalidate()
+    else:
+        inbox.adjust_unread(-1 if instance._loaded_unread else 0)
+
+
+def capture_image_size(sender, instance, raw=False, **kwargs):
+    # New uploads are still in memory here, so this costs no extra storage read
+    image = instance.image
+    if raw:
+        return
+    if not image:
+        instance.image_width = instance.image_height = None
+        instance.image_placeholder = ""
+        return
+    if image._committed and instance.image_width is not None:
+        return
+    try:
+        instance.image_width, instance.image_height, instance.image_placeholder = intrinsic(image)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        pass  # rendered without width/height; the job queue reports bad files
+
+
+def remember_image(sender, instance, **kwargs):
+    # Raw field values: reading the descriptors would load deferred fields
+    image = instance.__dict__.get("image")
+    instance._loaded_image = (getattr(image, "name", image), instance.__dict__.get("image_width"))
+
+
+def _drop_derivatives_on_commit(instance, name, width):
+    storage = type(instance)._meta.get_field("image").storage
+    transaction.on_commit(partial(delete_derivatives, storage, name, width))
+
+
+def drop_replaced_derivatives(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    name, width = getattr(instance, "_loaded_image", (None, None))
+    if name is None:  # image was deferred
+        row = sender.objects.filter(pk=instance.pk).values_list("image", "image_width").first()
+        name, width = row or ("", None)
+    if name and name != instance.image.name:
+        _drop_derivatives_on_commit(instance, name, width)
+
+
+def drop_deleted_derivatives(sender, instance, **kwargs):
+    if instance.image:
+        _drop_derivatives_on_commit(instance, instance.image.name, instance.image_width)
+
+
+def queue_image_processing(sender, instance, raw=False, **kwargs):
+    # Heavy work happens in `manage.py process_image_jobs`, not in the request.
+    image = instance.image
+    if raw or not image or has_derivatives(image) or jobs.is_queued(instance):
+        return
+    jobs.enqueue(instance)
+
+
+for _model in CACHED_MODELS:
+    post_save.connect(content_changed, sender=_model, dispatch_uid=f"cache_{_model.__name__}_save")
+    post_delete.connect(content_changed, sender=_model, dispatch_uid=f"cache_{_model.__name__}_delete")
+
+for _model in ADMIN_CACHED_MODELS:
+    post_save.connect(admin_content_changed, sender=_model, dispatch_uid=f"cache_{_model.__name__}_save")
+    post_delete.connect(admin_content_changed, sender=_model, dispatch_uid=f"cache_{_model.__name__}_delete")
+
+for _model in IMAGE_MODELS:
+    pre_save.connect(capture_image_size, sender=_model, dispatch_uid=f"image_size_{_model.__name__}")
+    post_save.connect(
+        queue_image_processing, sender=_model,
+        dispatch_uid=f"image_jobs_{_model.__name__}",
+    )
+    # Derivatives of a replaced or deleted upload are removed once committed
+    post_init.connect(remember_image, sender=_model, dispatch_uid=f"image_init_{_model.__name__}")
+    pre_save.connect(drop_replaced_derivatives, sender=_model, dispatch_uid=f"image_replace_{_model.__name__}")
+    post_save.connect(remember_image, sender=_model, dispatch_uid=f"image_saved_{_model.__name__}")
+    post_delete.connect(drop_deleted_derivatives, sender=_model, dispatch_uid=f"image_delete_{_model.__name__}")
+
+for _model in SEARCH_MODELS:
+    post_save.connect(update_search_index, sender=_model, dispatch_uid=f"search_{_model.__name__}_save")
+    post_delete.connect(remove_from_search_index, sender=_model, dispatch_uid=f"search_{_model.__name__}_delete")
+
+post_init.connect(remember_read_state, sender=ContactMessage, dispatch_uid="inbox_init")
+post_save.connect(message_saved, sender=ContactMessage, dispatch_uid="inbox_save")
+post_delete.connect(message_deleted, sender=ContactMessage, dispatch_uid="inbox_delete")
@@ -1,6 +1,15 @@
+"""
+Sitemap index (/sitemap.xml) with one section per content type
+(/sitemap-<section>.xml).
+
+Sections are rendered once per content change and served from the cache
+(see views.sitemap_index / views.sitemap_section), with ETag and
+Last-Modified so crawlers revalidating an unchanged sitemap get a 304.
+"""
 from django.contrib.sitemaps import Sitemap
+from django.db.models import Max
 from django.urls import reverse
-from .models import News, Program
+from .models import News, Program, Event, Gallery
 
 class StaticViewSitemap(Sitemap):
     priority = 0.5
@@ -18,7 +27,7 @@ class NewsSitemap(Sitemap):
     priority = 0.6
 
     def items(self):
-        return News.objects.filter(is_published=True)
+        return News.objects.filter(is_published=True).order_by('-updated_at', '-id')
 
     def lastmod(self, obj):
         return obj.updated_at
@@ -28,7 +37,55 @@ class ProgramSitemap(Sitemap):
     priority = 0.7
 
     def items(self):
-        return Program.objects.filter(is_active=True)
+        return Program.objects.filter(is_active=True).order_by('-id')
+
+    def location(self, obj):
+        return reverse('website:program_detail', args=[obj.pk])
+
+    def lastmod(self, obj):
+        return obj.updated_at
+
+class EventSitemap(Sitemap):
+    changefreq = 'weekly'
+    priority = 0.6
+
+    def items(self):
+        return Event.objects.filter(is_published=True).order_by('-event_date', '-id')
+
+    def location(self, obj):
+        return reverse('website:event_detail', args=[obj.pk])
 
     def lastmod(self, obj):
-        return obj.updated_at
\ No newline at end of file
+        return obj.updated_at
+
+class GallerySitemap(Sitemap):
+    """Gallery items have no page of their own: list the gallery and its category pages."""
+    changefreq = 'weekly'
+    priority = 0.4
+
+    def items(self):
+        latest = dict(
+            Gallery.objects.filter(is_published=True).order_by()
+            .values_list('category').annotate(latest=Max('created_at'))
+        )
+        items = [('all', max(latest.values()))] if latest else []
+        return items + sorted(latest.items())
+
+    def location(self, item):
+        category = item[0]
+        url = reverse('website:gallery')
+        return url if category == 'all' else f"{url}?category={category}"
+
+    def lastmod(self, item):
+        return item[1]
+
+
+# section -> (sitemap, generations it is rendered from; see caching.py)
+SECTIONS = {
+    'static': (StaticViewSitemap, ()),
+    'programs': (ProgramSitemap, ('program',)),
+    'news': (NewsSitemap, ('news',)),
+    'events': (EventSitemap, ('event',)),
+    'gallery': (GallerySitemap, ('gallery',)),
+}
+SITEMAPS = {name: sitemap for name, (sitemap, _) in SECTIONS.items()}
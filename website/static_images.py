@@ -0,0 +1,167 @@
+"""
+Build-time optimization of the photos under static/images.
+
+During collectstatic (see website.storage), every PNG/JPEG under IMAGES_DIR
+gets resized WebP variants plus a JPEG (or PNG, when the image really uses
+transparency) fallback, written to ``images/optimized/`` under
+content-hashed names:
+
+    images/optimized/orphans-640w.3f2a9c1b7d4e.webp
+
+The source files are left untouched. ``images/optimized/manifest.json``
+records the variants of each source, and ``{% static_image %}`` reads it to
+render a <picture> whose fallback <img> is the smallest acceptable variant.
+"""
+import hashlib
+import json
+import os
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .images import _encode, target_widths
+
+IMAGES_DIR = "images/"
+OPTIMIZED_DIR = "images/optimized"
+MANIFEST_NAME = "images/optimized/manifest.json"
+SOURCE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+# Icons and other small files are not worth a <picture>
+MIN_SOURCE_BYTES = 50 * 1024
+PNG_OPTIONS = {"optimize": True}
+
+_manifest = None
+
+
+def is_source(path):
+    return (
+        path.startswith(IMAGES_DIR)
+        and not path.startswith(OPTIMIZED_DIR + "/")
+        and path.lower().endswith(SOURCE_EXTENSIONS)
+    )
+
+
+def variant_name(path, width, ext, data):
+    stem = posixpath.splitext(posixpath.basename(path))[0]
+    digest = hashlib.md5(data).hexdigest()[:12]
+    return f"{OPTIMIZED_DIR}/{stem}-{width}w.{digest}.{ext}"
+
+
+def _uses_alpha(img):
+    return img.mode == "RGBA" and img.getchannel("A").getextrema()[0] < 255
+
+
+def _encode_png(img, width):
+    resized = img
+    if img.width > width:
+        resized = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+    buf = BytesIO()
+    resized.save(buf, "PNG", **PNG_OPTIONS)
+    return buf.getvalue()
+
+
+def _open(data):
+    img = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+    img.load()
+    return img
+
+
+def _build_entry(storage, path, data, digest):
+    img = _open(data)
+    fallback = "png" if _uses_alpha(img) else "jpg"
+    if fallback == "jpg" and img.mode != "RGB":
+        img = img.convert("RGB")
+
+    variants = {"webp": [], fallback: []}
+    for width in target_widths(img.width):
+        for ext in variants:
+            encoded = _encode_png(img, width) if ext == "png" else _encode(img, width, ext)
+            name = variant_name(path, width, ext, encoded)
+            if not storage.exists(name):
+                storage.save(name, ContentFile(encoded))
+            variants[ext].append([width, name, len(encoded)])
+    return {
+        "source": digest,
+        "width": img.width,
+        "height": img.height,
+        "bytes": len(data),
+        "fallback": fallback,
+        "variants": variants,
+    }
+
+
+def _reusable(storage, entry, digest):
+    """A previous entry for unchanged source bytes whose files are all present."""
+    return (
+        entry is not None
+        and entry.get("source") == digest
+        and all(storage.exists(name) for rows in entry["variants"].values() for _, name, _ in rows)
+    )
+
+
+def optimize(storage, sources, workers=None):
+    """
+    Write variants for `sources` ({path: source storage}) into `storage` and
+    save the manifest. Unchanged sources are reused from the previous
+    manifest; the rest are encoded in parallel (Pillow releases the GIL while
+    encoding). Returns the manifest.
+    """
+    previous = read_manifest(storage)
+    manifest, pending = {}, []
+    for path, source_storage in sorted(sources.items()):
+        if source_storage.size(path) < MIN_SOURCE_BYTES:
+            continue
+        with source_storage.open(path, "rb") as fh:
+            data = fh.read()
+        digest = hashlib.md5(data).hexdigest()
+        entry = previous.get(path)
+        if _reusable(storage, entry, digest):
+            manifest[path] = entry
+        else:
+            pending.append((path, data, digest))
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        built = pool.map(lambda job: _build_entry(storage, *job), pending)
+        for (path, _, _), entry in zip(pending, built):
+            manifest[path] = entry
+
+    if storage.exists(MANIFEST_NAME):
+        storage.delete(MANIFEST_NAME)
+    storage.save(MANIFEST_NAME, ContentFile(json.dumps(manifest, indent=1, sort_keys=True).encode()))
+    return manifest
+
+
+def read_manifest(storage=None):
+    storage = storage or staticfiles_storage
+    try:
+        with storage.open(MANIFEST_NAME) as fh:
+            return json.loads(fh.read().decode())
+    except (FileNotFoundError, ValueError, ImproperlyConfigured):
+        return {}
+
+
+def manifest():
+    """The collected manifest, read once per process ({} before collectstatic)."""
+    global _manifest
+    if _manifest is None:
+        _manifest = read_manifest()
+    return _manifest
+
+
+def pick(variants, width):
+    """Smallest variant at least `width` px wide, else the largest one."""
+    for row in variants:
+        if row[0] >= width:
+            return row
+    return variants[-1]
+
+
+def variant_names(entry):
+    return [name for rows in entry["variants"].values() for _, name, _ in rows]
+
@@ -0,0 +1,49 @@
+"""
+Static files storage that optimizes static/images during collectstatic.
+
+    STORAGES = {
+        ...,
+        "staticfiles": {"BACKEND": "website.storage.OptimizedStaticFilesStorage"},
+    }
+
+Built on WhiteNoise's compressed manifest storage: every file gets a
+content-hashed name plus .gz (and .br with Brotli installed) siblings, and
+WhiteNoiseMiddleware serves hashed names with a far-future Cache-Control.
+"""
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from . import static_images
+
+
+class OptimizedImagesMixin:
+    """Run static_images.optimize() after the regular post-processing."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        parent = getattr(super(), "post_process", None)
+        if parent is not None:
+            yield from parent(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+
+        sources = {
+            path: source_storage
+            for path, (source_storage, _) in paths.items()
+            if static_images.is_source(path)
+        }
+        manifest = static_images.optimize(self, sources)
+        names = [name for entry in manifest.values() for name in static_images.variant_names(entry)]
+        names.append(static_images.MANIFEST_NAME)
+
+        # Variants already carry a content hash; list them as-is so url() finds them
+        hashed_files = getattr(self, "hashed_files", None)
+        if hashed_files is not None:
+            for name in names:
+                hashed_files[self.hash_key(name)] = name
+            self.save_manifest()
+
+        for name in names:
+            yield name, name, True
+
+
+class OptimizedStaticFilesStorage(OptimizedImagesMixin, CompressedManifestStaticFilesStorage):
+    pass
@@ -0,0 +1,1290 @@
+import datetime
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+from collections import defaultdict
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.template import Context, Template
+from django.template.loader import render_to_string
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, resolve, reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from admin_panel.views import BULK_MAX_IDS
+
+try:
+    from fontTools.ttLib import TTFont
+except ImportError:  # only needed to check the icon subset
+    TTFont = None
+
+from PIL import ExifTags, Image
+
+from . import benchmarks, caching, context_processors, critical_css, images, inbox, instrumentation, jobs, media, search, static_images
+from .caching import cache_public_page
+from .compression import CompressionMiddleware, brotli
+from .management.commands import build_icons
+from .models import (
+    ContactMessage, DonationMethod, Event, Gallery, ImageJob, News, Program, SearchDocument, SiteSettings,
+)
+from .pagination import CursorPaginator, encode_token
+
+
+def programs_n_plus_one(request):
+    """One query for the list plus one per row: what query_growth must catch."""
+    titles = [Program.objects.get(pk=pk).title for pk in Program.objects.values_list("pk", flat=True)]
+    return HttpResponse(", ".join(titles))
+
+
+def programs_single_query(request):
+    return HttpResponse(", ".join(Program.objects.values_list("title", flat=True)))
+
+
+@cache_public_page("program")
+def cached_page(request):
+    return HttpResponse(", ".join(Program.objects.values_list("title", flat=True)))
+
+
+@cache_public_page()
+def cached_page_setting_cookie(request):
+    response = HttpResponse("per visitor")
+    response.set_cookie("seen", "1")
+    return response
+
+
+@cache_public_page()
+def cached_page_with_message(request):
+    messages.info(request, "Thanks!")
+    return HttpResponse("with a flash message")
+
+
+@cache_public_page()
+def cached_page_with_csrf_token(request):
+    return HttpResponse(get_token(request))
+
+
+urlpatterns = [
+    path("n-plus-one/", programs_n_plus_one),
+    path("single-query/", programs_single_query),
+    path("cached/", cached_page),
+    path("cached/cookie/", cached_page_setting_cookie),
+    path("cached/message/", cached_page_with_message),
+    path("cached/csrf/", cached_page_with_csrf_token),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class QueryGrowthTests(TestCase):
+    scenarios = [
+        benchmarks.Scenario("n_plus_one", "/n-plus-one/", False),
+        benchmarks.Scenario("single_query", "/single-query/", False),
+    ]
+
+    def measure(self, rows):
+        Program.objects.all().delete()
+        Program.objects.bulk_create(Program(title=f"Program {n}", description="-") for n in range(rows))
+        with override_settings(CACHES=benchmarks.isolated_caches()):
+            return benchmarks.Runner(None, repeat=1).run(self.scenarios)
+
+    def test_growing_view_fails_the_check(self):
+        results = {"tiny": self.measure(2), "small": self.measure(6)}
+
+        self.assertEqual(results["tiny"]["n_plus_one"]["queries"], 3)
+        self.assertEqual(results["small"]["n_plus_one"]["queries"], 7)
+        self.assertEqual(benchmarks.query_growth(results), [("n_plus_one", {"tiny": 3, "small": 7})])
+        self.assertTrue(results["small"]["n_plus_one"]["nplusone"])
+        self.assertFalse(results["small"]["single_query"]["nplusone"])
+
+    def test_query_regression_against_baseline(self):
+        baseline = {"tiny": self.measure(2)}
+        results = {"tiny": self.measure(3)}
+
+        regressions = benchmarks.compare(results, baseline)
+        self.assertIn(("tiny", "n_plus_one", "queries", 3, 4), regressions)
+        self.assertNotIn("single_query", [view for _, view, metric, _, _ in regressions if metric == "queries"])
+
+
+class SiteSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caching._local.__dict__.clear()
+        SiteSettings.objects.create(pk=1, site_name="Al Hadid")
+
+    def snapshot_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(reverse("website:contact")).status_code, 200)
+        return [q["sql"] for q in ctx.captured_queries
+                if "website_sitesettings" in q["sql"] or "website_gallery" in q["sql"]]
+
+    def test_warm_render_reads_nothing(self):
+        self.assertEqual(len(self.snapshot_queries()), 2)  # settings row + photo count
+        self.assertEqual(self.snapshot_queries(), [])
+        caching._local.__dict__.clear()  # another worker: served from the shared cache
+        self.assertEqual(self.snapshot_queries(), [])
+
+    def test_saves_rebuild_the_snapshot(self):
+        self.assertEqual(caching.site_snapshot()["photos_count"], 0)
+        site_settings = SiteSettings.objects.get(pk=1)
+        site_settings.site_name = "Al Hadid Foundation"
+        site_settings.save()
+        self.assertEqual(caching.site_snapshot()["settings"].site_name, "Al Hadid Foundation")
+
+        photo = Gallery.objects.create(title="Photo", image="gallery/photo.jpg")
+        self.assertEqual(caching.site_snapshot()["photos_count"], 1)
+        photo.is_published = False
+        photo.save()
+        self.assertEqual(caching.site_snapshot()["photos_count"], 0)
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.program = Program.objects.create(title="Wells", description="-")
+
+    def get(self, url="/cached/"):
+        return self.client.get(url)
+
+    def test_hit_costs_no_queries(self):
+        self.assertEqual(self.get()["X-Page-Cache"], "miss")
+        with self.assertNumQueries(0):
+            response = self.get()
+        self.assertEqual(response["X-Page-Cache"], "hit")
+        self.assertEqual(response.content, b"Wells")
+
+    def test_saving_a_row_purges_the_page(self):
+        self.get()
+        self.program.title = "Boreholes"
+        self.program.save()
+        response = self.get()
+        self.assertEqual((response["X-Page-Cache"], response.content), ("miss", b"Boreholes"))
+
+        Program.objects.create(title="Clinics", description="-")
+        self.assertEqual(self.get()["X-Page-Cache"], "miss")
+        self.program.delete()
+        response = self.get()
+        self.assertEqual((response["X-Page-Cache"], response.content), ("miss", b"Clinics"))
+
+    def test_unrelated_changes_keep_the_page(self):
+        self.get()
+        ContactMessage.objects.create(name="A", email="a@example.com", subject="Hi", message="Hello")
+        self.assertEqual(self.get()["X-Page-Cache"], "hit")
+
+    def test_logged_in_users_get_the_live_page(self):
+        self.get()
+        self.client.force_login(User.objects.create_user("staff", password="x"))
+        response = self.get()
+        self.assertNotIn("X-Page-Cache", response)
+
+    def test_per_visitor_responses_are_never_stored(self):
+        for url in ["/cached/cookie/", "/cached/message/", "/cached/csrf/"]:
+            with self.subTest(url=url):
+                self.client = self.client_class()
+                self.assertEqual(self.get(url)["X-Page-Cache"], "miss")
+                self.client = self.client_class()
+                self.assertEqual(self.get(url)["X-Page-Cache"], "miss")
+
+    def test_query_string_and_theme_are_part_of_the_key(self):
+        self.get()
+        self.assertEqual(self.get("/cached/?page=2")["X-Page-Cache"], "miss")
+        session = self.client.session
+        session["theme"] = "dark"
+        session.save()
+        self.assertEqual(self.get()["X-Page-Cache"], "miss")
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        SiteSettings.objects.create(pk=1)
+        self.program = Program.objects.create(title="Wells", description="-")
+        self.url = reverse("website:program_detail", args=[self.program.pk])
+
+    def test_matching_etag_gets_304_without_queries(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+        self.program.title = "Boreholes"
+        self.program.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertContains(response, "Boreholes")
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.url)["Last-Modified"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        earlier = http_date(self.program.updated_at.timestamp() - 60)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=earlier).status_code, 200)
+
+    def test_settings_change_and_theme_invalidate_the_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        site_settings = SiteSettings.objects.get(pk=1)
+        site_settings.site_name = "Renamed"
+        site_settings.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get(self.url)["ETag"]
+        self.client.post(reverse("website:toggle_theme"), {"theme": "dark"})
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_hidden_rows_are_not_found(self):
+        self.program.is_active = False
+        self.program.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH="*").status_code, 404)
+
+    def test_sitemap_revalidation(self):
+        url = reverse("website:sitemap_section", args=["programs"])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Program.objects.create(title="Clinics", description="-")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, reverse("website:program_detail", args=[self.program.pk + 1]))
+
+
+class MediaRangeTests(TestCase):
+    body = bytes(range(256)) * 4
+
+    def setUp(self):
+        media_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(media_dir.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media_dir.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        with open(os.path.join(media_dir.name, "clip.bin"), "wb") as fh:
+            fh.write(self.body)
+
+    def serve(self, **headers):
+        return media.serve(RequestFactory().get("/media/clip.bin", **headers), "clip.bin")
+
+    def test_parse_range(self):
+        for header, expected in [
+            ("bytes=0-99", (0, 99)),
+            ("bytes=100-", (100, 1023)),
+            ("bytes=-24", (1000, 1023)),
+            ("bytes=1000-5000", (1000, 1023)),
+            ("bytes=-5000", (0, 1023)),
+            ("bytes=5-1", None),
+            ("bytes=0-1,5-6", None),
+            ("bytes=-", None),
+            ("items=0-1", None),
+        ]:
+            with self.subTest(header=header):
+                self.assertEqual(media.parse_range(header, 1024), expected)
+        for header in ["bytes=1024-", "bytes=2000-3000", "bytes=-0"]:
+            with self.subTest(header=header), self.assertRaises(media.RangeNotSatisfiable):
+                media.parse_range(header, 1024)
+
+    def test_single_range_is_206(self):
+        response = self.serve(HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 10-19/1024")
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertEqual(b"".join(response.streaming_content), self.body[10:20])
+
+    def test_ignored_and_unsatisfiable_ranges(self):
+        for headers in [{"HTTP_RANGE": "bytes=0-1,5-6"}, {"HTTP_RANGE": "bytes=0-9", "HTTP_IF_RANGE": '"stale"'}]:
+            with self.subTest(headers=headers):
+                response = self.serve(**headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(b"".join(response.streaming_content), self.body)
+
+        response = self.serve(HTTP_RANGE="bytes=5000-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */1024")
+
+    def test_if_range_and_if_none_match_use_the_etag(self):
+        full = self.serve()
+        etag = full["ETag"]
+        full.close()
+        response = self.serve(HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        response.close()
+        self.assertEqual(self.serve(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+@skipUnless(brotli, "brotli is not installed")
+class CompressionMiddlewareTests(TestCase):
+    html = ("<p>" + "Al Hadid Foundation " * 50 + "</p>").encode()
+
+    def process(self, response, accept="br, gzip", **meta):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept, **meta)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def page(self, content=None):
+        response = HttpResponse(self.html if content is None else content, content_type="text/html")
+        response["ETag"] = '"abc"'
+        return response
+
+    def test_brotli_when_accepted(self):
+        response = self.process(self.page())
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(response.content), self.html)
+        self.assertEqual(response["ETag"], 'W/"abc"')
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_gzip_fallbacks(self):
+        for accept, meta in [("gzip", {}), ("br;q=0, gzip", {}), ("br, gzip", {"CSRF_COOKIE_NEEDS_UPDATE": True})]:
+            with self.subTest(accept=accept, meta=meta):
+                response = self.process(self.page(), accept, **meta)
+                self.assertEqual(response["Content-Encoding"], "gzip")
+                self.assertEqual(gzip.decompress(response.content), self.html)
+
+    def test_small_or_binary_responses_are_untouched(self):
+        self.assertFalse(self.process(self.page(b"<p>hi</p>")).has_header("Content-Encoding"))
+        image = HttpResponse(self.html, content_type="image/png")
+        self.assertFalse(self.process(image).has_header("Content-Encoding"))
+
+    def test_streamed_brotli_round_trips(self):
+        rows = [f"row {n},{'x' * 40}\n".encode() for n in range(2000)]
+        response = self.process(StreamingHttpResponse(iter(rows), content_type="text/csv"))
+        self.assertEqual(response["Content-Encoding"], "br")
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 2)  # flushed as it goes, not buffered whole
+        self.assertEqual(brotli.decompress(b"".join(chunks)), b"".join(rows))
+
+
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "x"))
+        for n in range(6):
+            ContactMessage.objects.create(
+                name=f"Sender {n}", email=f"s{n}@example.com", subject=f"Subject {n}", message="Hello",
+                is_read=n % 3 == 0,
+            )
+        self.ids = list(ContactMessage.objects.order_by("pk").values_list("pk", flat=True))
+
+    def assertCounterMatches(self):
+        expected = ContactMessage.objects.filter(is_read=False, is_archived=False).count()
+        self.assertEqual(inbox.unread_count(), expected)
+        self.assertEqual(len(inbox.notification_feed()), min(expected, inbox.FEED_SIZE))
+
+    def bulk(self, action, ids=None, **extra):
+        data = {"action": action, **extra}
+        if ids is not None:
+            data.update(scope="selected", ids=ids)
+        else:
+            data["scope"] = "filter"
+        response = self.client.post(reverse("admin_panel:messages_bulk"), data)
+        self.assertEqual(response.status_code, 302)
+
+    def test_every_bulk_action(self):
+        self.assertCounterMatches()
+        for action, ids in [
+            ("read", self.ids[:2]),
+            ("unread", self.ids[:4]),
+            ("archive", self.ids[1:3]),
+            ("unread", self.ids[1:3]),  # archived rows stay out of the count
+            ("read", None),
+            ("unread", None),
+            ("delete", self.ids[3:5]),
+            ("archive", None),
+            ("delete", None),
+        ]:
+            with self.subTest(action=action, ids=ids):
+                self.bulk(action, ids)
+                self.assertCounterMatches()
+
+    def test_bulk_action_with_status_filter(self):
+        self.bulk("archive", status="unread")
+        self.assertCounterMatches()
+        self.assertEqual(inbox.unread_count(), 0)
+        self.assertTrue(ContactMessage.objects.filter(is_archived=True, is_read=False).exists())
+
+    def test_single_message_actions_adjust_the_counter(self):
+        self.assertCounterMatches()  # materialized: the signals now adjust it in place
+        steps = [
+            ("admin_panel:messages_mark_read", self.ids[1]),
+            ("admin_panel:messages_mark_unread", self.ids[0]),
+            ("admin_panel:message_delete", self.ids[2]),
+            ("admin_panel:message_delete", self.ids[3]),
+        ]
+        for name, pk in steps:
+            with self.subTest(name=name, pk=pk):
+                self.client.post(reverse(name, args=[pk]))
+                self.assertCounterMatches()
+
+        message = ContactMessage.objects.get(pk=self.ids[4])
+        message.is_archived = True
+        message.save()
+        self.assertCounterMatches()
+        ContactMessage.objects.create(name="New", email="new@example.com", subject="Hi", message="Hello")
+        self.assertCounterMatches()
+        self.client.post(reverse("admin_panel:messages_mark_all_read"))
+        self.assertCounterMatches()
+
+    def test_bulk_delete_is_one_statement(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.bulk("delete")
+        deletes = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("DELETE")]
+        self.assertEqual(len(deletes), 1)
+        self.assertIn("website_contactmessage", deletes[0])
+        self.assertFalse(ContactMessage.objects.exists())
+        self.assertCounterMatches()
+
+    def test_too_many_selected_ids_are_rejected(self):
+        ids = self.ids + list(range(10_000, 10_000 + BULK_MAX_IDS))
+        response = self.client.post(reverse("admin_panel:messages_bulk"),
+                                    {"action": "read", "scope": "selected", "ids": ids}, follow=True)
+        self.assertContains(response, f"at most {BULK_MAX_IDS}")
+        self.assertEqual(ContactMessage.objects.filter(is_read=False).count(), 4)
+
+
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        SiteSettings.objects.create(pk=1)
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "x"))
+
+    def recent(self):
+        return [m.subject for m in self.client.get(reverse("admin_panel:dashboard")).context["recent_messages"]]
+
+    def test_message_changes_bump_only_the_model_generation(self):
+        message = ContactMessage.objects.create(name="A", email="a@example.com", subject="First", message="Hi")
+        self.assertEqual(self.recent(), ["First"])
+        with self.assertNumQueries(2):  # session and user: counts, lists and badge come from the cache
+            self.recent()
+
+        message.subject = "Edited"
+        message.save()
+        self.assertEqual(self.recent(), ["Edited"])
+        message.delete()
+        self.assertEqual(self.recent(), [])
+        self.assertIsNone(cache.get(f"gen:contactmessage:{message.pk}"))
+
+
+class LazyContextStatsTests(TestCase):
+    def setUp(self):
+        context_processors.resolved_values.clear()
+        self.addCleanup(context_processors.resolved_values.clear)
+
+    def test_not_recorded_unless_enabled(self):
+        self.client.get(reverse("website:home"))
+        self.assertEqual(context_processors.lazy_context_report(), {})
+
+    @override_settings(LAZY_CONTEXT_STATS=True)
+    def test_unresolved_paths_share_one_entry(self):
+        self.client.get(reverse("website:home"))
+        for n in range(3):
+            # e.g. a custom 404 page: no resolver_match
+            request = RequestFactory().get(f"/no-such-page-{n}/")
+            context_processors.LazyValue(request, "photos_count", lambda request: 0)()
+        report = context_processors.lazy_context_report()
+        self.assertIn("website:home", report)
+        self.assertEqual(report[context_processors.UNRESOLVED], {"photos_count": 3})
+        self.assertEqual(len(report), 2)
+
+
+class ExportContentTests(TestCase):
+    def test_writes_through_command_stdout(self):
+        for n in range(3):
+            ContactMessage.objects.create(name=f"Sender {n}", email="s@example.com", subject="Hi", message="Hello",
+                                          is_archived=n == 2)
+        out = io.StringIO()
+        call_command("export_content", "messages", "--format", "jsonl", stdout=out)
+
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([r["name"] for r in rows], ["Sender 1", "Sender 0"])
+
+
+class CursorPaginatorTests(TestCase):
+    ordering = ("-created_at", "-id")
+
+    def setUp(self):
+        for n in range(7):
+            ContactMessage.objects.create(name=f"Sender {n}", email="s@example.com", subject="Hi", message="Hello")
+        # Five rows share one timestamp, so pages must split inside the tie
+        stamp = timezone.now() - datetime.timedelta(days=1)
+        ids = list(ContactMessage.objects.order_by("pk").values_list("pk", flat=True))
+        ContactMessage.objects.filter(pk__in=ids[1:6]).update(created_at=stamp)
+        self.expected = list(ContactMessage.objects.order_by(*self.ordering).values_list("pk", flat=True))
+        self.paginator = CursorPaginator(ContactMessage.objects.all(), self.ordering, per_page=2)
+
+    def ids(self, page):
+        return [m.pk for m in page]
+
+    def test_next_and_previous_across_duplicate_timestamps(self):
+        pages = [self.paginator.page()]
+        while pages[-1].has_next():
+            pages.append(self.paginator.page(pages[-1].next_token))
+
+        self.assertEqual([pk for page in pages for pk in self.ids(page)], self.expected)
+        self.assertEqual([page.first_number for page in pages], [1, 3, 5, 7])
+        self.assertFalse(pages[0].has_previous())
+
+        # Walking back with previous tokens returns exactly the same pages
+        page = pages[-1]
+        for earlier in reversed(pages[:-1]):
+            page = self.paginator.page(page.previous_token)
+            self.assertEqual(self.ids(page), self.ids(earlier))
+            self.assertEqual(page.start_index, earlier.start_index)
+            self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+
+    def test_previous_cursor_from_inside_the_tie(self):
+        middle = self.paginator.page(self.paginator.page().next_token)
+        token = self.paginator.token(ContactMessage.objects.get(pk=self.expected[4]), "p", 2)
+
+        self.assertEqual(self.ids(self.paginator.page(token)), self.ids(middle))
+
+    def test_malformed_or_tampered_cursor_gives_the_first_page(self):
+        first = self.ids(self.paginator.page())
+        valid = self.paginator.page().next_token
+        for token in [
+            "not a token!",
+            "%%%",
+            valid[:-3],
+            encode_token(["n", 1]),
+            encode_token({"v": ["2020-01-01T00:00:00Z"], "d": "n", "i": 2}),  # wrong length
+            encode_token({"v": ["yesterday", "1"], "d": "n", "i": 2}),  # bad timestamp
+            encode_token({"v": ["2020-01-01T00:00:00Z", "x"], "d": "n", "i": 2}),  # bad id
+            encode_token({"v": ["2020-01-01T00:00:00Z", "1"], "d": "sideways", "i": 2}),
+        ]:
+            with self.subTest(token=token):
+                page = self.paginator.page(token)
+                self.assertEqual(self.ids(page), first)
+                self.assertEqual(page.start_index, 0)
+                self.assertFalse(page.has_previous())
+
+
+class ListPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        for n in range(8):
+            News.objects.create(title=f"News {n}", content="-")
+            Event.objects.create(title=f"Event {n}", description="-", event_date=now + datetime.timedelta(days=n))
+            Program.objects.create(title=f"Program {n}", description="-")
+
+    def titles(self, page):
+        return [obj.title for obj in page]
+
+    def test_news_and_events_page_independently(self):
+        url = reverse("website:news_events")
+        first = self.client.get(url).context
+        self.assertEqual(self.titles(first["news"]), [f"News {n}" for n in range(7, 1, -1)])
+        self.assertEqual(self.titles(first["events"]), [f"Event {n}" for n in range(7, 1, -1)])
+
+        second = self.client.get(url + first["news"].next_url).context
+        self.assertEqual(self.titles(second["news"]), ["News 1", "News 0"])
+        self.assertEqual(self.titles(second["events"]), self.titles(first["events"]))
+        # Paging events keeps the news position
+        third = self.client.get(url + second["events"].next_url).context
+        self.assertEqual(self.titles(third["news"]), ["News 1", "News 0"])
+        self.assertEqual(self.titles(third["events"]), ["Event 1", "Event 0"])
+
+    def test_programs_and_donations_are_paginated(self):
+        programs = self.client.get(reverse("website:programs")).context["programs"]
+        self.assertEqual(len(programs), 8)
+        self.assertFalse(programs.has_next())
+
+        for n in range(12):
+            DonationMethod.objects.create(name=f"Bank {n:02}", account_number=str(n), order=n % 3)
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "x"))
+        url = reverse("admin_panel:donations_list")
+        page = self.client.get(url).context["donations"]
+        second = self.client.get(url + page.next_url).context["donations"]
+        expected = list(DonationMethod.objects.order_by("order", "name", "id").values_list("name", flat=True))
+        self.assertEqual([d.name for d in page] + [d.name for d in second], expected)
+
+
+def jpeg_upload(name="photo.jpg", orientation=None, size=(40, 20)):
+    exif = Image.Exif()
+    exif[ExifTags.Base.Make] = "Camera"
+    if orientation:
+        exif[ExifTags.Base.Orientation] = orientation
+    buf = io.BytesIO()
+    Image.new("RGB", size, "teal").save(buf, "JPEG", exif=exif)
+    return SimpleUploadedFile(name, buf.getvalue(), content_type="image/jpeg")
+
+
+class ImageJobTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.photo = Gallery.objects.create(title="Photo", image=jpeg_upload(orientation=6))
+        self.storage = self.photo.image.storage
+
+    def test_claims_oldest_due_job_once(self):
+        later = Gallery.objects.create(title="Later", image=jpeg_upload("later.jpg"))
+        ImageJob.objects.filter(object_id=later.pk).update(run_after=timezone.now() - datetime.timedelta(hours=1))
+        Gallery.objects.create(title="Not due", image=jpeg_upload("future.jpg"))
+        ImageJob.objects.filter(run_after__gt=timezone.now() - datetime.timedelta(minutes=1)).exclude(
+            object_id=self.photo.pk).update(run_after=timezone.now() + datetime.timedelta(hours=1))
+
+        first, second = jobs.claim_next(), jobs.claim_next()
+        self.assertEqual([first.object_id, second.object_id], [later.pk, self.photo.pk])
+        self.assertEqual((first.status, first.attempts), (ImageJob.Status.RUNNING, 1))
+        self.assertIsNone(jobs.claim_next())
+
+    def test_failures_back_off_then_give_up(self):
+        failing = [mock.Mock(side_effect=OSError("disk full"))]
+        with mock.patch.object(jobs, "PIPELINE", failing), self.assertLogs("website.jobs", "ERROR"):
+            for attempt in range(1, 4):
+                ImageJob.objects.update(run_after=timezone.now())
+                job = jobs.run_job(jobs.claim_next())
+                self.assertEqual(job.attempts, attempt)
+                self.assertEqual(job.last_error, "OSError: disk full")
+                if attempt < 3:
+                    self.assertEqual(job.status, ImageJob.Status.PENDING)
+                    self.assertGreater(job.run_after, timezone.now() + datetime.timedelta(seconds=25 * attempt))
+        self.assertEqual(job.status, ImageJob.Status.FAILED)
+        self.assertIsNone(jobs.claim_next())
+
+    def test_strip_metadata_rotates_renames_and_is_idempotent(self):
+        original = self.photo.image.name
+        jobs.strip_metadata(self.photo, self.photo.image)
+
+        self.photo.refresh_from_db()
+        self.assertNotEqual(self.photo.image.name, original)
+        self.assertFalse(self.storage.exists(original))
+        with self.storage.open(self.photo.image.name) as fh, Image.open(fh) as img:
+            self.assertEqual(img.size, (20, 40))
+            self.assertFalse(img.getexif())
+
+        with mock.patch.object(self.storage, "save") as save:
+            jobs.strip_metadata(self.photo, self.photo.image)
+        save.assert_not_called()
+
+    def test_failed_save_keeps_the_original(self):
+        original = self.photo.image.name
+        with mock.patch.object(self.storage, "save", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                jobs.strip_metadata(self.photo, self.photo.image)
+        self.assertTrue(self.storage.exists(original))
+        self.photo.refresh_from_db()
+        self.assertEqual(self.photo.image.name, original)
+
+    def test_rename_changes_the_detail_page_validators(self):
+        cache.clear()
+        SiteSettings.objects.create(pk=1)
+        program = Program.objects.create(title="Wells", description="-", image=jpeg_upload())
+        url = reverse("website:program_detail", args=[program.pk])
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        jobs.run_job(ImageJob.objects.get(model_label="website.program", object_id=program.pk))
+        program.refresh_from_db()
+        self.assertTrue(self.storage.exists(program.image.name))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_import_keeps_content_addressed_names(self):
+        with tempfile.TemporaryDirectory() as source:
+            with open(os.path.join(source, "sunset.jpg"), "wb") as fh:
+                fh.write(jpeg_upload(orientation=6).read())
+            call_command("import_gallery", source, "--workers", "1", stdout=io.StringIO())
+
+        photo = Gallery.objects.get(title="Sunset")
+        self.assertTrue(photo.image.name.startswith("gallery/imported/"))
+        self.assertTrue(self.storage.exists(photo.image.name))
+        with self.storage.open(photo.image.name) as fh, Image.open(fh) as img:
+            self.assertFalse(img.getexif())
+
+
+class ImportGalleryTests(TestCase):
+    def setUp(self):
+        media_dir = tempfile.TemporaryDirectory()
+        source = tempfile.TemporaryDirectory()
+        self.addCleanup(media_dir.cleanup)
+        self.addCleanup(source.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media_dir.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.source = source.name
+
+    def write(self, relative, data=None, **kwargs):
+        path = os.path.join(self.source, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as fh:
+            fh.write(data if data is not None else jpeg_upload(**kwargs).read())
+        return path
+
+    def run_import(self, source, *args):
+        out = io.StringIO()
+        call_command("import_gallery", source, "--workers", "1", *args, stdout=out)
+        return out.getvalue()
+
+    def assertFilesExist(self):
+        for photo in Gallery.objects.all():
+            self.assertTrue(photo.image.storage.exists(photo.image.name), photo.image.name)
+            self.assertTrue(photo.image.name.startswith("gallery/imported/"))
+
+    def test_folder_import_is_resumable(self):
+        self.write("orphans/school_kits.jpg", orientation=6)
+        self.write("misc/eid-gifts.jpg", orientation=3)
+        self.write("orphans/broken.jpg", b"not an image")
+
+        output = self.run_import(self.source)
+        self.assertIn("Imported 2, skipped 0, failed 1", output)
+        self.assertIn("broken.jpg", output)
+        self.assertEqual(
+            dict(Gallery.objects.values_list("title", "category")),
+            {"School Kits": "orphans", "Eid Gifts": "other"},
+        )
+        self.assertEqual(Gallery.objects.filter(image_width__isnull=False).count(), 2)
+        self.assertFilesExist()
+
+        self.write("orphans/new_well.jpg")
+        output = self.run_import(self.source)
+        self.assertIn("Imported 1, skipped 2, failed 1", output)
+        self.assertEqual(Gallery.objects.count(), 3)
+        self.assertFilesExist()
+
+    def test_manifest_import(self):
+        self.write("a.jpg", orientation=6)
+        self.write("b.jpg")
+        manifest = os.path.join(self.source, "manifest.csv")
+        with open(manifest, "w", newline="", encoding="utf-8") as fh:
+            fh.write("file,title,description,category,is_published\n"
+                     "a.jpg,Clinic day,Free checkups,healthcare,yes\n"
+                     "b.jpg,,,unknown,no\n")
+
+        output = self.run_import(manifest, "--category", "women")
+        self.assertIn("unknown category 'unknown'", output)
+        rows = {g.title: g for g in Gallery.objects.all()}
+        self.assertEqual(set(rows), {"Clinic day", "B"})
+        self.assertEqual((rows["Clinic day"].category, rows["Clinic day"].is_published), ("healthcare", True))
+        self.assertEqual(rows["Clinic day"].description, "Free checkups")
+        self.assertEqual((rows["B"].category, rows["B"].is_published), ("women", False))
+        self.assertFilesExist()
+
+
+class SeedScaleTests(TestCase):
+    def seed(self, *args):
+        call_command("seed_scale", "--programs", "3", "--news", "4", "--events", "2", "--gallery", "5",
+                     "--messages", "20", "--images", "0", *args, stdout=io.StringIO())
+
+    def generated(self):
+        return {
+            model.__name__: sorted(model.objects.filter(title__startswith="[scale] ").values_list("title", flat=True))
+            for model in (Program, News, Event, Gallery)
+        }
+
+    def test_purge_round_trip(self):
+        kept = Program.objects.create(title="Real program", description="-")
+        ContactMessage.objects.create(name="Real", email="real@example.com", subject="Hi", message="Hello")
+
+        self.seed()
+        first = self.generated()
+        self.assertEqual({name: len(titles) for name, titles in first.items()},
+                         {"Program": 3, "News": 4, "Event": 2, "Gallery": 5})
+        self.assertEqual(ContactMessage.objects.count(), 21)
+        self.assertEqual(SearchDocument.objects.count(), 15)
+
+        self.seed("--purge")  # same seed: the same rows, not twice as many
+        self.assertEqual(self.generated(), first)
+        self.assertEqual(ContactMessage.objects.count(), 21)
+        self.assertEqual(SearchDocument.objects.count(), 15)
+
+        call_command("seed_scale", "--purge", stdout=io.StringIO())
+        self.assertEqual(list(Program.objects.all()), [kept])
+        self.assertEqual(list(ContactMessage.objects.values_list("name", flat=True)), ["Real"])
+        self.assertEqual(list(SearchDocument.objects.values_list("object_id", flat=True)), [kept.pk])
+        self.assertEqual(inbox.unread_count(), 1)
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.well = Program.objects.create(title="Borehole drilling", description="Clean water for Morogoro villages")
+        self.news = News.objects.create(title="Ramadan iftar", content="Food parcels and a new borehole in Tanga")
+        self.draft = News.objects.create(title="Borehole draft", content="-", is_published=False)
+        self.event = Event.objects.create(title="Eid gifts", description="Gifts for orphans", location="Morogoro",
+                                          event_date=timezone.now())
+
+    def found(self, query, **kwargs):
+        return [(r.kind, r.object_id) for r in search.search(query, **kwargs)]
+
+    def test_prefix_match_ranks_titles_first_and_hides_unpublished(self):
+        self.assertEqual(self.found("boreh"), [("program", self.well.pk), ("news", self.news.pk)])
+        self.assertIn(("news", self.draft.pk), self.found("boreh", public_only=False))
+        self.assertEqual(self.found("morogoro", kinds=["event"]), [("event", self.event.pk)])
+        self.assertEqual(self.found("  "), [])
+
+        snippet = search.search("parcels")[0].snippet
+        self.assertIn("<mark>parcels</mark>", snippet)
+
+    def test_facet_counts(self):
+        self.assertEqual(search.facet_counts("borehole"), {"program": 1, "news": 1, "event": 0, "gallery": 0})
+        self.assertEqual(search.facet_counts("borehole", public_only=False)["news"], 2)
+        self.assertEqual(search.facet_counts("morogoro"), {"program": 1, "news": 0, "event": 1, "gallery": 0})
+
+    def test_filter_queryset_keeps_the_ordering(self):
+        older = News.objects.create(title="Borehole update", content="-")
+        qs = search.filter_queryset(News.objects.order_by("-id"), "borehole")
+        self.assertEqual(list(qs), [older, self.draft, self.news])
+        self.assertFalse(search.filter_queryset(News.objects.all(), "!!").exists())
+
+    def test_triggers_follow_updates_and_deletes(self):
+        self.well.title = "Solar lamps"
+        self.well.save()
+        self.assertEqual(self.found("borehole"), [("news", self.news.pk)])
+        self.assertEqual(self.found("solar"), [("program", self.well.pk)])
+
+        self.news.delete()
+        self.assertEqual(self.found("borehole"), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {search.FTS_TABLE}")
+            self.assertEqual(cursor.fetchone()[0], SearchDocument.objects.count())
+
+    def test_rebuild(self):
+        SearchDocument.objects.all().delete()
+        self.assertEqual(self.found("borehole"), [])
+        self.assertEqual(search.rebuild(), {"program": 1, "news": 2, "event": 1, "gallery": 0})
+        self.assertEqual(self.found("borehole"), [("program", self.well.pk), ("news", self.news.pk)])
+        self.assertEqual(search.rebuild(["news"]), {"news": 2})
+        self.assertEqual(SearchDocument.objects.count(), 4)
+
+
+class SearchViewPagingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        SiteSettings.objects.create(pk=1)
+        self.news = [News.objects.create(title=f"Water well {i}", content="Borehole report") for i in range(25)]
+        self.url = reverse("website:search")
+
+    def ids(self, response):
+        return [row["url"] for row in response.context["results"]]
+
+    def test_cursor_walks_every_result_once(self):
+        first = self.client.get(self.url, {"q": "water"})
+        self.assertEqual(len(self.ids(first)), 20)
+        self.assertEqual(first.context["first_number"], 1)
+        self.assertTrue(first.context["next_url"])
+
+        second = self.client.get(self.url + first.context["next_url"])
+        self.assertEqual(second.context["first_number"], 21)
+        self.assertEqual(second.context["next_url"], "")
+
+        seen = self.ids(first) + self.ids(second)
+        expected = {reverse("website:news_detail", args=[n.pk]) for n in self.news}
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(set(seen), expected)
+
+    def test_tampered_cursor_falls_back_to_the_first_page(self):
+        first = self.ids(self.client.get(self.url, {"q": "water"}))
+        for token in ["not-a-token!", encode_token({"r": "x", "i": 3}), encode_token(["r", 1])]:
+            response = self.client.get(self.url, {"q": "water", "cursor": token})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context["first_number"], 1)
+            self.assertEqual(self.ids(response), first)
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        SiteSettings.objects.create(pk=1, facebook_url="https://facebook.com/alhadid")
+
+    def render_base(self, staff=False):
+        request = RequestFactory().get("/")
+        request.resolver_match = resolve("/")
+        request.user = User(username="staff", is_staff=True) if staff else AnonymousUser()
+        # Read the row straight from the database so a cache miss shows up
+        # as a query
+        context = {"site_settings": lambda: SiteSettings.objects.get(pk=1), "now": timezone.now()}
+        with CaptureQueriesContext(connection) as queries:
+            html = render_to_string("base.html", context, request=request)
+        return html, len(queries)
+
+    def test_second_render_reuses_header_and_footer(self):
+        html, first = self.render_base()
+        self.assertGreater(first, 0)
+        self.assertIn("https://facebook.com/alhadid", html)
+
+        again, second = self.render_base()
+        self.assertEqual(second, 0)
+        self.assertEqual(again, html)
+        self.assertIn(reverse("admin_panel:login"), again)
+
+    def test_settings_generation_invalidates_fragments(self):
+        self.render_base()
+        SiteSettings.objects.filter(pk=1).update(facebook_url="https://facebook.com/alhadid.tz")
+        self.assertEqual(self.render_base()[1], 0)  # stale until the generation moves
+
+        caching.bump_generation("sitesettings")
+        html, queries = self.render_base()
+        self.assertGreater(queries, 0)
+        self.assertIn("https://facebook.com/alhadid.tz", html)
+
+    def test_header_varies_on_staff_flag(self):
+        dashboard = 'href="%s"' % reverse("admin_panel:dashboard")
+        anonymous, _ = self.render_base()
+        staff, _ = self.render_base(staff=True)
+        self.assertNotIn(dashboard, anonymous)
+        self.assertIn(dashboard, staff)
+
+
+
+class DerivativeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.photo = Gallery.objects.create(title="Photo", image=jpeg_upload(orientation=6, size=(700, 350)))
+        self.storage = self.photo.image.storage
+
+    def names(self, name, widths):
+        return [images.derivative_name(name, w, ext) for w in widths for ext in images.DERIVATIVE_FORMATS]
+
+    def test_target_widths(self):
+        self.assertEqual(images.target_widths(100), [100])
+        self.assertEqual(images.target_widths(640), [320, 640])
+        self.assertEqual(images.target_widths(700), [320, 640, 700])
+        self.assertEqual(images.target_widths(5000), [320, 640, 960, 1280, 1920])
+
+    def test_generate_writes_rotated_webp_and_jpeg_per_width(self):
+        self.assertEqual(images.available_widths(self.photo.image), [])
+
+        self.assertEqual(images.generate_derivatives(self.photo.image), [320, 350])
+        for name in self.names(self.photo.image.name, [320, 350]):
+            self.assertIn("/derivatives/", name)
+            with self.storage.open(name) as fh, Image.open(fh) as img:
+                self.assertEqual(img.format, "WEBP" if name.endswith(".webp") else "JPEG")
+                self.assertEqual(img.width, int(name.rsplit("-", 1)[1].split("w.")[0]))
+                self.assertGreater(img.height, img.width)  # EXIF rotation applied
+        self.assertEqual(images.available_widths(self.photo.image), [320, 350])
+        self.assertTrue(images.has_derivatives(self.photo.image))
+
+    def test_job_pipeline_builds_derivatives(self):
+        jobs.run_job(jobs.claim_next())
+        self.photo.refresh_from_db()
+        self.assertEqual(images.available_widths(self.photo.image), [320, 350])
+        self.assertTrue(all(self.storage.exists(n) for n in self.names(self.photo.image.name, [320, 350])))
+
+    def test_replacing_or_deleting_the_image_drops_its_derivatives(self):
+        images.generate_derivatives(self.photo.image)
+        old = self.names(self.photo.image.name, [320, 350])
+
+        self.photo.image = jpeg_upload("new.jpg", size=(400, 200))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.photo.save()
+        self.assertFalse(any(self.storage.exists(n) for n in old))
+        self.assertEqual(images.available_widths(self.photo.image), [])
+
+        images.generate_derivatives(self.photo.image)
+        new = self.names(self.photo.image.name, [320, 400])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.photo.delete()
+        self.assertFalse(any(self.storage.exists(n) for n in new))
+
+
+class ResponsiveImageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+    def render(self, image):
+        template = Template('{% load image_extras %}{% responsive_image image alt="Photo" sizes="50vw" %}')
+        return template.render(Context({"image": image}))
+
+    def test_intrinsic_applies_exif_rotation_and_rewinds_the_upload(self):
+        upload = jpeg_upload(orientation=6)
+        gallery = Gallery(title="Photo", image=upload)
+        width, height, placeholder = images.intrinsic(gallery.image)
+        self.assertEqual((width, height), (20, 40))
+        self.assertTrue(placeholder.startswith("data:image/jpeg;base64,"))
+        self.assertEqual(upload.tell(), 0)
+
+        gallery.save()  # the pre_save signal stores the same values
+        gallery.refresh_from_db()
+        self.assertEqual((gallery.image_width, gallery.image_height, gallery.image_placeholder),
+                         (20, 40, placeholder))
+        self.assertEqual(images.intrinsic(gallery.image), (20, 40, placeholder))
+
+    def test_plain_img_with_size_and_placeholder_until_derivatives_exist(self):
+        photo = Gallery.objects.create(title="Photo", image=jpeg_upload(size=(700, 350)))
+        html = self.render(photo.image)
+        self.assertNotIn("<picture>", html)
+        self.assertIn('width="700" height="350"', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertIn("background:url(data:image/jpeg;base64,", html)
+
+    def test_srcset_lists_widths_up_to_the_original(self):
+        photo = Gallery.objects.create(title="Photo", image=jpeg_upload(size=(700, 350)))
+        images.generate_derivatives(photo.image)
+        html = self.render(photo.image)
+
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('width="700" height="350"', html)
+        for ext in ("webp", "jpg"):
+            widths = [int(entry.rsplit(" ", 1)[1][:-1]) for entry in images.srcset(photo.image, ext).split(", ")]
+            self.assertEqual(widths, [320, 640, 700])
+            self.assertIn(images.srcset(photo.image, ext), html)
+
+
+class InstrumentationMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.stats = defaultdict(instrumentation.ViewStats)
+        patcher = mock.patch.object(instrumentation, "view_stats", self.stats)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.original_render = Template.render
+        self.render_during_request = None
+
+    def view(self, request):
+        self.render_during_request = Template.render
+        list(SiteSettings.objects.all())
+        return HttpResponse(Template("{% for i in items %}{{ i }}{% endfor %}").render(Context({"items": [1, 2]})))
+
+    def request(self, user=None):
+        request = RequestFactory().get("/")
+        request.user = user or AnonymousUser()
+        request.resolver_match = resolve("/")
+        return instrumentation.InstrumentationMiddleware(self.view)(request)
+
+    @override_settings(SERVER_TIMING="all")
+    def test_server_timing_header_and_stats(self):
+        response = self.request()
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="1 queries", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+
+        stats = self.stats["website:home"]
+        self.assertEqual(stats.requests, 1)
+        self.assertEqual(stats.queries.total, 1)
+
+    def test_server_timing_is_staff_only_by_default(self):
+        self.assertNotIn("Server-Timing", self.request())
+        self.assertIn("Server-Timing", self.request(User(username="staff", is_staff=True)))
+        with override_settings(SERVER_TIMING="off"):
+            self.assertNotIn("Server-Timing", self.request(User(username="staff", is_staff=True)))
+
+    def test_template_render_patch_is_removed_after_the_request(self):
+        self.request()
+        self.assertIs(self.render_during_request, instrumentation._timed_render)
+        self.assertIs(Template.render, self.original_render)
+
+        self.view = mock.Mock(side_effect=RuntimeError("boom"))
+        with self.assertRaises(RuntimeError):
+            self.request()
+        self.assertIs(Template.render, self.original_render)
+
+
+class CriticalCssTests(TestCase):
+    HTML = """
+        <html class="scroll-smooth"><body>
+        <header id="top"><nav class="flex md:grid"><button type="button" class="btn">Menu</button></nav></header>
+        <main>
+          <section class="hero"><div class="py-12"><section class="inner"></section><h1>Hi</h1></div></section>
+          <section class="below"><p class="later">Not above the fold</p></section>
+        </main></body></html>
+    """
+
+    def test_fold_stops_after_first_section_in_main(self):
+        used = critical_css.used_names(self.HTML)
+        self.assertTrue({"scroll-smooth", "flex", "md:grid", "btn", "hero", "py-12", "inner", "dark"} <= used["classes"])
+        self.assertNotIn("below", used["classes"])
+        self.assertNotIn("later", used["classes"])
+        self.assertIn("h1", used["tags"])
+        self.assertNotIn("p", used["tags"])
+        self.assertEqual(used["ids"], {"top"})
+        self.assertIn(("type", "button"), used["attrs"])
+
+    def test_extract_keeps_only_rules_the_fold_can_match(self):
+        css = (
+            "@charset \"utf-8\";"
+            ".flex{display:flex}.later{color:red}.btn:hover{color:blue}.btn,.later{margin:0}"
+            ".md\\:grid{display:grid}#top{top:0}h1{font-size:2rem}p{margin:0}"
+            "button[type=button]{cursor:pointer}button[type=submit]{cursor:wait}"
+            ".dark .hero{background:#000}.hero:not(.later)::before{content:\"}\"}"
+            "@media (min-width:768px){.hero{padding:2rem}.later{padding:0}}"
+            "@media print{.later{display:none}}"
+            "@font-face{font-family:x;src:url(x.woff2)}"
+        )
+        critical = critical_css.extract(css, critical_css.used_names(self.HTML))
+        self.assertEqual(critical, (
+            ".flex{display:flex}.btn{margin:0}"
+            ".md\\:grid{display:grid}#top{top:0}h1{font-size:2rem}"
+            "button[type=button]{cursor:pointer}"
+            ".dark .hero{background:#000}.hero:not(.later)::before{content:\"}\"}"
+            "@media (min-width:768px){.hero{padding:2rem}}"
+        ))
+
+    def test_build_never_closes_the_inline_style(self):
+        css = '.hero::after{content:"</style><script>"}'
+        self.assertEqual(critical_css.build(self.HTML, css), '.hero::after{content:"<\\/style><script>"}')
+
+
+class StylesheetTagTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(critical_css._loaded, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def render(self, url):
+        request = RequestFactory().get(url)
+        request.resolver_match = resolve(url)
+        template = Template('{% load critical_css %}{% stylesheet "css/tw.css" %}')
+        return template.render(Context({"request": request}))
+
+    def test_inlines_critical_css_and_defers_the_stylesheet(self):
+        with mock.patch.object(critical_css, "read_static", return_value=".hero{padding:0}") as read:
+            html = self.render(reverse("website:home"))
+            self.render(reverse("website:home"))
+        read.assert_called_once_with("css/critical/home.css")
+        self.assertIn('<style id="critical-css">.hero{padding:0}</style>', html)
+        self.assertIn('<link rel="stylesheet" href="/static/css/tw.css" media="print"', html)
+        self.assertIn('<noscript><link rel="stylesheet" href="/static/css/tw.css"></noscript>', html)
+
+    def test_plain_link_without_critical_css(self):
+        link = '<link rel="stylesheet" href="/static/css/tw.css">'
+        with mock.patch.object(critical_css, "read_static", return_value="") as read:
+            self.assertEqual(self.render(reverse("website:about")), link)  # not built yet
+            self.assertEqual(self.render(reverse("website:search")), link)  # not in PAGES
+            self.assertEqual(self.render(reverse("admin_panel:login")), link)
+        read.assert_called_once_with("css/critical/about.css")
+
+
+class StaticImagesTests(TestCase):
+    def setUp(self):
+        folders = [tempfile.TemporaryDirectory() for _ in range(2)]
+        for folder in folders:
+            self.addCleanup(folder.cleanup)
+        self.source, self.collected = (FileSystemStorage(location=f.name) for f in folders)
+        min_bytes = mock.patch.object(static_images, "MIN_SOURCE_BYTES", 200)
+        min_bytes.start()
+        self.addCleanup(min_bytes.stop)
+
+        gradient = Image.linear_gradient("L").resize((700, 350))
+        self.save("images/photo.jpg", gradient.convert("RGB"), "JPEG")
+        cutout = gradient.convert("RGBA").resize((400, 200))
+        cutout.putpixel((0, 0), (0, 0, 0, 0))
+        self.save("images/logo.png", cutout, "PNG")
+        self.save("images/icon.png", Image.new("RGB", (8, 8), "teal"), "PNG")
+
+    def save(self, name, img, fmt):
+        buf = io.BytesIO()
+        img.save(buf, fmt)
+        if self.source.exists(name):
+            self.source.delete(name)
+        self.source.save(name, io.BytesIO(buf.getvalue()))
+
+    def optimize(self):
+        names = ["images/photo.jpg", "images/logo.png", "images/icon.png"]
+        return static_images.optimize(self.collected, {name: self.source for name in names}, workers=2)
+
+    def test_is_source(self):
+        self.assertTrue(static_images.is_source("images/photo.JPG"))
+        self.assertFalse(static_images.is_source("images/optimized/photo-320w.0123456789ab.jpg"))
+        self.assertFalse(static_images.is_source("images/favicon.svg"))
+        self.assertFalse(static_images.is_source("css/photo.png"))
+
+    def test_optimize_writes_hashed_variants_and_manifest(self):
+        manifest = self.optimize()
+        self.assertEqual(sorted(manifest), ["images/logo.png", "images/photo.jpg"])  # icon is too small
+
+        photo, logo = manifest["images/photo.jpg"], manifest["images/logo.png"]
+        self.assertEqual((photo["width"], photo["height"], photo["fallback"]), (700, 350, "jpg"))
+        self.assertEqual(logo["fallback"], "png")  # keeps its transparency
+        self.assertEqual([w for w, _, _ in photo["variants"]["webp"]], [320, 640, 700])
+        self.assertEqual([w for w, _, _ in logo["variants"]["png"]], [320, 400])
+        for name in static_images.variant_names(photo) + static_images.variant_names(logo):
+            self.assertRegex(name, r"^images/optimized/(photo|logo)-\d+w\.[0-9a-f]{12}\.(webp|jpg|png)$")
+            self.assertTrue(self.collected.exists(name))
+        self.assertEqual(static_images.read_manifest(self.collected), manifest)
+
+    def test_unchanged_sources_are_reused(self):
+        first = self.optimize()
+        with mock.patch.object(static_images, "_build_entry") as build:
+            self.assertEqual(self.optimize(), first)
+        build.assert_not_called()
+
+        self.save("images/photo.jpg", Image.linear_gradient("L").resize((500, 250)).convert("RGB"), "JPEG")
+        second = self.optimize()
+        self.assertEqual(second["images/logo.png"], first["images/logo.png"])
+        self.assertEqual(second["images/photo.jpg"]["width"], 500)
+
+    def test_static_image_tag(self):
+        manifest = self.optimize()
+        photo = manifest["images/photo.jpg"]
+        template = Template('{% load image_extras %}{% static_image path alt="Orphans" sizes="50vw" width=400 %}')
+        with mock.patch.object(static_images, "_manifest", manifest):
+            html = template.render(Context({"path": "images/photo.jpg"}))
+            plain = template.render(Context({"path": "images/icon.png"}))
+
+        self.assertEqual(static_images.pick(photo["variants"]["jpg"], 400)[0], 640)
+        self.assertEqual(static_images.pick(photo["variants"]["jpg"], 900)[0], 700)
+        self.assertIn('<source type="image/webp" srcset="/static/%s 320w' % photo["variants"]["webp"][0][1], html)
+        self.assertIn('<img src="/static/%s"' % photo["variants"]["jpg"][1][1], html)
+        self.assertIn('width="700" height="350"', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertTrue(plain.startswith('<img src="/static/images/icon.png"'))
+
+
+@skipUnless(TTFont and brotli, "fonttools and brotli are needed to read woff2")
+class IconSubsetTests(TestCase):
+    ICONS_CSS = os.path.join(settings.BASE_DIR, "static", "src", "icons.css")
+    FONT = os.path.join(settings.BASE_DIR, "static", "fonts", "bootstrap-icons-subset.woff2")
+
+    def rules(self, path):
+        with open(path) as fh:
+            return dict(build_icons.GLYPH_RULE.findall(fh.read()))
+
+    def codepoints(self, path):
+        return {"%x" % c for c in TTFont(path).getBestCmap()}
+
+    def test_committed_subset_covers_every_icon_in_use(self):
+        rules = self.rules(self.ICONS_CSS)
+        used = build_icons.Command().used_icons()
+        self.assertEqual(used - set(rules), {"handshake"})  # not a Bootstrap icon
+        self.assertEqual(self.codepoints(self.FONT), set(rules.values()))
+
+    def test_command_subsets_the_font_to_the_icons_in_use(self):
+        # The committed subset stands in for the full font: it holds every glyph in use
+        glyphs = {**self.rules(self.ICONS_CSS), "alarm": "f102"}
+        package, static = tempfile.TemporaryDirectory(), tempfile.TemporaryDirectory()
+        self.addCleanup(package.cleanup)
+        self.addCleanup(static.cleanup)
+        os.makedirs(os.path.join(package.name, "font", "fonts"))
+        with open(os.path.join(package.name, "font", "bootstrap-icons.css"), "w") as fh:
+            fh.write("".join('.bi-%s::before { content: "\\%s"; }\n' % item for item in glyphs.items()))
+        with open(os.path.join(package.name, "package.json"), "w") as fh:
+            fh.write('{"version": "1.13.1"}')
+        shutil.copy(self.FONT, os.path.join(package.name, "font", "fonts", "bootstrap-icons.woff2"))
+
+        out = io.StringIO()
+        call_command("build_icons", package=package.name, static=static.name, stdout=out)
+
+        written = os.path.join(static.name, "src", "icons.css")
+        self.assertEqual(self.rules(written), self.rules(self.ICONS_CSS))  # "alarm" is unused
+        with open(written) as fh:
+            self.assertIn("from bootstrap-icons 1.13.1", fh.read())
+        subset = os.path.join(static.name, "fonts", "bootstrap-icons-subset.woff2")
+        self.assertEqual(self.codepoints(subset), set(self.rules(self.ICONS_CSS).values()))
+        self.assertIn("handshake: not a Bootstrap icon", out.getvalue())
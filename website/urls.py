@@ -15,5 +15,8 @@ urlpatterns = [
     path('events/<int:pk>/', views.event_detail, name='event_detail'),
     path('contact/', views.contact, name='contact'),
     path('gallery/', views.gallery_view, name='gallery'),
+    path('search/', views.search_view, name='search'),
+    path('sitemap.xml', views.sitemap_index, name='sitemap'),
+    path('sitemap-<str:section>.xml', views.sitemap_section, name='sitemap_section'),
     path('toggle-theme/', views.toggle_theme, name='toggle_theme'),
 ]
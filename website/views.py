@@ -1,26 +1,39 @@
 # website/views.py
+import hashlib
+from functools import partial
+
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
+from django.utils.http import urlencode
 from django.contrib import messages
-from django.http import JsonResponse
+from django.contrib.sitemaps import views as sitemap_views
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.db.models import Q
 from django.utils import timezone
 
 from .models import Program, News, Event, DonationMethod, Gallery, ContactMessage, SiteSettings
+from .caching import cache_public_page, cached_by_generations, conditional_detail
+from .pagination import paginate, encode_token, decode_token
+from . import search
+from .sitemaps import SECTIONS, SITEMAPS
 from website.forms import ContactForm
 
+@cache_public_page("program", "gallery", "news", "event")
 def home(request):
     programs = Program.objects.filter(is_active=True).order_by('-id')[:3]
     gallery  = Gallery.objects.filter(is_published=True).order_by('-id')[:6]
 
-    latest_news = News.objects.filter(is_published=True).order_by('-created_at')[:3]
+    # Lists, not querysets: the template indexes them (latest_news.0, .1, ...)
+    # and every index on an unevaluated slice is another query.
+    latest_news = list(News.objects.filter(is_published=True).order_by('-created_at')[:3])
 
     events_qs = Event.objects.filter(is_published=True)
     now = timezone.now()
-    upcoming_events = events_qs.filter(event_date__gte=now).order_by('event_date')[:3]
-    latest_events = events_qs.order_by('-event_date')[:3]
+    upcoming_events = list(events_qs.filter(event_date__gte=now).order_by('event_date')[:3])
+    latest_events = list(events_qs.order_by('-event_date')[:3])
 
     context = {
         'page_title': 'Home',
@@ -36,6 +49,7 @@ def home(request):
     return render(request, 'website/home.html', context)
 
 
+@cache_public_page()
 def about(request):
     settings = SiteSettings.objects.first()
     context = {
@@ -46,8 +60,15 @@ def about(request):
     return render(request, 'website/about.html', context)
 
 
+PROGRAMS_PAGE_SIZE = 9
+NEWS_EVENTS_PAGE_SIZE = 6
+
+
+@cache_public_page("program")
 def programs(request):
-    programs_list = Program.objects.filter(is_active=True)
+    programs_list = paginate(
+        request, Program.objects.filter(is_active=True), ('-created_at', '-id'), PROGRAMS_PAGE_SIZE,
+    )
     context = {
         'programs': programs_list,
         'page_title': 'Programs & Projects',
@@ -56,6 +77,7 @@ def programs(request):
     return render(request, 'website/programs.html', context)
 
 
+@cache_public_page("donationmethod")
 def donate(request):
     donation_methods = DonationMethod.objects.filter(is_active=True).order_by('order','name')
     context = {
@@ -66,6 +88,8 @@ def donate(request):
     return render(request, 'website/donate.html', context)
 
 
+@conditional_detail(Program, is_active=True)
+@cache_public_page("program:{pk}")
 def program_detail(request, pk):
     program = get_object_or_404(Program, pk=pk, is_active=True)
     context = {
@@ -76,9 +100,15 @@ def program_detail(request, pk):
     return render(request, 'website/program_detail.html', context)
 
 
+@cache_public_page("news", "event")
 def news_events(request):
-    news_list = News.objects.filter(is_published=True).order_by('-created_at')
-    events_list = Event.objects.filter(is_published=True).order_by('-event_date')
+    # Each list keeps its own cursor (?news=, ?events=) so they page independently
+    news_list = paginate(
+        request, News.objects.filter(is_published=True), ('-created_at', '-id'), NEWS_EVENTS_PAGE_SIZE, 'news',
+    )
+    events_list = paginate(
+        request, Event.objects.filter(is_published=True), ('-event_date', '-id'), NEWS_EVENTS_PAGE_SIZE, 'events',
+    )
     context = {
         'news': news_list,
         'events': events_list,
@@ -88,6 +118,8 @@ def news_events(request):
     return render(request, 'website/news_events.html', context)
 
 
+@conditional_detail(News, is_published=True)
+@cache_public_page("news:{pk}")
 def news_detail(request, pk):
     news_item = get_object_or_404(News, pk=pk, is_published=True)
     context = {
@@ -98,6 +130,8 @@ def news_detail(request, pk):
     return render(request, 'website/news_detail.html', context)
 
 
+@conditional_detail(Event, is_published=True)
+@cache_public_page("event:{pk}")
 def event_detail(request, pk):
     event = get_object_or_404(Event, pk=pk, is_published=True)
     context = {
@@ -127,13 +161,14 @@ def contact(request):
     return render(request, "website/contact.html", {"form": form, "active": "contact", "page_title": "Contact"})
 
 
+@cache_public_page("gallery")
 def gallery_view(request):
     """
     Server-side filtering, searching, and pagination.
     Params:
       - ?category=orphans|women|mosques|healthcare|events|other|all
       - ?q=search terms
-      - ?page=1
+      - ?cursor=<token>  (opaque, from the Prev/Next links)
     """
     q = (request.GET.get('q') or "").strip()
     category = (request.GET.get('category') or "all").lower()
@@ -143,18 +178,10 @@ def gallery_view(request):
         qs = qs.filter(category=category)
 
     if q:
-        qs = qs.filter(Q(title__icontains=q) | Q(description__icontains=q))
+        qs = search.filter_queryset(qs, q)
 
-    qs = qs.order_by('-created_at', '-id')
-
-    paginator = Paginator(qs, 12)  # 12 per page
-    page = request.GET.get('page', 1)
-    try:
-        items = paginator.page(page)
-    except PageNotAnInteger:
-        items = paginator.page(1)
-    except EmptyPage:
-        items = paginator.page(paginator.num_pages)
+    # Keyset pagination: no COUNT(*), and deep pages cost the same as page 1
+    items = paginate(request, qs, ('-created_at', '-id'), 12)
 
     context = {
         'gallery': items,  # NB: template iterates page object the same way
@@ -175,6 +202,152 @@ def gallery_view(request):
     return render(request, 'website/gallery.html', context)
 
 
+SEARCH_PAGE_SIZE = 20
+SEARCH_CACHE_TIMEOUT = 10 * 60
+SEARCH_TYPES = [
+    ('all', 'All'),
+    ('program', 'Programs'),
+    ('news', 'News'),
+    ('event', 'Events'),
+    ('gallery', 'Gallery'),
+]
+
+
+def _search_result_url(kind, object_id, q):
+    if kind == 'news':
+        return reverse('website:news_detail', args=[object_id])
+    if kind == 'event':
+        return reverse('website:event_detail', args=[object_id])
+    if kind == 'program':
+        return reverse('website:program_detail', args=[object_id])
+    return f"{reverse('website:gallery')}?{urlencode({'q': q})}"
+
+
+def _search_page(q, kind, after, start):
+    """One page of results + the cursor for the next one (plain data, cacheable)."""
+    results = search.search(
+        q, kinds=None if kind == 'all' else [kind],
+        limit=SEARCH_PAGE_SIZE + 1, after=after,
+    )
+    page, more = results[:SEARCH_PAGE_SIZE], len(results) > SEARCH_PAGE_SIZE
+    next_cursor = ""
+    if more:
+        last = page[-1]
+        next_cursor = encode_token({"r": last.rank, "i": last.doc_id, "n": start + len(page)})
+    rows = [
+        {
+            'kind': r.kind,
+            'title': r.title,
+            'snippet': r.snippet,
+            'url': _search_result_url(r.kind, r.object_id, q),
+        }
+        for r in page
+    ]
+    return rows, next_cursor
+
+
+def search_view(request):
+    """
+    Site-wide search across programs, news, events and gallery.
+    Params:
+      - ?q=search terms
+      - ?type=all|program|news|event|gallery
+      - ?cursor=<token>  (opaque, from the "More results" link)
+    """
+    q = search.normalize_query(request.GET.get('q'))
+    kind = request.GET.get('type', 'all')
+    if kind not in dict(SEARCH_TYPES):
+        kind = 'all'
+
+    after, start = None, 0
+    data = decode_token(request.GET.get('cursor', ''))
+    if data and isinstance(data.get('r'), (int, float)) and isinstance(data.get('i'), int):
+        after, start = (data['r'], data['i']), data.get('n') if isinstance(data.get('n'), int) else 0
+
+    rows, next_cursor, facets = [], "", {}
+    if q:
+        load_page = partial(_search_page, q, kind, after, start)
+        load_facets = partial(search.facet_counts, q)
+        if request.user.is_authenticated:
+            (rows, next_cursor), facets = load_page(), load_facets()
+        else:
+            # Keyed by the normalized query, so "Water", "water " and
+            # "WATER!" share one entry; any content edit invalidates it.
+            depends_on = tuple(search.SEARCHABLE)
+            rows, next_cursor = cached_by_generations(
+                f"search:page|{q}|{kind}|{after}|{start}", depends_on, load_page, SEARCH_CACHE_TIMEOUT)
+            facets = cached_by_generations(
+                f"search:facets|{q}", depends_on, load_facets, SEARCH_CACHE_TIMEOUT)
+
+    types = [
+        (value, label, sum(facets.values()) if value == 'all' else facets.get(value, 0))
+        for value, label in SEARCH_TYPES
+    ]
+    context = {
+        'q': q,
+        'type': kind,
+        'types': types,
+        'results': rows,
+        'first_number': start + 1,
+        'next_url': "?" + urlencode({'q': q, 'type': kind, 'cursor': next_cursor}) if next_cursor else "",
+        'page_title': 'Search',
+        'active': 'search',
+    }
+    return render(request, 'website/search.html', context)
+
+
+# ---------------------------
+# Sitemaps
+# ---------------------------
+SITEMAP_CACHE_TIMEOUT = 24 * 60 * 60
+SITEMAP_MAX_AGE = 60 * 60
+
+def _render_sitemap(render):
+    """Render Django's sitemap view once; plain data for the cache."""
+    response = render()
+    response.render()
+    content = response.content
+    return {
+        'content': content,
+        'etag': '"%s"' % hashlib.md5(content).hexdigest(),
+        'last_modified': parse_http_date_safe(response.get('Last-Modified', '')) or int(timezone.now().timestamp()),
+    }
+
+
+def _serve_sitemap(request, key, depends_on, render):
+    # Absolute URLs in the XML come from the request's host
+    key = f"sitemap:{request.scheme}://{request.get_host()}{key}"
+    data = cached_by_generations(key, depends_on, partial(_render_sitemap, render), SITEMAP_CACHE_TIMEOUT)
+    response = HttpResponse(data['content'], content_type='application/xml')
+    response['ETag'] = data['etag']
+    response['Last-Modified'] = http_date(data['last_modified'])
+    response['X-Robots-Tag'] = 'noindex, noodp, noarchive'
+    patch_cache_control(response, public=True, max_age=SITEMAP_MAX_AGE)
+    return get_conditional_response(
+        request, etag=data['etag'], last_modified=data['last_modified'], response=response,
+    )
+
+
+def sitemap_index(request):
+    """/sitemap.xml: one <sitemap> per section (and per 50k-URL page of a section)."""
+    depends_on = tuple(sorted({tag for _, tags in SECTIONS.values() for tag in tags}))
+    return _serve_sitemap(request, "|index", depends_on, partial(
+        sitemap_views.index, request, SITEMAPS, sitemap_url_name='website:sitemap_section',
+    ))
+
+
+def sitemap_section(request, section):
+    if section not in SECTIONS:
+        raise Http404("No such sitemap section")
+    page = request.GET.get('p', '1')
+    if not page.isdigit():
+        raise Http404("Bad page")
+    _, depends_on = SECTIONS[section]
+    return _serve_sitemap(request, f"|{section}|{page}", depends_on, partial(
+        sitemap_views.sitemap, request, {section: SITEMAPS[section]}, section=section,
+    ))
+
+
 @csrf_exempt
 @require_POST
 def toggle_theme(request):